@@ -5,7 +5,98 @@ class Settings(BaseSettings):
     DB_URL: str
     GEMINI_API_KEY: str
     GEMINI_MODEL: str = "gemini-2.0-flash"
-    WHISPER_MODEL: str = "base"
+    WHISPER_MODEL: str = "base"              # accurate tier (also the only one without a fast tier)
+    # Optional fast tier for short clips / busy workers; low-confidence short clips re-run on WHISPER_MODEL
+    WHISPER_FAST_MODEL: str = ""             # e.g. "tiny"; "" → every clip on WHISPER_MODEL
+    WHISPER_FAST_MAX_SECONDS: float = 4.0    # clips up to this long go to the fast tier
+    WHISPER_BUSY_QUEUE: int = 2              # this many clips in progress → fast tier for all
+    WHISPER_RETRY_LOGPROB: float = -1.0      # fast-tier mean log-prob below this → retry on WHISPER_MODEL (not when busy)
+
+    # Model runtimes — size thread pools to cores ÷ workers on the host (0 → runtime default).
+    # EMBED_MODEL takes any fastembed model; smaller / quantized ones such as
+    # "BAAI/bge-small-en-v1.5" (int8 ONNX) or "snowflake/snowflake-arctic-embed-xs"
+    # trade accuracy for speed — check with python -m benchmarks.bench_embed_models
+    EMBED_MODEL: str = "sentence-transformers/all-MiniLM-L6-v2"
+    EMBED_THREADS: int = 0               # ONNX Runtime intra-op threads per worker (fastembed `threads`)
+    EMBED_BATCH_SIZE: int = 64           # texts per ONNX run when embedding exemplars / batches
+    WHISPER_COMPUTE_TYPE: str = "int8"
+    WHISPER_CPU_THREADS: int = 0         # CTranslate2 intra-op threads per transcription
+    WHISPER_NUM_WORKERS: int = 1         # CTranslate2 inter-op: transcriptions run in parallel per model
+    WHISPER_BATCH_SIZE: int = 0          # >0 → batched pipeline over VAD chunks (faster-whisper ≥ 1.1)
+
+    # Which routers this worker mounts (and so which models it loads), comma-separated:
+    #   api   — /receiving, /api, /jobs, /chat/query*   (no models)
+    #   nlp   — /chat/interpret, /chat/respond          (fastembed + spaCy)
+    #   voice — /chat/transcribe                        (faster-whisper)
+    #   all   — everything (default)
+    # /chat/ask (interpret + query in one request) is mounted by workers serving both api and nlp.
+    SERVICE_PROFILE: str = "all"
+    # Set by gunicorn.conf.py: models are loaded in a master that forks the workers,
+    # so nothing that starts threads at load time may be created before the fork
+    PREFORK: bool = False
+
+    # Intent scoring — how an intent's exemplar similarities are pooled
+    INTENT_POOLING: str = "max"          # "max" | "mean"
+    INTENT_ARTIFACT_DIR: str = "data/intents"   # "" → always embed at startup
+    # Labelled utterances (JSONL {"intent", "text"}) → ANN top-k vote instead
+    INTENT_EXAMPLES_PATH: str = ""
+    INTENT_INDEX_NLIST: int = 0          # 0 → sqrt(#exemplars)
+    INTENT_INDEX_NPROBE: int = 8
+    INTENT_INDEX_K: int = 10
+
+    # /chat/query result limits
+    QUERY_ROW_CAP: int = 500
+    QUERY_FETCH_SIZE: int = 200
+    QUERY_CURSOR_TTL: int = 600
+    # Identical in-flight /chat/query, /chat/interpret, /chat/respond calls share one computation
+    CHAT_COALESCE: bool = True
+
+    # Warehouse / location / item code → id lookups cached per process (seconds)
+    CODE_CACHE_TTL: int = 300
+
+    # Chat session state (pending deletes, query cursors)
+    SESSION_STORE: str = "memory"        # "memory" (per worker) or "sqlite" (shared file)
+    SESSION_STORE_PATH: str = "data/sessions.db"
+    SESSION_TTL: int = 300
+    SESSION_MAX_ENTRIES: int = 10000
+
+    # Background jobs (imports, reports, exports) — SQLite queue shared by workers
+    JOBS_STORE_PATH: str = "data/jobs.db"
+    JOBS_RESULT_DIR: str = "data/jobs"
+    JOBS_WORKERS: int = 2                # per process; 0 → this process only submits
+    JOBS_EXECUTOR: str = "thread"        # "thread" | "process"
+    JOBS_POLL_SECONDS: float = 1.0
+    JOBS_TTL: int = 86400                # finished jobs + result files kept this long
+
+    # Report snapshots — daily/monthly summaries refreshed by the in-app scheduler
+    REPORT_SNAPSHOTS: bool = True        # False → report questions always run live
+    REPORT_SNAPSHOT_INTERVAL: int = 300  # seconds; 0 → this process never refreshes
+    REPORT_SNAPSHOT_OVERLAP: int = 120   # re-read headers this far behind the watermark
+
+    # FEFO expiry index — in-process, expiry-ordered pickable lines per item/warehouse
+    EXPIRY_INDEX: bool = True            # False → /api/fefo builds nothing, 404s
+    EXPIRY_INDEX_SYNC: int = 30          # seconds between picking up other workers' inserts
+    EXPIRY_INDEX_REBUILD: int = 900      # seconds between full reloads (other workers' edits)
+    EXPIRY_INDEX_OVERLAP: int = 120      # sync re-reads lines updated this far back (ids commit out of order)
+
+    # Stock ledger — movements are always recorded; snapshots bound point-in-time replay
+    STOCK_SNAPSHOT_INTERVAL: int = 3600  # seconds; 0 → this process never snapshots
+    STOCK_SNAPSHOT_KEEP_HOURS: int = 48  # older snapshots thinned to the last one per day
+    STOCK_SNAPSHOT_LAG: int = 60         # snapshots stop at movements this old (> longest write transaction)
+
+    # Analytics mirror — DuckDB/Parquet copy for aggregate /chat/query SQL (needs duckdb)
+    ANALYTICS_MIRROR: bool = False
+    ANALYTICS_MIRROR_DIR: str = "data/analytics"
+    ANALYTICS_MIRROR_SYNC: int = 60      # seconds; only the process holding mirror.duckdb syncs
+    ANALYTICS_MIRROR_OVERLAP: int = 120  # re-read rows this far behind the updated_at watermark
+    ANALYTICS_MIRROR_MAX_LAG: int = 600  # older than this → aggregates go to the primary again
+
+    # Sampling profiler — admin only, off unless enabled with a token
+    PROFILER_ENABLED: bool = False
+    ADMIN_TOKEN: str | None = None
+    PROFILER_INTERVAL_MS: float = 5
+    PROFILER_SIGNAL_SECONDS: float = 10
+    PROFILER_OUTPUT_DIR: str = "profiles"
 
     class Config:
         env_file = ".env"
@@ -1,7 +1,11 @@
+import os
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from .config import settings
 
 engine = create_engine(settings.DB_URL, pool_pre_ping=True)
+# A forked worker must not reuse the parent's pooled connections (close=False:
+# leave the sockets to the parent, just forget them here)
+os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
\ No newline at end of file
@@ -0,0 +1,374 @@
+"""
+jobs.py — background jobs on a SQLite-backed queue (no external broker)
+=======================================================================
+Big receiving imports, full reports, ABC analysis and exports can outlive a
+proxy timeout, so they run as jobs instead of inside the request:
+
+  • JobStore  — one SQLite file (WAL) with a row per job: kind, params,
+                status, progress, summary result, error, result file.
+                Shared by every uvicorn worker on the host.
+  • JobRunner — JOBS_WORKERS threads per process that claim queued jobs
+                atomically (any worker process may run any job) and run the
+                registered handler — in the thread, or in a process pool
+                with JOBS_EXECUTOR=process for CPU-heavy work.
+  • @job(kind) — registers handler(params, ctx) → JSON-serialisable summary.
+                ctx.progress(done, total, message) updates the row (throttled),
+                ctx.result_path(suffix) is where a downloadable file goes.
+
+Status flow: queued → running → done | failed, or queued → cancelled.
+Jobs still "running" for a process that no longer exists are marked failed
+at startup rather than re-run (a half-applied import must not run twice).
+Finished jobs and their files are purged after JOBS_TTL seconds.
+"""
+
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import lru_cache
+from typing import Any, Callable
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("done", "failed", "cancelled")
+
+_COLUMNS = ("id", "kind", "status", "params", "progress", "message", "result",
+            "error", "result_file", "worker", "created", "started", "finished")
+
+
+class JobStore:
+    def __init__(self, path: str, result_dir: str):
+        self.path = path
+        self.result_dir = result_dir
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        os.makedirs(result_dir, exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=10, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, params TEXT NOT NULL,"
+            " progress REAL NOT NULL DEFAULT 0, message TEXT, result TEXT, error TEXT,"
+            " result_file TEXT, worker TEXT, created REAL NOT NULL, started REAL, finished REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_jobs_status_created ON jobs(status, created)")
+
+    def _row(self, row) -> dict | None:
+        if row is None:
+            return None
+        job = dict(zip(_COLUMNS, row))
+        job["params"] = json.loads(job["params"])
+        job["result"] = json.loads(job["result"]) if job["result"] is not None else None
+        return job
+
+    def submit(self, kind: str, params: dict) -> str:
+        job_id = uuid.uuid4().hex
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs(id, kind, status, params, created) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params, default=str), time.time()),
+            )
+        return job_id
+
+    def get(self, job_id: str) -> dict | None:
+        with self._lock:
+            row = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._row(row)
+
+    def recent(self, limit: int = 50, kind: str | None = None) -> list[dict]:
+        sql = f"SELECT {', '.join(_COLUMNS)} FROM jobs"
+        args: tuple = ()
+        if kind:
+            sql += " WHERE kind = ?"
+            args = (kind,)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY created DESC LIMIT ?", args + (limit,)).fetchall()
+        return [self._row(r) for r in rows]
+
+    def claim(self, worker: str) -> dict | None:
+        """Atomically move the oldest queued job to running for this worker."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    f"SELECT {', '.join(_COLUMNS)} FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+                ).fetchone()
+                if row:
+                    self._conn.execute(
+                        "UPDATE jobs SET status = 'running', worker = ?, started = ? WHERE id = ?",
+                        (worker, time.time(), row[0]),
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return self._row(row)
+
+    def progress(self, job_id: str, fraction: float, message: str | None = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET progress = ?, message = COALESCE(?, message) WHERE id = ? AND status = 'running'",
+                (max(0.0, min(1.0, fraction)), message, job_id),
+            )
+
+    def finish(self, job_id: str, result: Any = None, result_file: str | None = None) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'done', progress = 1, result = ?, result_file = ?, finished = ?"
+                " WHERE id = ?",
+                (json.dumps(result, default=str), result_file, time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._lock:
+            self._conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished = ? WHERE id = ?",
+                (error, time.time(), job_id),
+            )
+
+    def cancel(self, job_id: str) -> bool:
+        """Cancel a job that has not started yet."""
+        with self._lock:
+            cur = self._conn.execute(
+                "UPDATE jobs SET status = 'cancelled', finished = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            )
+        return cur.rowcount > 0
+
+    def fail_orphans(self, host: str) -> int:
+        """Fail jobs left running by processes on this host that have exited."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, worker FROM jobs WHERE status = 'running' AND worker LIKE ?", (f"{host}:%",)
+            ).fetchall()
+        orphans = [job_id for job_id, worker in rows if not _pid_alive(int(worker.split(":")[1]))]
+        for job_id in orphans:
+            self.fail(job_id, "Interrupted: the worker process exited before the job finished.")
+        return len(orphans)
+
+    def purge(self, ttl: float) -> int:
+        cutoff = time.time() - ttl
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, result_file FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished < ?",
+                (cutoff,),
+            ).fetchall()
+            for _, path in rows:
+                if path:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+            self._conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed', 'cancelled') AND finished < ?", (cutoff,)
+            )
+        return len(rows)
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+@lru_cache(maxsize=1)
+def get_job_store() -> JobStore:
+    return JobStore(settings.JOBS_STORE_PATH, settings.JOBS_RESULT_DIR)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Handlers
+# ─────────────────────────────────────────────────────────────────────────────
+
+class JobContext:
+    """Passed to handlers; picklable, so it also works inside a process pool."""
+
+    # seconds between progress writes (the last one always lands)
+    PROGRESS_INTERVAL = 0.5
+
+    def __init__(self, job_id: str, result_dir: str):
+        self.job_id = job_id
+        self.result_dir = result_dir
+        self._last = 0.0
+        self._files: list[str] = []
+
+    def progress(self, done: int, total: int | None, message: str | None = None) -> None:
+        now = time.monotonic()
+        if now - self._last < self.PROGRESS_INTERVAL and not (total and done >= total):
+            return
+        self._last = now
+        get_job_store().progress(self.job_id, done / total if total else 0.0, message)
+
+    def result_path(self, suffix: str) -> str:
+        path = os.path.join(self.result_dir, f"{self.job_id}{suffix}")
+        self._files.append(path)
+        return path
+
+
+class JobKind:
+    def __init__(self, kind: str, handler: Callable[[dict, JobContext], Any], schema=None,
+                 media_type: str = "text/csv"):
+        self.kind = kind
+        self.handler = handler
+        self.schema = schema          # optional pydantic model validating params at submit
+        self.media_type = media_type  # of the downloadable result file
+
+
+JOB_KINDS: dict[str, JobKind] = {}
+
+
+def job(kind: str, schema=None, media_type: str = "text/csv"):
+    """Register a job handler: handler(params, ctx) → JSON-serialisable summary."""
+    def register(fn):
+        JOB_KINDS[kind] = JobKind(kind, fn, schema, media_type)
+        return fn
+    return register
+
+
+def validate_params(kind: JobKind, params: dict) -> dict:
+    if kind.schema is None:
+        return params
+    return kind.schema(**params).model_dump(mode="json")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Runner
+# ─────────────────────────────────────────────────────────────────────────────
+
+class JobError(Exception):
+    """An expected failure; its message becomes the job's error, without a traceback in the log."""
+
+
+def _execute(handler, params: dict, ctx: JobContext) -> tuple[Any, str | None]:
+    try:
+        result = handler(params, ctx)
+    except Exception as exc:
+        detail = getattr(exc, "detail", None)  # HTTPException raised by code shared with the routes
+        if detail is None:
+            raise
+        # plain exception: HTTPException does not survive pickling out of a process pool
+        raise JobError(str(detail)) from None
+    produced = [path for path in ctx._files if os.path.exists(path)]
+    return result, (produced[0] if produced else None)
+
+
+class JobRunner:
+    def __init__(self, store: JobStore, workers: int, executor: str = "thread", poll: float = 1.0,
+                 ttl: float = 86400):
+        self.store = store
+        self.workers = workers
+        self.poll = poll
+        self.ttl = ttl
+        if executor not in ("thread", "process"):
+            raise ValueError(f"Unknown JOBS_EXECUTOR '{executor}' (expected 'thread' or 'process').")
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._pool = self._new_pool() if executor == "process" else None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: list[threading.Thread] = []
+
+    def _new_pool(self) -> ProcessPoolExecutor:
+        # spawn, not fork: a fork of this multi-threaded server can inherit held locks
+        # and open DB/SQLite connections; spawned children import only the handlers
+        return ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+
+    def start(self) -> "JobRunner":
+        self.store.fail_orphans(socket.gethostname())
+        self.store.purge(self.ttl)
+        for i in range(self.workers):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+        return self
+
+    def notify(self) -> None:
+        """Wake an idle worker now instead of at its next poll."""
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+        for t in self._threads:
+            t.join(timeout=5)
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            try:
+                claimed = self.store.claim(self.worker_id)
+            except sqlite3.Error:
+                logger.exception("Job claim failed")
+                claimed = None
+            if claimed is None:
+                self._wake.wait(self.poll)
+                self._wake.clear()
+                continue
+            self._run(claimed)
+
+    def _run(self, claimed: dict) -> None:
+        kind = JOB_KINDS.get(claimed["kind"])
+        if kind is None:
+            self.store.fail(claimed["id"], f"Unknown job kind '{claimed['kind']}'.")
+            return
+        ctx = JobContext(claimed["id"], self.store.result_dir)
+        try:
+            if self._pool is not None:
+                result, path = self._pool.submit(_execute, kind.handler, claimed["params"], ctx).result()
+            else:
+                result, path = _execute(kind.handler, claimed["params"], ctx)
+        except JobError as exc:
+            self.store.fail(claimed["id"], str(exc))
+            return
+        except BrokenProcessPool:
+            logger.exception("Job %s (%s) killed its worker process", claimed["id"], claimed["kind"])
+            self.store.fail(claimed["id"], "The job's worker process exited unexpectedly.")
+            self._pool = self._new_pool()
+            return
+        except Exception as exc:
+            logger.exception("Job %s (%s) failed", claimed["id"], claimed["kind"])
+            self.store.fail(claimed["id"], str(exc) or type(exc).__name__)
+            return
+        self.store.finish(claimed["id"], result, path)
+
+
+_runner: JobRunner | None = None
+
+
+def start_runner() -> JobRunner | None:
+    """Start this process's workers (JOBS_WORKERS=0 → submit only, never run)."""
+    global _runner
+    if _runner is None and settings.JOBS_WORKERS > 0:
+        _runner = JobRunner(
+            get_job_store(), settings.JOBS_WORKERS, settings.JOBS_EXECUTOR.lower(),
+            settings.JOBS_POLL_SECONDS, settings.JOBS_TTL,
+        ).start()
+    return _runner
+
+
+def stop_runner() -> None:
+    global _runner
+    if _runner is not None:
+        _runner.stop()
+        _runner = None
+
+
+def submit(kind: str, params: dict) -> str:
+    job_id = get_job_store().submit(kind, params)
+    if _runner is not None:
+        _runner.notify()
+    return job_id
@@ -0,0 +1,177 @@
+"""
+metrics.py — in-process latency histograms and Prometheus text exposition
+==========================================================================
+No client library needed: a small thread-safe registry of counters, gauges
+and fixed-bucket histograms rendered in the Prometheus text format at
+/metrics.
+
+  • REQUEST_SECONDS  — per-route latency, recorded by the HTTP middleware
+  • STAGE_SECONDS    — pipeline stages (intent, slots, SQL, serialization…)
+  • stage("name")    — context manager / decorator feeding STAGE_SECONDS
+  • gauge_callback() — values read at scrape time (e.g. DB pool stats)
+
+Metrics are per worker process; scrape each worker or aggregate upstream.
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_registry: list = []
+_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: dict[tuple, object] = {}
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels: dict) -> tuple:
+        return tuple(str(labels.get(n, "")) for n in self.labelnames)
+
+    def header(self) -> list[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> list[str]:
+        with _lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), callback: Callable | None = None):
+        super().__init__(name, help, labelnames)
+        self.callback = callback
+
+    def set(self, value: float, **labels) -> None:
+        with _lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> list[str]:
+        if self.callback is not None:
+            value = self.callback()
+            return [] if value is None else [f"{self.name} {_num(value)}"]
+        with _lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_labels(self.labelnames, k)} {_num(v)}" for k, v in items]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels) -> None:
+        key = self._key(labels)
+        with _lock:
+            state = self._values.get(key)
+            if state is None:
+                # [per-bucket counts..., sum, count]
+                state = self._values[key] = [0] * len(self.buckets) + [0.0, 0]
+            i = bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                state[i] += 1
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> list[str]:
+        with _lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        lines = []
+        for key, state in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, state):
+                cumulative += n
+                le = _labels(self.labelnames, key, 'le="%s"' % _num(bound))
+                lines.append(f"{self.name}_bucket{le} {cumulative}")
+            le = _labels(self.labelnames, key, 'le="+Inf"')
+            lines.append(f"{self.name}_bucket{le} {state[-1]}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, key)} {state[-2]!r}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, key)} {state[-1]}")
+        return lines
+
+
+def gauge_callback(name: str, help: str, fn: Callable[[], float | None]) -> Gauge:
+    return Gauge(name, help, callback=fn)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Shared metrics
+# ─────────────────────────────────────────────────────────────────────────────
+
+REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+REQUESTS_IN_FLIGHT = Gauge("http_requests_in_flight", "Requests currently being served.")
+STAGE_SECONDS = Histogram(
+    "stage_duration_seconds", "Latency of internal pipeline stages.", ("stage",),
+)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a block (or, as a decorator, a function) into STAGE_SECONDS."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(time.perf_counter() - t0, stage=name)
+
+
+def render() -> str:
+    with _lock:
+        metrics = list(_registry)
+    lines = []
+    for m in metrics:
+        body = m.render()
+        if body:
+            lines.extend(m.header())
+            lines.extend(body)
+    return "\n".join(lines) + "\n"
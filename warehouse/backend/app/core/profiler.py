@@ -0,0 +1,154 @@
+"""
+profiler.py — low-overhead statistical profiler for live workers
+=================================================================
+Stdlib only: a daemon thread snapshots every thread's stack with
+sys._current_frames() at a fixed interval and counts identical stacks.
+Output is the "collapsed stacks" format understood by flamegraph.pl,
+speedscope and inferno:
+
+    <thread>;func (pkg/file.py:12);func (pkg/file.py:40) <samples>
+
+Entry points:
+  • profile_for(seconds)      — blocking window, used by POST /admin/profile
+  • Sampler().start()/stop()  — wrap a single request (X-Profile header)
+  • install_signal_handler()  — SIGUSR2 writes a profile file without a request
+
+Idle threads (blocked in a queue, condition or selector) are dropped by
+default so the output shows where CPU time actually goes.
+"""
+
+import itertools
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+
+MAX_DEPTH = 128
+
+# (file basename, function) of leaf frames that mean "thread is parked"
+_IDLE_LEAVES = {
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+
+_lock = threading.Lock()  # one profiling window at a time per worker
+_recent_lock = threading.Lock()
+_recent: "OrderedDict[str, str]" = OrderedDict()
+_RECENT_MAX = 20
+_ids = itertools.count(1)
+
+
+class ProfilerBusy(RuntimeError):
+    pass
+
+
+def _short_path(filename: str) -> str:
+    parts = filename.replace("\\", "/").rsplit("/", 2)
+    return "/".join(parts[-2:])
+
+
+def _collapse(frame, include_idle: bool) -> str | None:
+    code = frame.f_code
+    if not include_idle and (os.path.basename(code.co_filename), code.co_name) in _IDLE_LEAVES:
+        return None
+    names = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        names.append(f"{code.co_name} ({_short_path(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    names.reverse()
+    return ";".join(names)
+
+
+class Sampler:
+    def __init__(self, interval: float = 0.005, include_idle: bool = False):
+        self.interval = interval
+        self.include_idle = include_idle
+        self.counts: Counter[str] = Counter()
+        self.samples = 0
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self) -> "Sampler":
+        self.started = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> "Sampler":
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.elapsed = time.perf_counter() - self.started
+        return self
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for tid, frame in sys._current_frames().items():
+                if tid == own:
+                    continue
+                stack = _collapse(frame, self.include_idle)
+                if stack is not None:
+                    self.counts[f"{names.get(tid, tid)};{stack}"] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "\n".join(f"{stack} {n}" for stack, n in self.counts.most_common()) + "\n"
+
+
+def profile_for(seconds: float, interval: float = 0.005, include_idle: bool = False) -> Sampler:
+    """Sample all threads for `seconds`. Raises ProfilerBusy if a window is already open."""
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy("A profiling session is already running in this worker.")
+    try:
+        sampler = Sampler(interval, include_idle).start()
+        time.sleep(seconds)
+        return sampler.stop()
+    finally:
+        _lock.release()
+
+
+def remember(collapsed: str) -> str:
+    """Keep a profile in the per-worker ring buffer; returns its id."""
+    profile_id = f"{os.getpid()}-{next(_ids)}"
+    with _recent_lock:
+        _recent[profile_id] = collapsed
+        while len(_recent) > _RECENT_MAX:
+            _recent.popitem(last=False)
+    return profile_id
+
+
+def recent() -> dict[str, str]:
+    with _recent_lock:
+        return dict(_recent)
+
+
+def install_signal_handler(seconds: float, out_dir: str, interval: float = 0.005) -> bool:
+    """
+    On SIGUSR2, profile this worker for `seconds` in a background thread and
+    write <out_dir>/profile-<pid>-<unix ts>.collapsed. Returns False where the
+    signal isn't available (Windows) or when not called from the main thread.
+    """
+    if not hasattr(signal, "SIGUSR2") or threading.current_thread() is not threading.main_thread():
+        return False
+
+    def _write() -> None:
+        try:
+            sampler = profile_for(seconds, interval)
+        except ProfilerBusy:
+            return
+        os.makedirs(out_dir, exist_ok=True)
+        path = os.path.join(out_dir, f"profile-{os.getpid()}-{int(time.time())}.collapsed")
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(sampler.collapsed())
+
+    signal.signal(signal.SIGUSR2, lambda signum, frame: threading.Thread(target=_write, daemon=True).start())
+    return True
@@ -0,0 +1,62 @@
+"""
+scheduler.py — periodic in-process tasks
+========================================
+One daemon thread per process runs registered tasks every N seconds (first
+run right after start). Tasks must be idempotent: with several uvicorn
+workers each process runs its own copy. A failing run is logged and retried
+at the next interval; a slow run delays only the tasks behind it.
+
+    scheduler.every(300, refresh_snapshots, "report_snapshots")
+    scheduler.start()
+"""
+
+import logging
+import threading
+import time
+from typing import Callable
+
+from app.core.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class Scheduler:
+    def __init__(self):
+        self._tasks: dict[str, list] = {}   # name → [interval, fn, next_run]
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def every(self, seconds: float, fn: Callable[[], object], name: str) -> None:
+        self._tasks[name] = [float(seconds), fn, 0.0]
+
+    def start(self) -> None:
+        if self._thread is None and self._tasks:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="scheduler", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=10)
+            self._thread = None
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            now = time.monotonic()
+            for name, task in list(self._tasks.items()):
+                interval, fn, next_run = task
+                if next_run > now:
+                    continue
+                t0 = time.perf_counter()
+                try:
+                    fn()
+                except Exception:
+                    logger.exception("Scheduled task %s failed", name)
+                STAGE_SECONDS.observe(time.perf_counter() - t0, stage=f"task_{name}")
+                task[2] = time.monotonic() + interval
+            wait = min(t[2] for t in self._tasks.values()) - time.monotonic()
+            self._stop.wait(max(wait, 0.05))
+
+
+scheduler = Scheduler()
@@ -0,0 +1,200 @@
+"""
+session_store.py — expiring, bounded key/value store for chat state
+====================================================================
+Conversation state (pending delete confirmations, /chat/query cursors) must
+expire, must not grow without bound, and — with several uvicorn workers
+behind a load balancer — must be visible to whichever worker gets the next
+request.
+
+  • MemorySessionStore — per process; TTL + LRU cap. Single-worker default.
+  • SQLiteSessionStore — one SQLite file shared by every worker on the host
+                         (WAL mode), same TTL + size cap semantics.
+
+Pick with SESSION_STORE=memory|sqlite; values must be JSON-serialisable.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any
+
+from app.core.config import settings
+
+
+class SessionStore(ABC):
+    @abstractmethod
+    def get(self, key: str) -> Any | None:
+        """Value of a key (None if missing or expired)."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        """Store a value for ttl seconds (None → the store's default)."""
+
+    @abstractmethod
+    def pop(self, key: str) -> Any | None:
+        """Atomically read and remove a key (None if missing or expired)."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        """Live entries."""
+
+    def after_fork(self) -> None:
+        """Called in a forked child: drop anything tied to the parent's threads or handles."""
+
+
+class MemorySessionStore(SessionStore):
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _sweep(self, now: float) -> None:
+        expired = [k for k, (exp, _) in self._data.items() if exp <= now]
+        for k in expired:
+            del self._data[k]
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._data[key] = (now + (ttl or self.ttl), value)
+            self._data.move_to_end(key)
+            if len(self._data) > self.max_entries:
+                self._sweep(now)
+                while len(self._data) > self.max_entries:
+                    self._data.popitem(last=False)  # least recently used
+
+    def pop(self, key: str) -> Any | None:
+        with self._lock:
+            entry = self._data.pop(key, None)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._sweep(time.monotonic())
+            return len(self._data)
+
+    def after_fork(self) -> None:
+        # the lock may have been held by a parent thread that does not exist here
+        self._lock = threading.Lock()
+        self._data.clear()
+
+
+class SQLiteSessionStore(SessionStore):
+    """
+    Shared across processes through one SQLite file. Wall-clock expiry (all
+    workers share it); every 100 writes expired rows are purged and the table
+    is trimmed to max_entries, oldest expiry first.
+    """
+
+    def __init__(self, path: str, ttl: float, max_entries: int):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._inherited: list[sqlite3.Connection] = []
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = self._connect()
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS session_state ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL, expires REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_session_state_expires ON session_state(expires)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10, check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def get(self, key: str) -> Any | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM session_state WHERE key = ? AND expires > ?", (key, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key: str, value: Any, ttl: float | None = None) -> None:
+        now = time.time()
+        payload = json.dumps(value, default=str)
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO session_state(key, value, expires) VALUES (?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires = excluded.expires",
+                (key, payload, now + (ttl or self.ttl)),
+            )
+            self._writes += 1
+            if self._writes % 100 == 0:
+                self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        self._conn.execute("DELETE FROM session_state WHERE expires <= ?", (now,))
+        self._conn.execute(
+            "DELETE FROM session_state WHERE key IN ("
+            " SELECT key FROM session_state ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def pop(self, key: str) -> Any | None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value, expires FROM session_state WHERE key = ?", (key,)
+                ).fetchone()
+                if row:
+                    self._conn.execute("DELETE FROM session_state WHERE key = ?", (key,))
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        if not row or row[1] <= time.time():
+            return None
+        return json.loads(row[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute(
+                "SELECT COUNT(*) FROM session_state WHERE expires > ?", (time.time(),)
+            ).fetchone()[0]
+
+    def after_fork(self) -> None:
+        # SQLite connections must not cross a fork. Nor may the child close the
+        # inherited one (closing can checkpoint / remove the WAL under the
+        # parent), so it is kept referenced, unused, and a new one opened.
+        self._inherited.append(self._conn)
+        self._lock = threading.Lock()
+        self._conn = self._connect()
+
+
+@lru_cache(maxsize=1)
+def get_session_store() -> SessionStore:
+    backend = settings.SESSION_STORE.lower()
+    if backend == "sqlite":
+        store = SQLiteSessionStore(settings.SESSION_STORE_PATH, settings.SESSION_TTL, settings.SESSION_MAX_ENTRIES)
+    elif backend == "memory":
+        store = MemorySessionStore(settings.SESSION_TTL, settings.SESSION_MAX_ENTRIES)
+    else:
+        raise ValueError(f"Unknown SESSION_STORE '{settings.SESSION_STORE}' (expected 'memory' or 'sqlite').")
+    # Routers hold on to the instance, so it is reset in place (gunicorn preload_app)
+    os.register_at_fork(after_in_child=store.after_fork)
+    return store
@@ -0,0 +1,95 @@
+"""
+singleflight.py — coalesce identical in-flight computations
+===========================================================
+At shift start many dashboards ask the same question within the same second.
+A SingleFlight lets the first caller for a key run the computation while every
+identical call that arrives before it finishes waits for, and shares, its
+result (or its exception) instead of starting another copy:
+
+    flight = SingleFlight("chat_query", enabled=settings.CHAT_COALESCE)
+    result, shared = flight.do(key, lambda: expensive(...))
+
+Nothing is cached: once the leader returns, the key is forgotten and the next
+call computes afresh, so results are never staler than an ordinary request.
+Shared results are handed to every waiter as-is — treat them as read-only.
+
+Routes are sync (run in the threadpool), so waiting blocks a pool thread, as
+the duplicate computation would have. Per process: with several workers a
+burst costs at most one computation per worker.
+"""
+
+import threading
+from typing import Any, Callable, Hashable
+
+from app.core.metrics import Counter, gauge_callback
+
+COALESCED = Counter(
+    "singleflight_coalesced_total", "Calls that shared an identical in-flight computation.", ("flight",),
+)
+LEADERS = Counter(
+    "singleflight_leaders_total", "Calls that ran the computation themselves.", ("flight",),
+)
+
+_flights: list = []
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: BaseException | None = None
+
+
+class SingleFlight:
+    def __init__(self, name: str, enabled: bool = True):
+        self.name = name
+        self.enabled = enabled
+        self._calls: dict[Hashable, _Call] = {}
+        self._lock = threading.Lock()
+        _flights.append(self)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._calls)
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> tuple[Any, bool]:
+        """Run fn() once per in-flight key; → (result, shared). Re-raises fn's exception in every caller."""
+        if not self.enabled:
+            return fn(), False
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            COALESCED.inc(flight=self.name)
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        LEADERS.inc(flight=self.name)
+        try:
+            call.result = fn()
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+
+def normalize_key(text: str) -> str:
+    """Whitespace-insensitive key; case is kept (slots such as customer names are case-sensitive)."""
+    return " ".join(text.split())
+
+
+gauge_callback(
+    "singleflight_in_flight", "Distinct computations currently running under single-flight.",
+    lambda: sum(len(f) for f in _flights),
+)
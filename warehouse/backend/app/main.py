@@ -1,10 +1,36 @@
-from fastapi import FastAPI
+import logging
+import time
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import chat, receiving, inventory
+from fastapi.responses import PlainTextResponse
+from app.routes import admin
 
+from app.core import metrics, profiler
+from app.core import jobs as job_queue
+from app.core.scheduler import scheduler
 from app.core.config import settings
+from app.core.database import engine
+from app.core.responses import FastJSONResponse
 print("DB_URL:", settings.DB_URL)
-app = FastAPI(title="Warehouse Copilot API")
+
+logger = logging.getLogger(__name__)
+
+ROLES = ("api", "nlp", "voice")
+
+
+def service_roles(profile: str) -> set[str]:
+    roles = {r.strip() for r in profile.lower().split(",") if r.strip()}
+    if "all" in roles:
+        return set(ROLES)
+    unknown = roles - set(ROLES)
+    if unknown or not roles:
+        raise ValueError(f"SERVICE_PROFILE: unknown role(s) {sorted(unknown) or profile!r}; use {', '.join(ROLES)} or all")
+    return roles
+
+
+roles = service_roles(settings.SERVICE_PROFILE)
+logger.info("Service roles: %s", ", ".join(sorted(roles)))
+app = FastAPI(title="Warehouse Copilot API", default_response_class=FastJSONResponse)
 
 app.add_middleware(
     CORSMiddleware,
@@ -14,10 +40,113 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-app.include_router(chat.router, prefix="/chat", tags=["Chat"])
-app.include_router(receiving.router, prefix="/receiving", tags=["Receiving"])
-app.include_router(inventory.router, prefix="/api", tags=["Inventory"])
+
+@app.middleware("http")
+async def profile_request(request: Request, call_next):
+    """Admins can send X-Profile: 1 to sample stacks for the duration of one request."""
+    wanted = request.headers.get("x-profile", "").strip().lower() in ("1", "true", "yes")
+    if not wanted or not admin.is_admin(request.headers.get("x-admin-token")):
+        return await call_next(request)
+    # Samples every thread, so concurrent requests in this worker show up too
+    sampler = profiler.Sampler(settings.PROFILER_INTERVAL_MS / 1000).start()
+    try:
+        response = await call_next(request)
+    finally:
+        sampler.stop()
+    response.headers["X-Profile-Id"] = profiler.remember(sampler.collapsed())
+    return response
+
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    t0 = time.perf_counter()
+    status = 500
+    metrics.REQUESTS_IN_FLIGHT.inc()
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        metrics.REQUESTS_IN_FLIGHT.dec()
+        # Label by route template (/receiving/lines/{line_id}) to keep cardinality bounded
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.REQUEST_SECONDS.observe(
+            time.perf_counter() - t0, method=request.method, route=route, status=status
+        )
+
+
+def _pool_stat(name: str):
+    fn = getattr(engine.pool, name, None)
+    return fn() if callable(fn) else None
+
+
+metrics.gauge_callback("db_pool_size", "Configured DB connection pool size.", lambda: _pool_stat("size"))
+metrics.gauge_callback("db_pool_checked_out", "DB connections currently in use.", lambda: _pool_stat("checkedout"))
+metrics.gauge_callback("db_pool_checked_in", "Idle DB connections in the pool.", lambda: _pool_stat("checkedin"))
+metrics.gauge_callback("db_pool_overflow", "DB connections opened beyond pool size.", lambda: _pool_stat("overflow"))
+
+# ── Routers — imported only for the roles this worker serves ──
+if "api" in roles:
+    from app.routes import receiving, inventory, jobs, query
+    from app.services import analytics_mirror, expiry_index, report_snapshots, stock_ledger
+    app.include_router(query.router, prefix="/chat", tags=["Chat"])
+    app.include_router(receiving.router, prefix="/receiving", tags=["Receiving"])
+    app.include_router(inventory.router, prefix="/api", tags=["Inventory"])
+    app.include_router(jobs.router, prefix="/jobs", tags=["Jobs"])
+if "nlp" in roles:
+    from app.routes import chat
+    app.include_router(chat.router, prefix="/chat", tags=["Chat"])
+if "voice" in roles:
+    from app.routes import voice
+    app.include_router(voice.router, prefix="/chat", tags=["Chat"])
+if {"api", "nlp"} <= roles:
+    from app.routes import ask
+    app.include_router(ask.router, prefix="/chat", tags=["Chat"])
+app.include_router(admin.router, prefix="/admin", tags=["Admin"])
+
+
+@app.on_event("startup")
+def install_profiler_signal():
+    # Per worker, not at import: with gunicorn preload_app the import runs in
+    # the master (where SIGUSR2 is gunicorn's binary upgrade), and
+    # UvicornWorker resets SIGUSR2 to SIG_DFL before the app starts
+    if settings.PROFILER_ENABLED:
+        profiler.install_signal_handler(
+            settings.PROFILER_SIGNAL_SECONDS, settings.PROFILER_OUTPUT_DIR,
+            settings.PROFILER_INTERVAL_MS / 1000,
+        )
+
+
+@app.on_event("startup")
+def start_background_work():
+    # Job handlers and the maintenance tasks below belong to the api routes;
+    # nlp / voice workers never claim jobs (they could not run them)
+    if "api" not in roles:
+        return
+    job_queue.start_runner()
+    if settings.REPORT_SNAPSHOTS and settings.REPORT_SNAPSHOT_INTERVAL > 0:
+        scheduler.every(settings.REPORT_SNAPSHOT_INTERVAL, report_snapshots.refresh_task, "report_snapshots")
+    if settings.EXPIRY_INDEX:
+        if settings.EXPIRY_INDEX_SYNC > 0:
+            scheduler.every(settings.EXPIRY_INDEX_SYNC, expiry_index.sync_task, "expiry_sync")
+        if settings.EXPIRY_INDEX_REBUILD > 0:
+            scheduler.every(settings.EXPIRY_INDEX_REBUILD, expiry_index.rebuild_task, "expiry_rebuild")
+    if settings.STOCK_SNAPSHOT_INTERVAL > 0:
+        scheduler.every(settings.STOCK_SNAPSHOT_INTERVAL, stock_ledger.snapshot_task, "stock_snapshot")
+    if settings.ANALYTICS_MIRROR and settings.ANALYTICS_MIRROR_SYNC > 0:
+        scheduler.every(settings.ANALYTICS_MIRROR_SYNC, analytics_mirror.sync_task, "analytics_mirror")
+    scheduler.start()
+
+
+@app.on_event("shutdown")
+def stop_background_work():
+    scheduler.stop()
+    job_queue.stop_runner()
 
 @app.get("/")
 def root():
-    return {"status": "ok"}
\ No newline at end of file
+    return {"status": "ok", "roles": sorted(roles)}
+
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Date, ForeignKey, DateTime, Computed, Index
 from sqlalchemy.sql import func
 from sqlalchemy.orm import relationship
 from app.core.database import Base
@@ -8,25 +8,33 @@ class ReceivingHeader(Base):
 
     id = Column(Integer, primary_key=True, index=True)
     customer = Column(String(150), nullable=False)
-    receiving_date = Column(Date, nullable=False)
+    receiving_date = Column(Date, nullable=False, index=True)
     warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False)
     reference_no = Column(String(100), nullable=False)
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    # Normalised lookup key maintained by the DB (see migrations/001_reference_key.sql)
+    reference_key = Column(String(100), Computed("LOWER(TRIM(reference_no))", persisted=True), index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), index=True)
+    # Change watermark for the analytics mirror (see migrations/005_analytics_mirror.sql)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
     lines = relationship("ReceivingLine", back_populates="header", cascade="all, delete-orphan")
 
 class ReceivingLine(Base):
     __tablename__ = "receiving_lines"
 
     id = Column(Integer, primary_key=True, index=True)
-    receiving_id = Column(Integer, ForeignKey("receiving_headers.id"), nullable=False)
+    receiving_id = Column(Integer, ForeignKey("receiving_headers.id"), nullable=False, index=True)
     item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
     location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
 
     batch_no = Column(String(100), nullable=True)
     manufacturing_date = Column(Date, nullable=True)
-    expiry_date = Column(Date, nullable=True)
-    shelf_expiry_date = Column(Date, nullable=True)
+    expiry_date = Column(Date, nullable=True, index=True)
+    shelf_expiry_date = Column(Date, nullable=True, index=True)
     status = Column(String(20), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), index=True)
 
-    header = relationship("ReceivingHeader", back_populates="lines")
\ No newline at end of file
+    header = relationship("ReceivingHeader", back_populates="lines")
+
+    # FEFO lookups: pickable lines of one item in expiry order (see migrations/003_expiry_index.sql)
+    __table_args__ = (Index("ix_receiving_lines_item_status_expiry", "item_id", "status", "expiry_date"),)
\ No newline at end of file
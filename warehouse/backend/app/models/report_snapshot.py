@@ -0,0 +1,45 @@
+from sqlalchemy import Column, Integer, BigInteger, String, Date, DateTime, ForeignKey
+from app.core.database import Base
+
+# Summary tables maintained by app/services/report_snapshots.py (see migrations/002_report_snapshots.sql).
+# Measures match the live report queries: line_count is COUNT(rl.id) over the 4-table join.
+
+class ReportDailySnapshot(Base):
+    __tablename__ = "report_daily_snapshots"
+
+    receiving_date = Column(Date, primary_key=True)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), primary_key=True)
+    receivings = Column(Integer, nullable=False)
+    line_count = Column(Integer, nullable=False)
+    total_qty = Column(BigInteger, nullable=False)
+    damaged_lines = Column(Integer, nullable=False)
+    damaged_qty = Column(BigInteger, nullable=False)
+    ok_qty = Column(BigInteger, nullable=False)
+
+class ReportMonthlySnapshot(Base):
+    __tablename__ = "report_monthly_snapshots"
+
+    month = Column(String(7), primary_key=True)  # 'YYYY-MM', as DATE_FORMAT(..., '%Y-%m')
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), primary_key=True)
+    receivings = Column(Integer, nullable=False)
+    line_count = Column(Integer, nullable=False)
+    total_qty = Column(BigInteger, nullable=False)
+    damaged_lines = Column(Integer, nullable=False)
+    damaged_qty = Column(BigInteger, nullable=False)
+    ok_qty = Column(BigInteger, nullable=False)
+    earliest = Column(Date, nullable=False)
+    latest = Column(Date, nullable=False)
+
+class ReportSnapshotDirty(Base):
+    """Receiving dates whose existing rows changed (edits, deletes, added lines) since the last refresh."""
+    __tablename__ = "report_snapshot_dirty"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    receiving_date = Column(Date, nullable=False)
+
+class ReportSnapshotState(Base):
+    __tablename__ = "report_snapshot_state"
+
+    name = Column(String(50), primary_key=True)
+    watermark = Column(DateTime(timezone=True), nullable=True)  # max receiving_headers.created_at processed
+    refreshed_at = Column(DateTime(timezone=True), nullable=True)
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, ForeignKey
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+# Append-only stock history maintained by app/services/stock_ledger.py (see migrations/004_stock_ledger.sql).
+# Balances are keyed (item, warehouse, location); damaged_qty is the damaged part of quantity.
+
+class StockMovement(Base):
+    """One change to on-hand quantity. Never updated or deleted."""
+    __tablename__ = "stock_movements"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    moved_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    reason = Column(String(20), nullable=False)     # receive | edit | delete
+    line_id = Column(Integer, nullable=False, index=True)  # no FK: the line may since be deleted
+    receiving_id = Column(Integer, nullable=False)
+    item_id = Column(Integer, ForeignKey("items.id"), nullable=False)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), nullable=False)
+    location_id = Column(Integer, ForeignKey("locations.id"), nullable=False)
+    qty_delta = Column(Integer, nullable=False)
+    damaged_delta = Column(Integer, nullable=False)
+
+class StockSnapshot(Base):
+    __tablename__ = "stock_snapshots"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    taken_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
+    last_movement_id = Column(Integer, nullable=False)  # balances include movements up to this id
+
+class StockBalance(Base):
+    __tablename__ = "stock_balances"
+
+    snapshot_id = Column(Integer, ForeignKey("stock_snapshots.id"), primary_key=True)
+    item_id = Column(Integer, ForeignKey("items.id"), primary_key=True)
+    warehouse_id = Column(Integer, ForeignKey("warehouses.id"), primary_key=True)
+    location_id = Column(Integer, ForeignKey("locations.id"), primary_key=True)
+    quantity = Column(BigInteger, nullable=False)
+    damaged_qty = Column(BigInteger, nullable=False)
@@ -1,3 +1,2 @@
-from . import chat
-from . import receiving
-from . import inventory
\ No newline at end of file
+# Routers are imported by app.main according to SERVICE_PROFILE — importing
+# chat / voice here would load their models in every worker.
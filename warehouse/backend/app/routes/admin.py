@@ -0,0 +1,67 @@
+import secrets
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import PlainTextResponse
+from app.core.config import settings
+from app.core import profiler
+
+router = APIRouter()
+
+
+def is_admin(token: str | None) -> bool:
+    return bool(
+        settings.PROFILER_ENABLED
+        and settings.ADMIN_TOKEN
+        and token
+        and secrets.compare_digest(token, settings.ADMIN_TOKEN)
+    )
+
+
+def require_admin(x_admin_token: str | None = Header(default=None)):
+    # Pretend the endpoints don't exist unless profiling is switched on
+    if not settings.PROFILER_ENABLED or not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not is_admin(x_admin_token):
+        raise HTTPException(status_code=403, detail="Admin token required.")
+
+
+def _collapsed_response(profile_id: str, body: str) -> PlainTextResponse:
+    return PlainTextResponse(
+        body,
+        headers={
+            "X-Profile-Id": profile_id,
+            "Content-Disposition": f'attachment; filename="profile-{profile_id}.collapsed"',
+        },
+    )
+
+
+@router.post("/profile", dependencies=[Depends(require_admin)])
+def profile_worker(
+    seconds: float = Query(default=10, gt=0, le=60),
+    interval_ms: float = Query(default=None, ge=1, le=100),
+    include_idle: bool = Query(default=False),
+):
+    """
+    Sample every thread of the worker serving this request for `seconds` and
+    return collapsed stacks (feed to flamegraph.pl or speedscope).
+    """
+    interval = (interval_ms or settings.PROFILER_INTERVAL_MS) / 1000
+    try:
+        sampler = profiler.profile_for(seconds, interval, include_idle)
+    except profiler.ProfilerBusy as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    body = sampler.collapsed()
+    return _collapsed_response(profiler.remember(body), body)
+
+
+@router.get("/profile", dependencies=[Depends(require_admin)])
+def list_profiles():
+    """Profiles kept by this worker, including ones captured via the X-Profile header."""
+    return {"profiles": list(profiler.recent().keys())}
+
+
+@router.get("/profile/{profile_id}", dependencies=[Depends(require_admin)])
+def get_profile(profile_id: str):
+    body = profiler.recent().get(profile_id)
+    if body is None:
+        raise HTTPException(status_code=404, detail="Profile not found in this worker.")
+    return _collapsed_response(profile_id, body)
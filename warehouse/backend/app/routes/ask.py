@@ -0,0 +1,46 @@
+from fastapi import APIRouter
+from fastapi.responses import StreamingResponse
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.responses import dumps
+from app.routes.chat import interpret_reply
+from app.routes.query import answer_question
+
+# /chat/ask — /chat/interpret and, for a data question, /chat/query in one
+# request. Needs the NLP models and the database, so it is mounted only by
+# workers serving both "nlp" and "api"; split deployments keep the two calls.
+router = APIRouter()
+
+
+@router.post("/ask")
+def ask(payload: dict):
+    """
+    Stream NDJSON. The first line is the /chat/interpret body, sent as soon as
+    the intent is known. For action "query_data" it is followed by
+      {"columns", "total", "truncated", "chart_type", "sql", "source", "next_cursor"}
+      one JSON array per row (up to QUERY_ROW_CAP; the rest via /chat/query/stream)
+      {"answer"}
+    Payload: { message, session_id?, commit? } as for /chat/interpret.
+    """
+    headers = {}
+    reply = interpret_reply(payload, headers)
+    question = payload.get("message", "").strip()
+
+    def lines():
+        yield dumps(reply) + b"\n"
+        if reply["action"] != "query_data":
+            return
+        # Own session: request dependencies are closed before the body streams
+        db = SessionLocal()
+        try:
+            body, records = answer_question(db, question)
+        finally:
+            db.close()
+        answer = body.pop("answer")
+        if records is not None:
+            yield dumps(body) + b"\n"
+            for i in range(0, len(records), settings.QUERY_FETCH_SIZE):
+                yield b"".join(dumps(list(r)) + b"\n" for r in records[i:i + settings.QUERY_FETCH_SIZE])
+        yield dumps({"answer": answer}) + b"\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers=headers)
@@ -1,22 +1,25 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
-from sqlalchemy.orm import Session
-from sqlalchemy import text as sa_text
-from app.services.gemini import extract_intent_and_slots, generate_chat_response, normalize_message
-from app.services.whisper_ai import transcribe_audio_bytes
-from app.services.query_engine import generate_sql_from_question, sanitize_sql, format_query_results
+from fastapi import APIRouter, HTTPException, Response
+from pydantic import ValidationError
+from app.services.gemini import interpret, generate_chat_response, normalize_message
+from app.core.config import settings
 from app.core.database import SessionLocal
+from app.core.session_store import get_session_store
+from app.core.singleflight import SingleFlight, normalize_key
+from app.schemas.receiving import SmartReceivePayload
+from app.services.receiving import smart_receive
 
+# Intent + slot extraction and chat replies: importing this module loads the
+# NLP models (fastembed, spaCy), so it is mounted only by "nlp" workers.
 router = APIRouter()
 
-_pending_deletes: dict[str, str] = {}
+# Pending delete confirmations ("delete:<session_id>" → query); expiring and
+# shared across workers when SESSION_STORE=sqlite.
+_sessions = get_session_store()
 
-
-def _get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+# Identical messages arriving while one is being handled wait for it and share
+# the result (per process, nothing cached).
+_interpret_flight = SingleFlight("chat_interpret", enabled=settings.CHAT_COALESCE)
+_respond_flight = SingleFlight("chat_respond", enabled=settings.CHAT_COALESCE)
 
 
 def _extract_query_from_slots(slots: dict) -> str | None:
@@ -32,7 +35,7 @@ def _store_pending_delete(intent: str, slots: dict, missing: list, session_id: s
     if intent == "delete_line" and not missing:
         query = _extract_query_from_slots(slots)
         if query:
-            _pending_deletes[session_id] = query
+            _sessions.set(f"delete:{session_id}", query)
 
 
 def _status_message(intent: str, slots: dict, missing: list) -> dict:
@@ -69,8 +72,38 @@ def _status_message(intent: str, slots: dict, missing: list) -> dict:
     return {"action": "chat_reply", "status": None}
 
 
+def _commit_smart_receive(slots: dict) -> dict:
+    """
+    {"commit": true} on /chat/interpret: a complete smart receive is written
+    in the same request (voice → text → stock in one call after transcribe).
+    A rejected receive comes back as the usual review card, with the reason.
+    """
+    db = SessionLocal()
+    try:
+        result = smart_receive(db, SmartReceivePayload.model_validate(slots))
+    except (HTTPException, ValidationError) as exc:
+        reason = exc.detail if isinstance(exc, HTTPException) else "Invalid date or quantity."
+        return {"action": "smart_receive", "status": f"❌ {reason} Review the details below and confirm."}
+    finally:
+        db.close()
+    return {
+        "action": "received", "receipt": result,
+        "status": f"✅ Received {result['quantity']} × {result['item_code']} into {result['warehouse']}"
+                  f" {result['location']} (Ref: {result['reference_no']}).",
+    }
+
+
+def _server_timing(timings: dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={ms:.2f}" for name, ms in timings.items())
+
+
 @router.post("/interpret")
-def interpret_message(payload: dict):
+def interpret_message(payload: dict, response: Response):
+    return interpret_reply(payload, response.headers)
+
+
+def interpret_reply(payload: dict, headers) -> dict:
+    """The /chat/interpret body; the Server-Timing value is set on `headers`."""
     message = payload.get("message", "").strip()
     session_id = payload.get("session_id", "default")
 
@@ -82,8 +115,8 @@ def interpret_message(payload: dict):
         }
 
     # ── Handle pending delete confirmation ──
-    if session_id in _pending_deletes:
-        query = _pending_deletes.pop(session_id)
+    query = _sessions.pop(f"delete:{session_id}")
+    if query is not None:
         if message.lower() in ("yes", "confirm", "haan", "ha", "y"):
             return {
                 "intent": "delete_line", "slots": {"query": query}, "missing": [],
@@ -97,17 +130,21 @@ def interpret_message(payload: dict):
                 "response": "Delete operation cancelled.", "confirmed": False,
             }
 
-    # ── NLP extraction ──
-    data = extract_intent_and_slots(message)
+    # ── NLP extraction (per-stage timings → Server-Timing header) ──
+    (data, timings), shared = _interpret_flight.do(normalize_key(message), lambda: interpret(message))
+    headers["Server-Timing"] = _server_timing(timings) + (", coalesced" if shared else "")
     intent = data.get("intent", "unknown")
     slots = data.get("slots", {})
     missing = data.get("missing", [])
 
     action_data = _status_message(intent, slots, missing)
+    # the NLP result above may be shared with a concurrent caller; the write is not
+    if intent == "smart_receive" and not missing and payload.get("commit"):
+        action_data = _commit_smart_receive(slots)
     _store_pending_delete(intent, slots, missing, session_id)
 
     # ── Fallback chat for unknown intent ──
-    response = None
+    reply = None
     if intent == "unknown":
         text_low = message.lower()
         greetings = ("hi", "hello", "hey", "assalam", "salam", "good morning",
@@ -116,7 +153,7 @@ def interpret_message(payload: dict):
                         "guide", "instructions", "madad")
 
         if any(w in text_low for w in greetings):
-            response = (
+            reply = (
                 "Assalam-o-alaikum! Main aapka Warehouse Assistant hoon.\n"
                 "Stock receive, edit, delete, search — sab yahan se control karein.\n\n"
                 "💡 Quick Receive:\n"
@@ -127,7 +164,7 @@ def interpret_message(payload: dict):
                 "• \"Who is the top supplier?\""
             )
         elif any(w in text_low for w in help_keywords):
-            response = (
+            reply = (
                 "Aap yeh commands try karein:\n\n"
                 "📥 Quick Receive (one-line):\n"
                 "• \"receive 50 wrench WH1 A1 customer Ali ref PO-151 batch BATCH-01 status ok\"\n"
@@ -147,7 +184,7 @@ def interpret_message(payload: dict):
                 "• \"Monthly receiving trend\""
             )
         else:
-            response = action_data.get("status")
+            reply = action_data.get("status")
 
     return {
         "intent": intent,
@@ -155,69 +192,14 @@ def interpret_message(payload: dict):
         "missing": missing,
         "action": action_data.get("action", "chat_reply"),
         "status": action_data.get("status"),
-        "response": response,
+        "response": reply,
+        **({"receipt": action_data["receipt"]} if "receipt" in action_data else {}),
     }
 
 
-# ─────────────────────────────────────────────────────────────────────────────
-# /chat/query — executes data questions against the database
-# ─────────────────────────────────────────────────────────────────────────────
-
-@router.post("/query")
-def query_data(payload: dict, db: Session = Depends(_get_db)):
-    question = payload.get("question", "").strip()
-    if not question:
-        raise HTTPException(status_code=400, detail="No question provided.")
-
-    try:
-        raw_sql, chart_type = generate_sql_from_question(question)
-        safe_sql = sanitize_sql(raw_sql)
-    except ValueError as e:
-        return {"answer": str(e), "sql": None, "rows": [], "columns": [], "chart_type": None}
-
-    try:
-        result = db.execute(sa_text(safe_sql))
-        columns = list(result.keys())
-        rows = [dict(zip(columns, row)) for row in result.fetchall()]
-
-        for row in rows:
-            for k, v in row.items():
-                if hasattr(v, "isoformat"):
-                    row[k] = v.isoformat()
-                elif isinstance(v, float):
-                    row[k] = round(v, 2)
-                elif v is None:
-                    row[k] = None
-                try:
-                    from decimal import Decimal
-                    if isinstance(v, Decimal):
-                        row[k] = float(round(v, 2))
-                except ImportError:
-                    pass
-
-        answer = format_query_results(question, columns, rows)
-        return {
-            "answer": answer, "sql": safe_sql,
-            "rows": rows, "columns": columns,
-            "chart_type": chart_type,
-        }
-
-    except Exception as exc:
-        return {"answer": f"❌ Query execution error: {exc}", "sql": raw_sql, "rows": [], "columns": [], "chart_type": None}
-
 
 @router.post("/respond")
 def respond_message(payload: dict):
     message = payload.get("message", "")
-    reply = generate_chat_response(message)
+    reply, _ = _respond_flight.do(normalize_key(message), lambda: generate_chat_response(message))
     return {"reply": reply}
-
-
-@router.post("/transcribe")
-async def transcribe_audio(file: UploadFile = File(...)):
-    try:
-        audio_bytes = await file.read()
-        text = transcribe_audio_bytes(audio_bytes)
-        return {"text": text}
-    except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
\ No newline at end of file
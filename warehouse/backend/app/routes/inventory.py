@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Depends, Query
+from datetime import date, datetime
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import select, text
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, func
+from app.core.config import settings
 from app.core.database import SessionLocal
-from app.models.item import Item
-from app.models.warehouse import Warehouse
+from app.core.responses import FastJSONResponse, encode_rows, ROW_FORMAT_PATTERN
 from app.models.location import Location
-from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.services import expiry_index, stock_ledger
+from app.services.inventory import inventory_query
+from app.services.report_snapshots import report_summary
 
 router = APIRouter()
 
@@ -26,80 +29,119 @@ def get_inventory(
     item_code: str | None = Query(default=None),
     warehouse: str | None = Query(default=None),
     location: str | None = Query(default=None),
+    fmt: str = Query(default="rows", alias="format", pattern=ROW_FORMAT_PATTERN),
     db: Session = Depends(get_db)
 ):
-    query = (
-        db.query(
-            ReceivingHeader.id.label("header_id"),
-            ReceivingLine.id.label("line_id"),
-            ReceivingHeader.customer.label("customer"),
-            ReceivingHeader.receiving_date.label("receiving_date"),
-            ReceivingHeader.reference_no.label("reference_no"),
-            Warehouse.code.label("warehouse"),
-            Item.code.label("item_code"),
-            Location.code.label("location"),
-            ReceivingLine.batch_no.label("batch_no"),
-            ReceivingLine.manufacturing_date.label("manufacturing_date"),
-            ReceivingLine.expiry_date.label("expiry_date"),
-            ReceivingLine.shelf_expiry_date.label("shelf_expiry_date"),
-            ReceivingLine.quantity.label("quantity"),
-            ReceivingLine.status.label("status")
-        )
-        .join(ReceivingLine, ReceivingLine.receiving_id == ReceivingHeader.id)
-        .join(Item, ReceivingLine.item_id == Item.id)
-        .join(Warehouse, ReceivingHeader.warehouse_id == Warehouse.id)
-        .join(Location, ReceivingLine.location_id == Location.id)
-        .order_by(ReceivingHeader.receiving_date.desc(), ReceivingHeader.id.desc())
+    query = inventory_query(
+        db, q=q, customer=customer, reference_no=reference_no, date_from=date_from, date_to=date_to,
+        item_code=item_code, warehouse=warehouse, location=location,
     )
+    # Dates and ints go to the encoder untouched — no per-row dict/str work here.
+    columns = [c["name"] for c in query.column_descriptions]
+    return FastJSONResponse(encode_rows(columns, query.all(), fmt))
 
-    if q:
-        like = f"%{q}%"
-        query = query.filter(
-            or_(
-                ReceivingHeader.customer.ilike(like),
-                ReceivingHeader.reference_no.ilike(like),
-                Warehouse.code.ilike(like),
-                Item.code.ilike(like),
-                Location.code.ilike(like),
-                ReceivingLine.batch_no.ilike(like),
-                ReceivingLine.status.ilike(like)
-            )
-        )
 
-    if customer:
-        query = query.filter(ReceivingHeader.customer.ilike(f"%{customer}%"))
-    if reference_no:
-        query = query.filter(ReceivingHeader.reference_no.ilike(f"%{reference_no}%"))
-    if date_from:
-        query = query.filter(ReceivingHeader.receiving_date >= date_from)
-    if date_to:
-        query = query.filter(ReceivingHeader.receiving_date <= date_to)
+@router.get("/report")
+def get_report(days: int = Query(default=30, ge=1, le=366), db: Session = Depends(get_db)):
+    """Report workspace summary from the precomputed snapshots (see report_snapshots.py)."""
+    return FastJSONResponse(report_summary(db, days))
 
+
+@router.get("/fefo")
+def get_fefo(
+    item_code: str = Query(...),
+    warehouse: str = Query(...),
+    limit: int = Query(default=10, ge=1, le=500),
+    quantity: int | None = Query(default=None, ge=1),
+    include_expired: bool = Query(default=False),
+    db: Session = Depends(get_db),
+):
+    """
+    First-expired-first-out pick list: the earliest-expiring 'ok' lines of an
+    item in a warehouse. With quantity, lines are returned until they cover it
+    (each with the "pick" amount to take from it).
+    """
+    if not settings.EXPIRY_INDEX:
+        raise HTTPException(status_code=404, detail="FEFO index is disabled (EXPIRY_INDEX=false).")
+    item_id, warehouse_id = expiry_index.resolve_codes(db, item_code, warehouse)
+    if item_id is None:
+        raise HTTPException(status_code=404, detail=f"Item not found: {item_code}")
+    if warehouse_id is None:
+        raise HTTPException(status_code=404, detail=f"Warehouse not found: {warehouse}")
+
+    index = expiry_index.ensure_built(db)
+    lines = index.fefo(
+        db, item_id, warehouse_id,
+        limit=limit if quantity is None else 500,
+        quantity=quantity,
+        from_date=date.min if include_expired else None,
+    )
+    picked = sum(line.get("pick", line["quantity"]) for line in lines)
+    return FastJSONResponse({
+        "item_code": item_code,
+        "warehouse": warehouse,
+        "lines": lines,
+        "available": picked,
+        "short": max(quantity - picked, 0) if quantity is not None else None,
+    })
+
+
+def _stock_cutoff(as_of: str | None) -> str:
+    if as_of is None:
+        return "9999-12-31 00:00:00"  # now: latest snapshot + every movement since
+    try:
+        if len(as_of) == 10:
+            return stock_ledger.cutoff_for(date.fromisoformat(as_of))
+        return datetime.fromisoformat(as_of).strftime("%Y-%m-%d %H:%M:%S")
+    except ValueError:
+        raise HTTPException(status_code=422, detail="as_of must be YYYY-MM-DD or an ISO datetime.")
+
+
+@router.get("/stock")
+def get_stock(
+    as_of: str | None = Query(default=None),
+    item_code: str | None = Query(default=None),
+    warehouse: str | None = Query(default=None),
+    location: str | None = Query(default=None),
+    fmt: str = Query(default="rows", alias="format", pattern=ROW_FORMAT_PATTERN),
+    db: Session = Depends(get_db),
+):
+    """
+    Stock per item / warehouse / location from the movement ledger. as_of = a date
+    (closing stock of that day) or a datetime; omitted → current stock.
+    """
+    cutoff = _stock_cutoff(as_of)
+    base = stock_ledger.base_snapshot(db, cutoff)
+    if base is None:
+        start = stock_ledger.history_start(db)
+        detail = f"Stock history starts at {start}." if start else "No stock snapshot has been taken yet."
+        raise HTTPException(status_code=409, detail=detail)
+
+    where = ""
+    item_id, warehouse_id = expiry_index.resolve_codes(db, item_code or "", warehouse or "")
     if item_code:
-        query = query.filter(Item.code == item_code)
+        if item_id is None:
+            raise HTTPException(status_code=404, detail=f"Item not found: {item_code}")
+        where += f" AND b.item_id = {item_id}"
     if warehouse:
-        query = query.filter(Warehouse.code == warehouse)
+        if warehouse_id is None:
+            raise HTTPException(status_code=404, detail=f"Warehouse not found: {warehouse}")
+        where += f" AND b.warehouse_id = {warehouse_id}"
     if location:
-        query = query.filter(Location.code == location)
+        locations = select(Location.id).where(Location.code == location)
+        if warehouse_id is not None:
+            locations = locations.where(Location.warehouse_id == warehouse_id)
+        location_ids = db.execute(locations).scalars().all()
+        if not location_ids:
+            raise HTTPException(status_code=404, detail=f"Location not found: {location}")
+        where += f" AND b.location_id IN ({', '.join(map(str, location_ids))})"
 
-    rows = [
-        {
-            "header_id": r.header_id,
-            "line_id": r.line_id,
-            "customer": r.customer,
-            "receiving_date": str(r.receiving_date) if r.receiving_date else None,
-            "reference_no": r.reference_no,
-            "warehouse": r.warehouse,
-            "item_code": r.item_code,
-            "location": r.location,
-            "batch_no": r.batch_no,
-            "manufacturing_date": str(r.manufacturing_date) if r.manufacturing_date else None,
-            "expiry_date": str(r.expiry_date) if r.expiry_date else None,
-            "shelf_expiry_date": str(r.shelf_expiry_date) if r.shelf_expiry_date else None,
-            "quantity": int(r.quantity or 0),
-            "status": r.status
-        }
-        for r in query.all()
-    ]
+    result = db.execute(text(stock_ledger.stock_at_sql(cutoff, where)))
+    columns = list(result.keys())
+    return FastJSONResponse({
+        "as_of": None if as_of is None else cutoff,
+        "snapshot": {"id": base.id, "taken_at": base.taken_at},
+        "replayed": stock_ledger.replay_count(db, base, cutoff),
+        **encode_rows(columns, result.all(), fmt),
+    })
 
-    return {"rows": rows}
\ No newline at end of file
@@ -0,0 +1,83 @@
+import os
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import FileResponse
+from pydantic import ValidationError
+
+from app.core import jobs
+from app.core.responses import FastJSONResponse
+from app.services import job_handlers  # noqa: F401 — registers the job kinds
+
+router = APIRouter()
+
+
+def _public(job: dict) -> dict:
+    out = {k: job[k] for k in ("id", "kind", "status", "progress", "message", "result", "error",
+                               "created", "started", "finished")}
+    out["download"] = f"/jobs/{job['id']}/result" if job["result_file"] else None
+    return out
+
+
+def _get_job(job_id: str) -> dict:
+    job = jobs.get_job_store().get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found (finished jobs expire after JOBS_TTL).")
+    return job
+
+
+@router.get("/kinds")
+def list_kinds():
+    return {"kinds": sorted(jobs.JOB_KINDS)}
+
+
+@router.post("", status_code=202)
+def submit_job(payload: dict):
+    """
+    Queue a long-running operation. Payload: { kind, params }.
+    Poll GET /jobs/{id} for status/progress; GET /jobs/{id}/result downloads the output.
+    """
+    kind = jobs.JOB_KINDS.get(payload.get("kind") or "")
+    if kind is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind. Available: {', '.join(sorted(jobs.JOB_KINDS))}")
+    try:
+        params = jobs.validate_params(kind, payload.get("params") or {})
+    except ValidationError as exc:
+        raise HTTPException(status_code=422, detail=exc.errors(include_url=False))
+
+    job_id = jobs.submit(kind.kind, params)
+    return {"job_id": job_id, "status": "queued", "poll": f"/jobs/{job_id}"}
+
+
+@router.get("")
+def list_jobs(kind: str | None = Query(default=None), limit: int = Query(default=50, ge=1, le=500)):
+    return FastJSONResponse({"jobs": [_public(j) for j in jobs.get_job_store().recent(limit, kind)]})
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str):
+    return FastJSONResponse(_public(_get_job(job_id)))
+
+
+@router.get("/{job_id}/result")
+def download_result(job_id: str):
+    job = _get_job(job_id)
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}; no result to download yet.")
+    path = job["result_file"]
+    if not path:
+        return FastJSONResponse(job["result"])
+    if not os.path.exists(path):
+        raise HTTPException(status_code=410, detail="Result file has been removed.")
+    kind = jobs.JOB_KINDS.get(job["kind"])
+    return FileResponse(
+        path,
+        media_type=kind.media_type if kind else "application/octet-stream",
+        filename=f"{job['kind']}-{job_id}{os.path.splitext(path)[1]}",
+    )
+
+
+@router.delete("/{job_id}")
+def cancel_job(job_id: str):
+    job = _get_job(job_id)
+    if not jobs.get_job_store().cancel(job_id):
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}; only queued jobs can be cancelled.")
+    return {"status": "cancelled", "job_id": job_id}
@@ -0,0 +1,272 @@
+import secrets
+from decimal import Decimal
+from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session
+from sqlalchemy import text as sa_text
+from app.services import analytics_mirror
+from app.services.query_engine import (
+    generate_sql_from_question, sanitize_sql, format_query_results, page_sql, count_sql,
+)
+from app.core.config import settings
+from app.core.metrics import stage
+from app.core.session_store import get_session_store
+from app.core.singleflight import SingleFlight, normalize_key
+from app.core.database import SessionLocal
+from app.core.responses import FastJSONResponse, ROW_FORMATS, encode_rows, dumps
+
+# /chat/query — data questions answered from the database (pattern SQL or the
+# Gemini API; no local models), mounted under /chat by "api" workers.
+router = APIRouter()
+
+# /chat/query cursors ("cursor:<token>" → {sql, columns, offset, total, source});
+# expiring and shared across workers when SESSION_STORE=sqlite.
+_sessions = get_session_store()
+
+# Dashboards opened together fire the same questions at once; duplicates that
+# arrive while one is being answered wait for it (per process, nothing cached).
+_query_flight = SingleFlight("chat_query", enabled=settings.CHAT_COALESCE)
+
+_MIRROR_GONE = "The analytics mirror this result was read from is no longer fresh. Ask the question again."
+
+
+def get_db():
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def _round_numeric(records: list, width: int) -> list:
+    """
+    Round float/Decimal cells to 2 places. Column types are detected once from
+    the first non-null value, so only numeric columns are touched; dates are
+    left for the JSON encoder.
+    """
+    numeric = []
+    for i in range(width):
+        for r in records:
+            if r[i] is not None:
+                if isinstance(r[i], (float, Decimal)):
+                    numeric.append(i)
+                break
+    if not numeric:
+        return records
+
+    out = []
+    for r in records:
+        r = list(r)
+        for i in numeric:
+            v = r[i]
+            if isinstance(v, Decimal):
+                r[i] = float(round(v, 2))
+            elif isinstance(v, float):
+                r[i] = round(v, 2)
+        out.append(r)
+    return out
+
+
+def _fetch_page(db: Session, sql: str, limit: int | None, offset: int = 0, source: str | None = None) -> tuple[list, list, str]:
+    """
+    Run one bounded page of sql, pulling rows from the driver in fetchmany chunks.
+    Aggregates go to the analytics mirror when it is on and fresh; → (columns, records, source).
+    A cursor passes the source of its first page so later pages never mix the two;
+    a mirror that can no longer answer → 409.
+    """
+    paged = page_sql(sql, limit, offset)
+    if source == "mirror" or (source is None and settings.ANALYTICS_MIRROR and analytics_mirror.routable(sql)):
+        with stage("sql_execute_mirror"):
+            mirrored = analytics_mirror.try_execute(paged)
+        if mirrored is not None:
+            columns, records = mirrored
+            return columns, _round_numeric(records, len(columns)), "mirror"
+        if source == "mirror":
+            raise HTTPException(status_code=409, detail=_MIRROR_GONE)
+    with stage("sql_execute"):
+        result = db.execute(sa_text(paged).execution_options(stream_results=True))
+        columns = list(result.keys())
+        records = []
+        while chunk := result.fetchmany(settings.QUERY_FETCH_SIZE):
+            records.extend(_round_numeric(chunk, len(columns)))
+    return columns, records, "primary"
+
+
+def _count_rows(db: Session, sql: str, source: str = "primary") -> int | None:
+    if source == "mirror":
+        counted = analytics_mirror.try_execute(count_sql(sql))
+        if counted is not None:
+            return int(counted[1][0][0] or 0)
+    try:
+        with stage("sql_count"):
+            return int(db.execute(sa_text(count_sql(sql))).scalar() or 0)
+    except Exception:
+        # e.g. duplicate column names can't be wrapped in a derived table
+        return None
+
+
+def _open_cursor(sql: str, columns: list, offset: int, total: int | None, source: str) -> str:
+    token = secrets.token_urlsafe(16)
+    _sessions.set(
+        f"cursor:{token}",
+        {"sql": sql, "columns": columns, "offset": offset, "total": total, "source": source},
+        ttl=settings.QUERY_CURSOR_TTL,
+    )
+    return token
+
+
+def _row_format(payload: dict) -> str:
+    fmt = payload.get("format") or "rows"
+    if fmt not in ROW_FORMATS:
+        raise HTTPException(status_code=422, detail=f"format must be one of: {', '.join(ROW_FORMATS)}.")
+    return fmt
+
+
+def _get_cursor(token: str | None, consume: bool = False) -> dict:
+    key = f"cursor:{token or ''}"
+    cursor = _sessions.pop(key) if consume else _sessions.get(key)
+    if not cursor:
+        raise HTTPException(status_code=404, detail="Query cursor expired or not found. Ask the question again.")
+    return cursor
+
+
+def _answer_question(db: Session, question: str) -> dict:
+    """
+    Everything /chat/query computes that is the same for every caller: SQL
+    (pattern or Gemini), the capped rows, the total and the text answer.
+    A result without "records" is a finished error reply.
+    """
+    try:
+        raw_sql, chart_type = generate_sql_from_question(question)
+        safe_sql = sanitize_sql(raw_sql)
+    except ValueError as e:
+        return {"answer": str(e), "sql": None, "rows": [], "columns": [], "chart_type": None}
+
+    try:
+        # Fetch one row past the cap to learn whether the result was cut off
+        cap = settings.QUERY_ROW_CAP
+        columns, records, source = _fetch_page(db, safe_sql, cap + 1)
+        truncated = len(records) > cap
+        records = records[:cap]
+        total = _count_rows(db, safe_sql, source) if truncated else len(records)
+
+        # The text answer only ever shows the first 20 rows
+        preview = [dict(zip(columns, r)) for r in records[:20]]
+        answer = format_query_results(question, columns, preview, total=total or len(records))
+    except Exception as exc:
+        return {"answer": f"❌ Query execution error: {exc}", "sql": raw_sql, "rows": [], "columns": [], "chart_type": None}
+
+    return {
+        "answer": answer, "sql": safe_sql,
+        "columns": columns, "chart_type": chart_type,
+        "total": total, "truncated": truncated, "source": source,
+        "records": records,
+    }
+
+
+@router.post("/query")
+def query_data(payload: dict, db: Session = Depends(get_db)):
+    question = payload.get("question", "").strip()
+    fmt = _row_format(payload)
+    if not question:
+        raise HTTPException(status_code=400, detail="No question provided.")
+
+    body, records = answer_question(db, question)
+    if records is None:
+        return body
+    body.update(encode_rows(body["columns"], records, fmt))
+    return FastJSONResponse(body)
+
+
+def answer_question(db: Session, question: str) -> tuple[dict, list | None]:
+    """
+    → (reply without rows, capped records); records is None for an error reply.
+    Shared with /chat/ask. The computation is coalesced, the cursor is not:
+    each client pages through its own copy.
+    """
+    result, _ = _query_flight.do(normalize_key(question), lambda: _answer_question(db, question))
+    if "records" not in result:
+        return dict(result), None
+    body = {k: v for k, v in result.items() if k != "records"}
+    body["next_cursor"] = (
+        _open_cursor(result["sql"], result["columns"], settings.QUERY_ROW_CAP, result["total"], result["source"])
+        if result["truncated"] else None
+    )
+    return body, result["records"]
+
+
+@router.post("/query/more")
+def query_more(payload: dict, db: Session = Depends(get_db)):
+    """
+    Next page of a capped /chat/query result.
+    Payload: { cursor, limit?, format? } — limit is clamped to QUERY_ROW_CAP.
+    """
+    token = payload.get("cursor")
+    cursor = _get_cursor(token)
+    fmt = _row_format(payload)
+    try:
+        limit = int(payload.get("limit") or settings.QUERY_ROW_CAP)
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=422, detail="limit must be an integer.")
+    limit = max(1, min(limit, settings.QUERY_ROW_CAP))
+
+    offset = cursor["offset"]
+    try:
+        columns, records, _ = _fetch_page(db, cursor["sql"], limit + 1, offset, cursor.get("source", "primary"))
+    except HTTPException:
+        _sessions.pop(f"cursor:{token}")
+        raise
+    has_more = len(records) > limit
+    records = records[:limit]
+
+    if has_more:
+        cursor["offset"] = offset + limit
+        _sessions.set(f"cursor:{token}", cursor, ttl=settings.QUERY_CURSOR_TTL)
+    else:
+        _sessions.pop(f"cursor:{token}")
+
+    body = {
+        "columns": columns, "offset": offset, "total": cursor["total"],
+        "next_cursor": token if has_more else None,
+    }
+    body.update(encode_rows(columns, records, fmt))
+    return FastJSONResponse(body)
+
+
+@router.get("/query/stream")
+def query_stream(cursor: str):
+    """
+    Stream every remaining row of a capped result as NDJSON: a {"columns": [...]}
+    line followed by one JSON array per row. Consumes the cursor.
+    """
+    entry = _get_cursor(cursor, consume=True)
+    if entry.get("source") == "mirror":
+        mirrored = analytics_mirror.try_execute(page_sql(entry["sql"], None, entry["offset"], "duckdb"))
+        if mirrored is None:
+            raise HTTPException(status_code=409, detail=_MIRROR_GONE)
+        columns, records = mirrored
+
+        def mirror_lines():
+            yield dumps({"columns": columns, "offset": entry["offset"], "total": entry["total"]}) + b"\n"
+            for i in range(0, len(records), settings.QUERY_FETCH_SIZE):
+                chunk = _round_numeric(records[i:i + settings.QUERY_FETCH_SIZE], len(columns))
+                yield b"".join(dumps(list(r)) + b"\n" for r in chunk)
+
+        return StreamingResponse(mirror_lines(), media_type="application/x-ndjson")
+
+    def lines():
+        # Own session: request dependencies are closed before the body streams
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                sa_text(page_sql(entry["sql"], None, entry["offset"], db.get_bind().dialect.name))
+                .execution_options(stream_results=True)
+            )
+            columns = list(result.keys())
+            yield dumps({"columns": columns, "offset": entry["offset"], "total": entry["total"]}) + b"\n"
+            while chunk := result.fetchmany(settings.QUERY_FETCH_SIZE):
+                yield b"".join(dumps(list(r)) + b"\n" for r in _round_numeric(chunk, len(columns)))
+        finally:
+            db.close()
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
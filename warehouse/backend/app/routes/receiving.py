@@ -1,18 +1,32 @@
+from collections import defaultdict
 from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy import select, delete, exists, insert, update
 from sqlalchemy.orm import Session
 from app.core.database import SessionLocal
 from app.schemas.receiving import (
     ReceivingPayload,
     ReceivingLineUpdatePayload,
     ReceivingHeaderUpdatePayload,
+    ReceivingLineBulkUpdatePayload,
+    ReceivingHeaderBulkUpdatePayload,
+    BulkLineDeletePayload,
+    BulkReferenceDeletePayload,
+    SmartReceivePayload,
 )
 from app.models.item import Item
 from app.models.warehouse import Warehouse
 from app.models.location import Location
 from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.services import stock_ledger as ledger
+from app.services.expiry_index import EXPIRY_INDEX
+from app.services.receiving import create_receiving, item_id, smart_receive
+from app.services.report_snapshots import mark_headers, mark_lines
 
 router = APIRouter()
 
+# Ids / references per set-based statement (and per transaction) in bulk endpoints
+_BULK_BATCH = 500
+
 def get_db():
     db = SessionLocal()
     try:
@@ -24,56 +38,19 @@ def get_db():
 def confirm_receiving(payload: ReceivingPayload, db: Session = Depends(get_db)):
     """
     Create a receiving header and lines from the payload.
+    Large payloads can go through POST /jobs (kind "receiving.confirm") instead.
     """
-    warehouse = db.query(Warehouse).filter(Warehouse.code == payload.warehouse).first()
-    if not warehouse:
-        raise HTTPException(status_code=404, detail="Warehouse not found")
-
-    header = ReceivingHeader(
-        customer=payload.customer,
-        receiving_date=payload.receiving_date,
-        warehouse_id=warehouse.id,
-        reference_no=payload.reference_no
-    )
-    db.add(header)
-    db.flush()  # ensure header.id is available
-
-    for line in payload.items:
-        item_code = (line.item_code or "").strip()
-        if not item_code:
-            raise HTTPException(status_code=400, detail="Item code is required for each line")
-
-        # Ensure item exists (create if missing)
-        item = db.query(Item).filter(Item.code == item_code).first()
-        if not item:
-            item = Item(code=item_code, name=item_code)
-            db.add(item)
-            db.flush()
-
-        # Ensure location exists and belongs to the warehouse
-        location = db.query(Location).filter(
-            Location.code == line.location,
-            Location.warehouse_id == warehouse.id
-        ).first()
-        if not location:
-            raise HTTPException(status_code=404, detail=f"Location not found: {line.location}")
-
-        db.add(ReceivingLine(
-            receiving_id=header.id,
-            item_id=item.id,
-            location_id=location.id,
-            quantity=line.quantity,
-            batch_no=line.batch_no,
-            manufacturing_date=line.manufacturing_date,
-            expiry_date=line.expiry_date,
-            shelf_expiry_date=line.shelf_expiry_date,
-            status=line.status
-        ))
+    return create_receiving(db, payload)
 
-    db.commit()
-    db.refresh(header)
 
-    return {"status": "success", "grn_id": header.id}
+@router.post("/smart-receive")
+def smart_receive_line(payload: SmartReceivePayload, db: Session = Depends(get_db)):
+    """
+    Receive one line from chat slots in a single round trip: header, line and
+    stock movement committed together. Missing optional slots are defaulted
+    (first location of the warehouse, "Walk-in", a generated SR- reference).
+    """
+    return smart_receive(db, payload)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -111,13 +88,6 @@ def add_line_to_header(payload: dict, db: Session = Depends(get_db)):
     if status not in ("ok", "damaged"):
         raise HTTPException(status_code=400, detail="status must be 'ok' or 'damaged'.")
 
-    # Ensure item exists (create if missing)
-    item = db.query(Item).filter(Item.code == item_code).first()
-    if not item:
-        item = Item(code=item_code, name=item_code)
-        db.add(item)
-        db.flush()
-
     # Ensure location exists for the header's warehouse
     location = db.query(Location).filter(
         Location.code == location_code,
@@ -143,7 +113,7 @@ def add_line_to_header(payload: dict, db: Session = Depends(get_db)):
 
     new_line = ReceivingLine(
         receiving_id=header.id,
-        item_id=item.id,
+        item_id=item_id(db, item_code),  # created if missing
         location_id=location.id,
         quantity=int(quantity),
         status=status,
@@ -153,8 +123,12 @@ def add_line_to_header(payload: dict, db: Session = Depends(get_db)):
         shelf_expiry_date=parse_date(payload.get("shelf_expiry_date")),
     )
     db.add(new_line)
+    mark_headers(db, [header.id])
+    db.flush()
+    ledger.record(db, {}, "receive", line_ids=[new_line.id])
     db.commit()
     db.refresh(new_line)
+    EXPIRY_INDEX.refresh_lines(db, [new_line.id])
 
     return {
         "status": "success",
@@ -172,6 +146,7 @@ def update_line(line_id: int, payload: ReceivingLineUpdatePayload, db: Session =
     line = db.query(ReceivingLine).filter(ReceivingLine.id == line_id).first()
     if not line:
         raise HTTPException(status_code=404, detail="Line not found")
+    before = ledger.capture(db, line_ids=[line_id])
 
     # Optional: update item if item_code is supplied
     item_code = getattr(payload, "item_code", None)
@@ -213,8 +188,11 @@ def update_line(line_id: int, payload: ReceivingLineUpdatePayload, db: Session =
     if getattr(payload, "status", None) is not None:
         line.status = payload.status
 
+    mark_lines(db, [line_id])
+    ledger.record(db, before, "edit")
     db.commit()
     db.refresh(line)
+    EXPIRY_INDEX.refresh_lines(db, [line_id])
     return {"status": "success", "line_id": line_id}
 
 @router.patch("/headers/{header_id}")
@@ -222,6 +200,8 @@ def update_header(header_id: int, payload: ReceivingHeaderUpdatePayload, db: Ses
     header = db.query(ReceivingHeader).filter(ReceivingHeader.id == header_id).first()
     if not header:
         raise HTTPException(status_code=404, detail="Header not found")
+    mark_headers(db, [header_id])  # the date it is leaving
+    before = ledger.capture(db, header_ids=[header_id])
 
     if getattr(payload, "customer", None) is not None:
         header.customer = payload.customer
@@ -235,65 +215,355 @@ def update_header(header_id: int, payload: ReceivingHeaderUpdatePayload, db: Ses
             raise HTTPException(status_code=404, detail="Warehouse not found")
         header.warehouse_id = warehouse.id
 
+    if getattr(payload, "receiving_date", None) is not None:
+        db.flush()
+        mark_headers(db, [header_id])  # ... and the one it moves to
+    ledger.record(db, before, "edit")
     db.commit()
     db.refresh(header)
+    EXPIRY_INDEX.refresh_headers(db, [header_id])
     return {"status": "success", "header_id": header_id}
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Deletes — set-based: one DELETE per table per batch, one transaction per batch
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _batches(values: list, size: int = _BULK_BATCH):
+    for i in range(0, len(values), size):
+        yield values[i:i + size]
+
+
+def _reference_key(reference_no: str) -> str:
+    # Must match the reference_key column expression LOWER(TRIM(reference_no))
+    return reference_no.strip().lower()
+
+
+def _delete_empty_headers(db: Session, header_ids) -> int:
+    """Delete the given headers that no longer have any lines."""
+    if not header_ids:
+        return 0
+    return db.execute(
+        delete(ReceivingHeader)
+        .where(ReceivingHeader.id.in_(header_ids))
+        .where(~exists().where(ReceivingLine.receiving_id == ReceivingHeader.id))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+
+
+def _delete_headers_with_lines(db: Session, header_ids) -> int:
+    """Delete headers and all their lines; returns the number of lines removed."""
+    mark_headers(db, header_ids)
+    before = ledger.capture(db, header_ids=header_ids)
+    lines = db.execute(
+        delete(ReceivingLine)
+        .where(ReceivingLine.receiving_id.in_(header_ids))
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    db.execute(
+        delete(ReceivingHeader)
+        .where(ReceivingHeader.id.in_(header_ids))
+        .execution_options(synchronize_session=False)
+    )
+    ledger.record(db, before, "delete")
+    return lines
+
+
 @router.delete("/lines/{line_id}")
 def delete_line(line_id: int, db: Session = Depends(get_db)):
     """
     Delete a receiving line. If it was the last line for the header, also delete the header.
     """
-    line = db.query(ReceivingLine).filter(ReceivingLine.id == line_id).first()
-    if not line:
+    receiving_id = db.execute(
+        select(ReceivingLine.receiving_id).where(ReceivingLine.id == line_id)
+    ).scalar()
+    if receiving_id is None:
         raise HTTPException(status_code=404, detail="Line not found")
 
-    receiving_id = line.receiving_id
-
-    # Delete the line
-    db.delete(line)
+    mark_lines(db, [line_id])
+    before = ledger.capture(db, line_ids=[line_id])
+    db.execute(
+        delete(ReceivingLine)
+        .where(ReceivingLine.id == line_id)
+        .execution_options(synchronize_session=False)
+    )
+    ledger.record(db, before, "delete")
+    _delete_empty_headers(db, [receiving_id])
     db.commit()
 
-    # If no remaining lines for the header, remove the header too
-    remaining = db.query(ReceivingLine).filter(ReceivingLine.receiving_id == receiving_id).count()
-    if remaining == 0:
-        header = db.query(ReceivingHeader).filter(ReceivingHeader.id == receiving_id).first()
-        if header:
-            db.delete(header)
-            db.commit()
-
     return {"status": "deleted", "deleted_line": line_id, "receiving_id": receiving_id}
 
+@router.post("/lines/bulk-delete")
+def delete_lines_bulk(payload: BulkLineDeletePayload, db: Session = Depends(get_db)):
+    """
+    Delete many lines by id. Headers left without lines are removed too.
+    Payload: { line_ids: [..] }
+    """
+    line_ids = sorted(set(payload.line_ids))
+    if not line_ids:
+        raise HTTPException(status_code=400, detail="line_ids must not be empty.")
+
+    deleted_lines = deleted_headers = 0
+    for batch in _batches(line_ids):
+        header_ids = db.execute(
+            select(ReceivingLine.receiving_id).where(ReceivingLine.id.in_(batch)).distinct()
+        ).scalars().all()
+        mark_headers(db, header_ids)
+        before = ledger.capture(db, line_ids=batch)
+        deleted_lines += db.execute(
+            delete(ReceivingLine)
+            .where(ReceivingLine.id.in_(batch))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        ledger.record(db, before, "delete")
+        deleted_headers += _delete_empty_headers(db, header_ids)
+        db.commit()
+
+    return {
+        "status": "deleted",
+        "deleted_lines": deleted_lines,
+        "deleted_headers": deleted_headers,
+        "not_found": len(line_ids) - deleted_lines,
+    }
+
 @router.delete("/headers/by-ref/{reference_no}")
 def delete_by_reference(reference_no: str, db: Session = Depends(get_db)):
     """
     Delete all headers matching reference_no (case-insensitive, whitespace-trimmed).
     PO-01 will match po-01 or "PO-01 " with trailing spaces in the database.
     """
-    from sqlalchemy import func as sql_func
-    ref_clean = reference_no.strip()
+    header_ids = db.execute(
+        select(ReceivingHeader.id).where(ReceivingHeader.reference_key == _reference_key(reference_no))
+    ).scalars().all()
 
-    headers = db.query(ReceivingHeader).filter(
-        sql_func.lower(sql_func.trim(ReceivingHeader.reference_no)) == ref_clean.lower()
-    ).all()
-
-    if not headers:
+    if not header_ids:
         raise HTTPException(
             status_code=404,
             detail=f"No record found with reference '{reference_no}'. Check the reference number and try again."
         )
 
-    total_lines = 0
-    for header in headers:
-        total_lines += db.query(ReceivingLine).filter(
-            ReceivingLine.receiving_id == header.id
-        ).delete(synchronize_session=False)
-        db.delete(header)
-
+    total_lines = _delete_headers_with_lines(db, header_ids)
     db.commit()
     return {
         "status": "deleted",
         "reference_no": reference_no,
-        "deleted_headers": len(headers),
+        "deleted_headers": len(header_ids),
         "deleted_lines": total_lines
-    }
\ No newline at end of file
+    }
+
+@router.post("/headers/bulk-delete-by-ref")
+def delete_by_references_bulk(payload: BulkReferenceDeletePayload, db: Session = Depends(get_db)):
+    """
+    Delete every header (and its lines) matching any of the references,
+    same matching rules as /headers/by-ref. Payload: { references: [..] }
+    """
+    keys = sorted({_reference_key(r) for r in payload.references if r and r.strip()})
+    if not keys:
+        raise HTTPException(status_code=400, detail="references must not be empty.")
+
+    found: set[str] = set()
+    deleted_headers = deleted_lines = 0
+    for batch in _batches(keys):
+        rows = db.execute(
+            select(ReceivingHeader.id, ReceivingHeader.reference_key)
+            .where(ReceivingHeader.reference_key.in_(batch))
+        ).all()
+        if not rows:
+            continue
+        found.update(r.reference_key for r in rows)
+        deleted_lines += _delete_headers_with_lines(db, [r.id for r in rows])
+        deleted_headers += len(rows)
+        db.commit()
+
+    return {
+        "status": "deleted",
+        "deleted_headers": deleted_headers,
+        "deleted_lines": deleted_lines,
+        "not_found": [k for k in keys if k not in found],
+    }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Bulk updates — codes resolved set-wise, whole batch in one transaction
+# ─────────────────────────────────────────────────────────────────────────────
+
+_LINE_FIELDS = ("batch_no", "manufacturing_date", "expiry_date", "shelf_expiry_date", "quantity", "status")
+_HEADER_FIELDS = ("customer", "receiving_date", "reference_no")
+
+
+def _match_codes(rows, codes) -> dict:
+    """
+    Map requested codes to ids from (code, id) rows. Exact match first, then
+    case-insensitive — MySQL's default collation returns 'WRENCH' for 'wrench'.
+    """
+    exact = {code: id_ for code, id_ in rows}
+    folded = {code.lower(): id_ for code, id_ in rows}
+    return {c: exact.get(c, folded.get(c.lower())) for c in codes}
+
+
+def _ensure_items(db: Session, codes: set) -> dict:
+    """Item code → id, creating missing items with a single INSERT."""
+    if not codes:
+        return {}
+    found = _match_codes(db.execute(select(Item.code, Item.id).where(Item.code.in_(codes))).all(), codes)
+    missing = sorted(c for c, id_ in found.items() if id_ is None)
+    if missing:
+        db.execute(insert(Item), [{"code": c, "name": c} for c in missing])
+        found.update(_match_codes(
+            db.execute(select(Item.code, Item.id).where(Item.code.in_(missing))).all(), missing
+        ))
+    return found
+
+
+def _resolve_locations(db: Session, keys: set) -> dict:
+    """(warehouse_id, location code) → location id (None when missing)."""
+    if not keys:
+        return {}
+    rows = db.execute(
+        select(Location.warehouse_id, Location.code, Location.id).where(
+            Location.warehouse_id.in_({wh for wh, _ in keys}),
+            Location.code.in_({code for _, code in keys}),
+        )
+    ).all()
+    by_wh = defaultdict(list)
+    for wh, code, id_ in rows:
+        by_wh[wh].append((code, id_))
+    resolved = {}
+    for wh, code in keys:
+        resolved[(wh, code)] = _match_codes(by_wh[wh], [code])[code]
+    return resolved
+
+
+def _bulk_update(db: Session, model, changes: dict) -> None:
+    """
+    Rows sharing an identical change set → one UPDATE ... WHERE id IN (..);
+    the rest → a single executemany UPDATE by primary key.
+    """
+    groups = defaultdict(list)
+    for pk, values in changes.items():
+        groups[tuple(sorted(values.items()))].append(pk)
+
+    singles = []
+    for key, pks in groups.items():
+        if len(pks) == 1:
+            singles.append({"id": pks[0], **dict(key)})
+            continue
+        for batch in _batches(pks):
+            db.execute(
+                update(model)
+                .where(model.id.in_(batch))
+                .values(dict(key))
+                .execution_options(synchronize_session=False)
+            )
+    if singles:
+        db.execute(update(model), singles)
+
+
+def _bulk_result(results: list) -> dict:
+    updated = sum(r["status"] == "updated" for r in results)
+    return {
+        "status": "success" if updated == len(results) else "partial",
+        "updated": updated,
+        "failed": len(results) - updated,
+        "results": results,
+    }
+
+
+@router.patch("/lines")
+def update_lines_bulk(payload: ReceivingLineBulkUpdatePayload, db: Session = Depends(get_db)):
+    """
+    Update many lines in one transaction.
+    Payload: { lines: { "<line_id>": { ...same fields as PATCH /lines/{line_id} } } }
+    Lines that fail validation are reported per line and skipped; the rest are applied.
+    """
+    if not payload.lines:
+        raise HTTPException(status_code=400, detail="lines must not be empty.")
+    updates = {line_id: p.model_dump(exclude_none=True) for line_id, p in payload.lines.items()}
+
+    # line id → warehouse of its header (locations are per warehouse)
+    line_wh = {}
+    for batch in _batches(list(updates)):
+        line_wh.update(db.execute(
+            select(ReceivingLine.id, ReceivingHeader.warehouse_id)
+            .join(ReceivingHeader, ReceivingLine.receiving_id == ReceivingHeader.id)
+            .where(ReceivingLine.id.in_(batch))
+        ).all())
+
+    items = _ensure_items(db, {
+        u["item_code"].strip() for lid, u in updates.items()
+        if lid in line_wh and (u.get("item_code") or "").strip()
+    })
+    locations = _resolve_locations(db, {
+        (line_wh[lid], u["location"]) for lid, u in updates.items() if lid in line_wh and "location" in u
+    })
+
+    results, changes = [], {}
+    for line_id, u in updates.items():
+        if line_id not in line_wh:
+            results.append({"line_id": line_id, "status": "error", "detail": "Line not found"})
+            continue
+        values = {k: u[k] for k in _LINE_FIELDS if k in u}
+        item_code = (u.get("item_code") or "").strip()
+        if item_code:
+            values["item_id"] = items[item_code]
+        if "location" in u:
+            location_id = locations.get((line_wh[line_id], u["location"]))
+            if location_id is None:
+                results.append({"line_id": line_id, "status": "error", "detail": f"Location not found: {u['location']}"})
+                continue
+            values["location_id"] = location_id
+        if values:
+            changes[line_id] = values
+        results.append({"line_id": line_id, "status": "updated"})
+
+    mark_lines(db, list(changes))
+    before = ledger.capture(db, line_ids=list(changes))
+    _bulk_update(db, ReceivingLine, changes)
+    ledger.record(db, before, "edit")
+    db.commit()
+    EXPIRY_INDEX.refresh_lines(db, list(changes))
+    return _bulk_result(results)
+
+
+@router.patch("/headers")
+def update_headers_bulk(payload: ReceivingHeaderBulkUpdatePayload, db: Session = Depends(get_db)):
+    """
+    Update many headers in one transaction.
+    Payload: { headers: { "<header_id>": { customer?, warehouse?, receiving_date?, reference_no? } } }
+    """
+    if not payload.headers:
+        raise HTTPException(status_code=400, detail="headers must not be empty.")
+    updates = {header_id: p.model_dump(exclude_none=True) for header_id, p in payload.headers.items()}
+
+    existing = set()
+    for batch in _batches(list(updates)):
+        existing.update(db.execute(select(ReceivingHeader.id).where(ReceivingHeader.id.in_(batch))).scalars())
+
+    wh_codes = {u["warehouse"] for u in updates.values() if "warehouse" in u}
+    warehouses = _match_codes(
+        db.execute(select(Warehouse.code, Warehouse.id).where(Warehouse.code.in_(wh_codes))).all(), wh_codes
+    ) if wh_codes else {}
+
+    results, changes = [], {}
+    for header_id, u in updates.items():
+        if header_id not in existing:
+            results.append({"header_id": header_id, "status": "error", "detail": "Header not found"})
+            continue
+        values = {k: u[k] for k in _HEADER_FIELDS if k in u}
+        if "warehouse" in u:
+            if warehouses.get(u["warehouse"]) is None:
+                results.append({"header_id": header_id, "status": "error", "detail": "Warehouse not found"})
+                continue
+            values["warehouse_id"] = warehouses[u["warehouse"]]
+        if values:
+            changes[header_id] = values
+        results.append({"header_id": header_id, "status": "updated"})
+
+    moved = [h for h, values in changes.items() if "warehouse_id" in values]
+    mark_headers(db, list(changes))
+    before = ledger.capture(db, header_ids=moved)
+    _bulk_update(db, ReceivingHeader, changes)
+    mark_headers(db, [h for h, values in changes.items() if "receiving_date" in values])
+    ledger.record(db, before, "edit")
+    db.commit()
+    EXPIRY_INDEX.refresh_headers(db, moved)
+    return _bulk_result(results)
@@ -0,0 +1,19 @@
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from starlette.concurrency import run_in_threadpool
+from app.services.whisper_ai import transcribe_audio_bytes
+
+# Speech-to-text: importing this module loads the Whisper model, so it is
+# mounted (under /chat) only by "voice" workers.
+router = APIRouter()
+
+
+@router.post("/transcribe")
+async def transcribe_audio(file: UploadFile = File(...)):
+    try:
+        audio_bytes = await file.read()
+        # in the threadpool: inference must not block the event loop, and
+        # concurrent clips are what the tier choice measures as queue depth
+        text = await run_in_threadpool(transcribe_audio_bytes, audio_bytes)
+        return {"text": text}
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Optional, List
+from pydantic import AliasChoices, BaseModel, Field, field_validator
+from typing import Optional, List, Dict
 from datetime import date
 
 class ReceivingLinePayload(BaseModel):
@@ -29,8 +29,41 @@ class ReceivingLineUpdatePayload(BaseModel):
     expiry_date: Optional[date] = None
     shelf_expiry_date: Optional[date] = None
 
+class ReceivingLineBulkUpdatePayload(BaseModel):
+    lines: Dict[int, ReceivingLineUpdatePayload]
+
+class BulkLineDeletePayload(BaseModel):
+    line_ids: List[int]
+
+class BulkReferenceDeletePayload(BaseModel):
+    references: List[str]
+
 class ReceivingHeaderUpdatePayload(BaseModel):
     customer: Optional[str] = None
     warehouse: Optional[str] = None
     receiving_date: Optional[date] = None
-    reference_no: Optional[str] = None
\ No newline at end of file
+    reference_no: Optional[str] = None
+
+class ReceivingHeaderBulkUpdatePayload(BaseModel):
+    headers: Dict[int, ReceivingHeaderUpdatePayload]
+
+class SmartReceivePayload(BaseModel):
+    """extract_slots output (or the chat card's fields); only item, quantity and warehouse are required."""
+    item_code: Optional[str] = None
+    item_name: Optional[str] = None
+    quantity: Optional[int] = None
+    warehouse: Optional[str] = None
+    location: Optional[str] = None
+    customer: Optional[str] = None
+    reference_no: Optional[str] = None
+    batch_no: Optional[str] = Field(None, validation_alias=AliasChoices("batch_no", "batch"))
+    status: Optional[str] = None
+    receiving_date: Optional[date] = None
+    manufacturing_date: Optional[date] = Field(None, validation_alias=AliasChoices("manufacturing_date", "mfg_date"))
+    expiry_date: Optional[date] = None
+    shelf_expiry_date: Optional[date] = None
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def _blank_is_missing(cls, value):
+        return None if isinstance(value, str) and not value.strip() else value
@@ -0,0 +1,392 @@
+"""
+analytics_mirror.py — columnar copy of the receiving tables for aggregate queries
+=================================================================================
+Trend, ranking and ABC questions are GROUP BYs over every receiving line; on
+the primary they are row-store scans that compete with OLTP writes. With
+ANALYTICS_MIRROR on, /chat/query sends read-only aggregates over the mirrored
+tables to DuckDB instead:
+
+  syncer  — whichever process opens ANALYTICS_MIRROR_DIR/mirror.duckdb first
+            (DuckDB's file lock makes it exclusive). Every ANALYTICS_MIRROR_SYNC
+            seconds it copies rows changed since the last run (updated_at
+            watermark; deleted lines via the stock ledger's delete movements),
+            reloads the small dimension tables whole, then exports each changed
+            table to <table>.parquet (written aside, swapped in atomically).
+  readers — every process (the syncer too) queries the Parquet files through
+            an in-memory DuckDB, so any number of workers can read while the
+            syncer writes.
+
+MySQL-only functions are rewritten by to_duckdb() (CURDATE, DATEDIFF,
+DATE_FORMAT, DATE_ADD/DATE_SUB, case-insensitive LIKE). Results are at most
+ANALYTICS_MIRROR_MAX_LAG old; beyond that, or on any mirror error, queries
+run on the primary as before.
+
+Requires `pip install duckdb` (optional dependency).
+"""
+
+import csv
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, Date, Integer, BigInteger, func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.item import Item
+from app.models.location import Location
+from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.models.stock_ledger import StockMovement
+from app.models.warehouse import Warehouse
+
+duckdb = None
+if settings.ANALYTICS_MIRROR:  # ~30 MB resident once imported, so only when switched on
+    try:
+        import duckdb
+    except ImportError:  # optional: the mirror stays off without it
+        duckdb = None
+
+logger = logging.getLogger(__name__)
+
+_CHUNK = 50_000
+_NULL = "\\N"
+DIMENSIONS = (Warehouse, Location, Item)          # small: reloaded whole every sync
+FACTS = (ReceivingHeader, ReceivingLine)          # incremental by updated_at
+MIRRORED = {m.__tablename__ for m in DIMENSIONS + FACTS}
+
+
+def _duck_type(column) -> str:
+    t = column.type
+    if isinstance(t, (Integer, BigInteger)):
+        return "BIGINT"
+    if isinstance(t, DateTime):
+        return "TIMESTAMP"
+    if isinstance(t, Date):
+        return "DATE"
+    return "VARCHAR"
+
+
+def _as_datetime(value):
+    # SQLite hands CURRENT_TIMESTAMP back as text
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Dialect adapter — MySQL → DuckDB
+# ─────────────────────────────────────────────────────────────────────────────
+
+_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'")
+_FUNC_RE = re.compile(r"\b(DATEDIFF|DATE_FORMAT|DATE_ADD|DATE_SUB|CURDATE)\s*\(", re.I)
+# MySQL DATE_FORMAT specifiers that differ in strftime
+_FORMAT_MAP = {"%i": "%M", "%M": "%B", "%W": "%A", "%e": "%-d", "%c": "%-m", "%s": "%S", "%h": "%I"}
+
+
+def _split_args(body: str) -> list[str]:
+    args, depth, start = [], 0, 0
+    for i, ch in enumerate(body):
+        if ch == "(":
+            depth += 1
+        elif ch == ")":
+            depth -= 1
+        elif ch == "," and depth == 0:
+            args.append(body[start:i].strip())
+            start = i + 1
+    args.append(body[start:].strip())
+    return args
+
+
+def _rewrite_calls(sql: str, literals: list[str]) -> str:
+    out, pos = [], 0
+    while m := _FUNC_RE.search(sql, pos):
+        depth, end = 1, m.end()
+        while end < len(sql) and depth:
+            depth += {"(": 1, ")": -1}.get(sql[end], 0)
+            end += 1
+        args = [_rewrite_calls(a, literals) for a in _split_args(sql[m.end():end - 1])]
+        name = m.group(1).upper()
+        if name == "CURDATE":
+            call = "current_date"
+        elif name == "DATEDIFF" and len(args) == 2:
+            call = f"(CAST({args[0]} AS DATE) - CAST({args[1]} AS DATE))"
+        elif name == "DATE_FORMAT" and len(args) == 2:
+            fmt = args[1]
+            if re.fullmatch(r"\x00\d+\x00", fmt):
+                n = int(fmt.strip("\x00"))
+                literals[n] = re.sub(r"%[a-zA-Z]", lambda s: _FORMAT_MAP.get(s.group(0), s.group(0)), literals[n])
+            call = f"strftime({args[0]}, {fmt})"
+        elif name in ("DATE_ADD", "DATE_SUB") and len(args) == 2:
+            call = f"({args[0]} {'+' if name == 'DATE_ADD' else '-'} {args[1]})"
+        else:
+            call = sql[m.start():end]
+        out.append(sql[pos:m.start()] + call)
+        pos = end
+    out.append(sql[pos:])
+    return "".join(out)
+
+
+def to_duckdb(sql: str) -> str:
+    """Rewrite the MySQL dialect used by the query engine (and Gemini) for DuckDB."""
+    literals: list[str] = []
+
+    def stash(m):
+        literals.append(m.group(0))
+        return f"\x00{len(literals) - 1}\x00"
+
+    s = _LITERAL_RE.sub(stash, sql)
+    s = s.replace("`", '"')
+    s = _rewrite_calls(s, literals)
+    s = re.sub(r"\bLIKE\b", "ILIKE", s, flags=re.I)          # MySQL's default collation is case-insensitive
+    return re.sub(r"\x00(\d+)\x00", lambda m: literals[int(m.group(1))], s)
+
+
+_TABLE_RE = re.compile(r"\b(?:FROM|JOIN)\s+([`\"\w.]+)", re.I)
+_AGGREGATE_RE = re.compile(r"\bGROUP\s+BY\b|\b(?:COUNT|SUM|AVG|MIN|MAX)\s*\(", re.I)
+
+
+def routable(sql: str) -> bool:
+    """A read-only aggregate that touches only mirrored tables."""
+    tables = {t.strip('`"').split(".")[-1].lower() for t in _TABLE_RE.findall(sql)}
+    return bool(tables) and tables <= MIRRORED and bool(_AGGREGATE_RE.search(sql))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Syncer — one process owns mirror.duckdb
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _paths() -> tuple[str, str]:
+    root = settings.ANALYTICS_MIRROR_DIR
+    return os.path.join(root, "mirror.duckdb"), os.path.join(root, "manifest.json")
+
+
+def _parquet(table: str) -> str:
+    return os.path.join(settings.ANALYTICS_MIRROR_DIR, f"{table}.parquet")
+
+
+class MirrorSyncer:
+    def __init__(self, con):
+        self.con = con
+        self.staging = os.path.join(settings.ANALYTICS_MIRROR_DIR, "staging.csv").replace("'", "''")
+        for model in DIMENSIONS + FACTS:
+            cols = ", ".join(f'"{c.name}" {_duck_type(c)}' for c in model.__table__.columns)
+            con.execute(f"CREATE TABLE IF NOT EXISTS {model.__tablename__} ({cols})")
+        con.execute("CREATE TABLE IF NOT EXISTS _mirror_state (name VARCHAR PRIMARY KEY, watermark TIMESTAMP, movement_id BIGINT)")
+
+    def _load(self, model, rows, replace: bool) -> None:
+        """
+        Insert rows (tuples in column order); replace → delete rows with the same ids first.
+        Staged through a CSV file: DuckDB's bulk reader is far faster than binding Python values.
+        """
+        table = model.__tablename__
+        columns = ", ".join(f"'{c.name}': '{_duck_type(c)}'" for c in model.__table__.columns)
+        with open(self.staging, "w", newline="", encoding="utf-8") as fh:
+            csv.writer(fh).writerows([_NULL if v is None else v for v in row] for row in rows)
+        self.con.execute(
+            f"CREATE OR REPLACE TEMP TABLE _chunk AS SELECT * FROM read_csv('{self.staging}',"
+            f" header = false, columns = {{{columns}}}, nullstr = '{_NULL}', quote = '\"', escape = '\"')"
+        )
+        if replace:
+            self.con.execute(f"DELETE FROM {table} WHERE id IN (SELECT id FROM _chunk)")
+        self.con.execute(f"INSERT INTO {table} SELECT * FROM _chunk")
+
+    def _state(self, name: str):
+        return self.con.execute("SELECT watermark, movement_id FROM _mirror_state WHERE name = ?", [name]).fetchone()
+
+    def sync(self, db: Session) -> dict:
+        changed: dict[str, int] = {}
+        self.con.execute("BEGIN")
+        try:
+            # deletes first: on the very first sync this pins the ledger head before the full copy
+            changed["deleted"] = self._apply_deletes(db)
+            for model in DIMENSIONS:
+                rows = db.execute(select(*model.__table__.columns)).all()
+                self.con.execute(f"DELETE FROM {model.__tablename__}")
+                if rows:
+                    self._load(model, rows, replace=False)
+                changed[model.__tablename__] = len(rows)
+
+            now = _as_datetime(db.execute(select(func.now())).scalar())
+            for model in FACTS:
+                table = model.__tablename__
+                state = self._state(table)
+                query = select(*model.__table__.columns)
+                if state and state[0] is not None:
+                    since = state[0] - timedelta(seconds=settings.ANALYTICS_MIRROR_OVERLAP)
+                    query = query.where(model.updated_at >= since)
+                # read before the rows: anything committed meanwhile is re-read next time (overlap)
+                latest = _as_datetime(db.execute(select(func.max(model.updated_at))).scalar())
+                if latest is not None and now is not None:
+                    latest = min(latest, now)  # a future-dated row must not push the watermark past new rows
+                count = 0
+                result = db.execute(query.execution_options(stream_results=True))
+                while chunk := result.fetchmany(_CHUNK):
+                    self._load(model, chunk, replace=state is not None)
+                    count += len(chunk)
+                if state and state[0] is not None and (latest is None or latest < state[0]):
+                    latest = state[0]
+                self.con.execute("INSERT OR REPLACE INTO _mirror_state VALUES (?, ?, NULL)", [table, latest])
+                if count:
+                    changed[table] = count
+            self.con.execute("COMMIT")
+        except Exception:
+            self.con.execute("ROLLBACK")
+            raise
+
+        for model in DIMENSIONS + FACTS:
+            table = model.__tablename__
+            if changed.get(table) or (changed["deleted"] and model in FACTS) or not os.path.exists(_parquet(table)):
+                tmp = _parquet(table) + ".tmp"
+                self.con.execute(f"COPY {table} TO '{tmp}' (FORMAT parquet)")
+                os.replace(tmp, _parquet(table))
+        _, manifest = _paths()
+        with open(manifest + ".tmp", "w") as fh:
+            json.dump({"synced_at": time.time(), "changed": changed}, fh)
+        os.replace(manifest + ".tmp", manifest)
+        return changed
+
+    def _apply_deletes(self, db: Session) -> int:
+        """
+        Lines (and emptied headers) deleted on the primary, found through the ledger's delete movements.
+        Movement ids are allocated at INSERT, so a lower id can commit after the watermark passed it:
+        delete movements within ANALYTICS_MIRROR_OVERLAP are re-read too (re-applying one is a no-op).
+        """
+        state = self._state("deletes")
+        if state is None:
+            # first sync copied the current tables; start from the ledger's head
+            head = db.execute(select(func.max(StockMovement.id))).scalar() or 0
+            self.con.execute("INSERT OR REPLACE INTO _mirror_state VALUES ('deletes', NULL, ?)", [head])
+            return 0
+        now = _as_datetime(db.execute(select(func.now())).scalar())
+        since = now - timedelta(seconds=settings.ANALYTICS_MIRROR_OVERLAP)
+        moves = db.execute(
+            select(StockMovement.id, StockMovement.line_id, StockMovement.receiving_id)
+            .where(or_(StockMovement.id > state[1], StockMovement.moved_at >= since), StockMovement.reason == "delete")
+        ).all()
+        if not moves:
+            return 0
+        line_ids = sorted({m.line_id for m in moves})
+        header_ids = sorted({m.receiving_id for m in moves})
+        live_lines = set(db.execute(select(ReceivingLine.id).where(ReceivingLine.id.in_(line_ids))).scalars())
+        live_headers = set(db.execute(select(ReceivingHeader.id).where(ReceivingHeader.id.in_(header_ids))).scalars())
+        gone_lines = [i for i in line_ids if i not in live_lines]
+        gone_headers = [i for i in header_ids if i not in live_headers]
+        deleted = 0
+        if gone_lines:
+            deleted += self.con.execute(f"DELETE FROM receiving_lines WHERE id IN ({', '.join(map(str, gone_lines))})").fetchone()[0]
+        if gone_headers:
+            deleted += self.con.execute(f"DELETE FROM receiving_headers WHERE id IN ({', '.join(map(str, gone_headers))})").fetchone()[0]
+        head = max(state[1], max(m.id for m in moves))
+        self.con.execute("UPDATE _mirror_state SET movement_id = ? WHERE name = 'deletes'", [head])
+        return deleted
+
+
+_syncer: MirrorSyncer | None = None
+_syncer_lock = threading.Lock()
+
+
+def _get_syncer() -> MirrorSyncer | None:
+    """The syncer if this process holds (or can take) the mirror.duckdb lock."""
+    global _syncer
+    with _syncer_lock:
+        if _syncer is None:
+            path, _ = _paths()
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            try:
+                _syncer = MirrorSyncer(duckdb.connect(path))
+            except duckdb.IOException:
+                return None  # another worker is the syncer
+        return _syncer
+
+
+def sync_task() -> dict | None:
+    """Scheduler entry point; a no-op in every process but the syncer."""
+    if duckdb is None or not settings.ANALYTICS_MIRROR:
+        return None
+    syncer = _get_syncer()
+    if syncer is None:
+        return None
+    db = SessionLocal()
+    try:
+        with _syncer_lock:
+            return syncer.sync(db)
+    finally:
+        db.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Readers — every process
+# ─────────────────────────────────────────────────────────────────────────────
+
+class MirrorReader:
+    def __init__(self):
+        self._con = duckdb.connect(":memory:")
+        self._views = False
+        self._fresh_until = 0.0
+        self._fresh = False
+
+    def _create_views(self) -> None:
+        # read_parquet binds the file when the view is created, so only once they all exist
+        for table in MIRRORED:
+            path = _parquet(table).replace("'", "''")
+            self._con.execute(f"CREATE OR REPLACE VIEW {table} AS SELECT * FROM read_parquet('{path}')")
+        self._views = True
+
+    def fresh(self) -> bool:
+        """Synced within ANALYTICS_MIRROR_MAX_LAG (manifest re-read at most every 5 s)."""
+        now = time.time()
+        if now >= self._fresh_until:
+            self._fresh_until = now + 5
+            try:
+                with open(_paths()[1]) as fh:
+                    synced_at = json.load(fh)["synced_at"]
+                self._fresh = now - synced_at <= settings.ANALYTICS_MIRROR_MAX_LAG and all(
+                    os.path.exists(_parquet(t)) for t in MIRRORED
+                )
+                if self._fresh and not self._views:
+                    self._create_views()
+            except (OSError, ValueError, KeyError):
+                self._fresh = False
+        return self._fresh
+
+    def execute(self, sql: str) -> tuple[list[str], list[tuple]]:
+        cur = self._con.cursor()  # per call: DuckDB connections are not shared across threads
+        try:
+            cur.execute(to_duckdb(sql))
+            columns = [d[0] for d in cur.description]
+            return columns, cur.fetchall()
+        finally:
+            cur.close()
+
+
+_reader: MirrorReader | None = None
+_reader_lock = threading.Lock()  # not _syncer_lock: sync_task holds that for a whole sync
+
+
+def get_reader() -> MirrorReader | None:
+    """The reader when the mirror is enabled, installed and fresh; else None (use the primary)."""
+    global _reader
+    if not settings.ANALYTICS_MIRROR or duckdb is None:
+        return None
+    if _reader is None:
+        with _reader_lock:
+            if _reader is None:
+                _reader = MirrorReader()
+    return _reader if _reader.fresh() else None
+
+
+def try_execute(sql: str) -> tuple[list[str], list[tuple]] | None:
+    """Run sql on the mirror when it qualifies; None → caller runs it on the primary."""
+    if not routable(sql):
+        return None
+    reader = get_reader()
+    if reader is None:
+        return None
+    try:
+        return reader.execute(sql)
+    except Exception as exc:  # dialect gap or missing file: the primary still answers
+        logger.warning("Analytics mirror could not run query, using primary: %s", exc)
+        return None
@@ -0,0 +1,41 @@
+"""
+build_intent_artifact.py — precompute the intent embedding artifact
+====================================================================
+Run at deploy time so workers start by memory-mapping the matrix instead of
+embedding every intent exemplar:
+
+    python -m app.services.build_intent_artifact            # build if stale
+    python -m app.services.build_intent_artifact --force    # always rebuild
+
+With INTENT_EXAMPLES_PATH set, importing gemini also builds (or reuses) the
+ANN index over the labelled utterances in the same directory.
+"""
+
+import argparse
+import os
+
+from app.core.config import settings
+from app.services.gemini import EMBED_MODEL_NAME, INTENT_DEFINITIONS, _embed, intent_exemplars
+from app.services.intent_scorer import IntentScorer, artifact_key, artifact_paths, save_artifact
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Build the intent embedding artifact.")
+    ap.add_argument("--dir", default=settings.INTENT_ARTIFACT_DIR or "data/intents")
+    ap.add_argument("--force", action="store_true", help="rebuild even if an artifact for this key exists")
+    args = ap.parse_args()
+
+    exemplars = intent_exemplars(INTENT_DEFINITIONS)
+    key = artifact_key(EMBED_MODEL_NAME, exemplars)
+    npy_path, meta_path = artifact_paths(args.dir, key)
+    if os.path.exists(meta_path) and not args.force:
+        print(f"Up to date: {npy_path}")
+        return
+
+    scorer = IntentScorer.from_texts(exemplars, _embed)
+    save_artifact(scorer, args.dir, key, EMBED_MODEL_NAME)
+    print(f"Wrote {npy_path} — {scorer.matrix.shape[0]} exemplars × {scorer.matrix.shape[1]} dims, key {key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+"""
+expiry_index.py — first-expired-first-out (FEFO) picking over receiving lines
+==============================================================================
+An in-process expiry-ordered index of the pickable lines (status 'ok',
+quantity > 0, expiry_date set), one sorted array per (item, warehouse):
+
+    (item_id, warehouse_id) → array('q') of  expiry.toordinal() << 32 | line_id
+
+8 bytes per line and bisect-able, so "the k earliest-expiring lines of item X
+in warehouse Y, not yet expired" is O(log n + k). The rows behind the k ids
+are then read by primary key and re-checked, so an entry made stale by a
+write in another worker is never returned — it is dropped (or re-filed) on
+the spot and the next candidate is taken.
+
+Kept current by:
+  • refresh_lines / refresh_headers — called by the receiving write routes
+    after commit (this process sees its own writes immediately)
+  • sync()    — scheduler, every EXPIRY_INDEX_SYNC s: lines with a higher id
+                than any indexed so far (inserts from other workers), plus
+                lines updated in the last EXPIRY_INDEX_OVERLAP s — ids are
+                allocated at insert, not commit, so a lower id can become
+                visible after a higher one was indexed
+  • rebuild() — scheduler, every EXPIRY_INDEX_REBUILD s: full reload (picks
+                up edits made in other workers that made a line pickable)
+
+Deleted lines need no hook: they fail the re-check and are removed.
+"""
+
+import threading
+from array import array
+from bisect import bisect_left
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import func, or_, select
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.item import Item
+from app.models.location import Location
+from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.models.warehouse import Warehouse
+
+_ID_BITS = 32
+_ID_MASK = (1 << _ID_BITS) - 1
+_FETCH_BATCH = 500
+
+
+def _pack(expiry: date, line_id: int) -> int:
+    return expiry.toordinal() << _ID_BITS | line_id
+
+
+def _pickable():
+    """Columns needed to file a line, restricted to pickable lines."""
+    return (
+        select(ReceivingLine.id, ReceivingLine.item_id, ReceivingHeader.warehouse_id, ReceivingLine.expiry_date)
+        .join(ReceivingHeader, ReceivingLine.receiving_id == ReceivingHeader.id)
+        .where(
+            ReceivingLine.status == "ok",
+            ReceivingLine.quantity > 0,
+            ReceivingLine.expiry_date.is_not(None),
+        )
+    )
+
+
+def _as_datetime(value):
+    # SQLite hands CURRENT_TIMESTAMP back as text
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def _newest_line_id(db: Session) -> int:
+    return db.execute(select(ReceivingLine.id).order_by(ReceivingLine.id.desc()).limit(1)).scalar() or 0
+
+
+class ExpiryIndex:
+    def __init__(self):
+        self._keys: dict[tuple[int, int], array] = {}
+        self._max_id = 0
+        self._lock = threading.Lock()
+        self.built = False
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(a) for a in self._keys.values())
+
+    # ── maintenance ──────────────────────────────────────────────────────────
+
+    def rebuild(self, db: Session) -> int:
+        """Reload every pickable line; → number indexed."""
+        keys: dict[tuple[int, int], list] = {}
+        max_id = _newest_line_id(db)
+        result = db.execute(_pickable().where(ReceivingLine.id <= max_id).execution_options(stream_results=True))
+        while chunk := result.fetchmany(10_000):
+            for line_id, item_id, wh_id, expiry in chunk:
+                keys.setdefault((item_id, wh_id), []).append(_pack(expiry, line_id))
+        arrays = {key: array("q", sorted(values)) for key, values in keys.items()}
+        with self._lock:
+            self._keys = arrays
+            self._max_id = max_id
+            self.built = True
+        return sum(len(a) for a in arrays.values())
+
+    def _add_rows(self, rows) -> None:
+        with self._lock:
+            for line_id, item_id, wh_id, expiry in rows:
+                arr = self._keys.setdefault((item_id, wh_id), array("q"))
+                packed = _pack(expiry, line_id)
+                i = bisect_left(arr, packed)
+                if i == len(arr) or arr[i] != packed:
+                    arr.insert(i, packed)
+
+    def sync(self, db: Session) -> int:
+        """Index lines inserted since the last build/sync (by any worker)."""
+        if not self.built:
+            return self.rebuild(db)
+        newest = _newest_line_id(db)
+        since = _as_datetime(db.execute(select(func.now())).scalar()) - timedelta(seconds=settings.EXPIRY_INDEX_OVERLAP)
+        rows = db.execute(_pickable().where(
+            or_(ReceivingLine.id > self._max_id, ReceivingLine.updated_at >= since),
+            ReceivingLine.id <= newest,
+        )).all()
+        self._add_rows(rows)  # idempotent: lines already filed are skipped
+        with self._lock:
+            self._max_id = max(self._max_id, newest)
+        return len(rows)
+
+    def refresh_lines(self, db: Session, line_ids) -> None:
+        """Re-file lines after a local write (old positions are dropped lazily)."""
+        if self.built and line_ids:
+            self._add_rows(db.execute(_pickable().where(ReceivingLine.id.in_(list(line_ids)))).all())
+
+    def refresh_headers(self, db: Session, header_ids) -> None:
+        if self.built and header_ids:
+            self._add_rows(db.execute(_pickable().where(ReceivingLine.receiving_id.in_(list(header_ids)))).all())
+
+    def _discard(self, key: tuple[int, int], packed: int) -> None:
+        with self._lock:
+            arr = self._keys.get(key)
+            if arr is not None:
+                i = bisect_left(arr, packed)
+                if i < len(arr) and arr[i] == packed:
+                    del arr[i]
+
+    # ── lookup ───────────────────────────────────────────────────────────────
+
+    def candidates(self, item_id: int, warehouse_id: int, after: int, count: int) -> list[int]:
+        """Up to `count` packed entries of the key that sort after `after`."""
+        with self._lock:
+            arr = self._keys.get((item_id, warehouse_id))
+            if not arr:
+                return []
+            i = bisect_left(arr, after + 1)
+            return arr[i:i + count].tolist()
+
+    def fefo(self, db: Session, item_id: int, warehouse_id: int, limit: int = 10,
+             quantity: int | None = None, from_date: date | None = None) -> list[dict]:
+        """
+        Pickable lines of item/warehouse in expiry order, skipping lines already
+        expired before from_date (default today). Stops after `limit` lines, or —
+        when quantity is given — once their quantities cover it.
+        """
+        key = (item_id, warehouse_id)
+        cursor = (from_date or date.today()).toordinal() << _ID_BITS
+        cursor -= 1  # bisect after this → first entry on from_date
+        picked: list[dict] = []
+        covered = 0
+        while len(picked) < limit and (quantity is None or covered < quantity):
+            batch = self.candidates(item_id, warehouse_id, cursor, min(_FETCH_BATCH, 2 * (limit - len(picked))))
+            if not batch:
+                break
+            cursor = batch[-1]
+            rows = {r.line_id: r for r in db.execute(_detail_query([p & _ID_MASK for p in batch])).all()}
+            for packed in batch:
+                line_id = packed & _ID_MASK
+                r = rows.get(line_id)
+                expiry_ord = packed >> _ID_BITS
+                if (r is None or r.status != "ok" or not r.quantity or r.expiry_date is None
+                        or r.item_id != item_id or r.warehouse_id != warehouse_id
+                        or r.expiry_date.toordinal() != expiry_ord):
+                    self._discard(key, packed)            # deleted or changed elsewhere
+                    if r is not None and r.status == "ok" and r.quantity and r.expiry_date is not None:
+                        self._add_rows([(line_id, r.item_id, r.warehouse_id, r.expiry_date)])
+                    continue
+                picked.append(_detail(r, quantity, covered))
+                covered += r.quantity
+                if len(picked) >= limit or (quantity is not None and covered >= quantity):
+                    break
+        return picked
+
+
+def _detail_query(line_ids: list[int]):
+    return (
+        select(
+            ReceivingLine.id.label("line_id"),
+            ReceivingLine.item_id,
+            ReceivingHeader.warehouse_id,
+            ReceivingLine.expiry_date,
+            ReceivingLine.shelf_expiry_date,
+            ReceivingLine.quantity,
+            ReceivingLine.status,
+            ReceivingLine.batch_no,
+            Location.code.label("location"),
+            ReceivingHeader.reference_no,
+            ReceivingHeader.receiving_date,
+        )
+        .join(ReceivingHeader, ReceivingLine.receiving_id == ReceivingHeader.id)
+        .join(Location, ReceivingLine.location_id == Location.id)
+        .where(ReceivingLine.id.in_(line_ids))
+    )
+
+
+def _detail(r, quantity: int | None, covered: int) -> dict:
+    out = {
+        "line_id": r.line_id,
+        "expiry_date": r.expiry_date,
+        "days_until_expiry": (r.expiry_date - date.today()).days,
+        "shelf_expiry_date": r.shelf_expiry_date,
+        "quantity": r.quantity,
+        "batch_no": r.batch_no,
+        "location": r.location,
+        "reference_no": r.reference_no,
+        "receiving_date": r.receiving_date,
+    }
+    if quantity is not None:
+        out["pick"] = min(r.quantity, quantity - covered)
+    return out
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Process-wide instance
+# ─────────────────────────────────────────────────────────────────────────────
+
+EXPIRY_INDEX = ExpiryIndex()
+_build_lock = threading.Lock()
+
+
+def ensure_built(db: Session) -> ExpiryIndex:
+    if not EXPIRY_INDEX.built:
+        with _build_lock:
+            if not EXPIRY_INDEX.built:
+                EXPIRY_INDEX.rebuild(db)
+    return EXPIRY_INDEX
+
+
+def resolve_codes(db: Session, item_code: str, warehouse_code: str) -> tuple[int | None, int | None]:
+    item_id = db.execute(select(Item.id).where(Item.code == item_code)).scalar()
+    warehouse_id = db.execute(select(Warehouse.id).where(Warehouse.code == warehouse_code)).scalar()
+    return item_id, warehouse_id
+
+
+def _with_session(fn):
+    def task():
+        db = SessionLocal()
+        try:
+            return fn(db)
+        finally:
+            db.close()
+    return task
+
+
+sync_task = _with_session(lambda db: EXPIRY_INDEX.sync(db))
+rebuild_task = _with_session(lambda db: EXPIRY_INDEX.rebuild(db))
@@ -2,13 +2,15 @@
 gemini.py — Warehouse Copilot AI Brain
 ========================================
 Semantic intent detection via fastembed (ONNX Runtime — no PyTorch needed):
-  • fastembed TextEmbedding("all-MiniLM-L6-v2")  — 384-dim ONNX embeddings
-  • cosine_similarity (sklearn)                   — ranks intent descriptions
+  • fastembed TextEmbedding(EMBED_MODEL)         — ONNX embeddings (all-MiniLM-L6-v2, 384-dim)
+  • IntentScorer (NumPy matmul)                   — ranks intent exemplars
   • spaCy en_core_web_sm                          — NER + POS slot extraction
   • Confidence threshold                          — gates uncertain results
 
 Gemini API is ONLY used for the fallback chat reply (generate_chat_response).
 All heavy models are loaded ONCE at module import and reused for every request.
+Intent embeddings come from a memory-mapped artifact under INTENT_ARTIFACT_DIR
+(built on first start, or ahead of time: python -m app.services.build_intent_artifact).
 """
 
 import os
@@ -16,10 +18,16 @@ import re
 import logging
 import numpy as np
 from dotenv import load_dotenv
-from sklearn.metrics.pairwise import cosine_similarity
 import spacy
 from fastembed import TextEmbedding
 
+from app.core.config import settings
+from app.core.metrics import stage
+from app.services.intent_index import load_examples, load_or_build_index
+from app.services.intent_scorer import load_or_build
+from app.services.nlp_pipeline import Feature, MessageAnalysis, NLPPipeline
+from app.services.normalizer import KeywordRules, TextScanner
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -31,8 +39,21 @@ MODEL_NAME = os.getenv("GEMINI_MODEL", "models/gemini-2.0-flash")
 # 1. Load AI models once at startup
 # ─────────────────────────────────────────────────────────────────────────────
 
-logger.info("Loading fastembed model (all-MiniLM-L6-v2)…")
-_embed_model = TextEmbedding("sentence-transformers/all-MiniLM-L6-v2")
+EMBED_MODEL_NAME = settings.EMBED_MODEL
+
+
+def _embed_threads() -> int | None:
+    # Under PREFORK the session is built before workers are forked: ONNX Runtime's
+    # thread pool would not survive the fork, so run single-threaded (no pool)
+    if settings.PREFORK:
+        if settings.EMBED_THREADS > 1:
+            logger.warning("EMBED_THREADS=%d ignored under PREFORK (ONNX pools are not fork-safe)", settings.EMBED_THREADS)
+        return 1
+    return settings.EMBED_THREADS or None
+
+
+logger.info("Loading fastembed model (%s)…", EMBED_MODEL_NAME)
+_embed_model = TextEmbedding(EMBED_MODEL_NAME, threads=_embed_threads())
 
 logger.info("Loading spaCy en_core_web_sm…")
 _nlp = spacy.load("en_core_web_sm")
@@ -41,6 +62,8 @@ _nlp = spacy.load("en_core_web_sm")
 # 2. Intent definitions (semantic, not keywords)
 # ─────────────────────────────────────────────────────────────────────────────
 
+# Each value is a description, or a list of exemplars pooled per
+# INTENT_POOLING ("max" | "mean").
 INTENT_DEFINITIONS = {
     "smart_receive": (
         "Receive stock directly from chat in one line. User wants to add, receive, enter, "
@@ -93,10 +116,50 @@ INTENT_DEFINITIONS = {
 
 _INTENT_LABELS: list[str] = list(INTENT_DEFINITIONS.keys())
 
-# Pre-compute intent description embeddings (fast: runs once at startup)
-_INTENT_EMBEDDINGS: np.ndarray = np.array(
-    list(_embed_model.embed(list(INTENT_DEFINITIONS.values())))
+
+def _embed(texts: list[str]) -> np.ndarray:
+    return np.array(list(_embed_model.embed(list(texts), batch_size=settings.EMBED_BATCH_SIZE)), dtype=np.float32)
+
+
+def intent_exemplars(definitions: dict) -> dict[str, list[str]]:
+    return {k: [v] if isinstance(v, str) else list(v) for k, v in definitions.items()}
+
+
+# Normalised intent embeddings: mapped from the artifact, embedded only when
+# the model or definitions changed since it was built
+_INTENT_SCORER, _from_artifact = load_or_build(
+    intent_exemplars(INTENT_DEFINITIONS), _embed, EMBED_MODEL_NAME,
+    settings.INTENT_ARTIFACT_DIR, settings.INTENT_POOLING,
 )
+logger.info("Intent embeddings %s (%d exemplars)",
+            "mapped from artifact" if _from_artifact else "computed", len(_INTENT_SCORER.matrix))
+
+
+def _load_intent_index():
+    """ANN index over definitions + labelled utterances (INTENT_EXAMPLES_PATH), if configured."""
+    path = settings.INTENT_EXAMPLES_PATH
+    if not path:
+        return None
+    if not os.path.exists(path):
+        logger.warning("INTENT_EXAMPLES_PATH %s not found — using description scorer", path)
+        return None
+    examples = load_examples(path)
+    unknown = set(examples) - set(INTENT_DEFINITIONS)
+    if unknown:
+        logger.warning("Ignoring examples for unknown intents: %s", ", ".join(sorted(unknown)))
+    exemplars = {
+        label: texts + examples.get(label, [])
+        for label, texts in intent_exemplars(INTENT_DEFINITIONS).items()
+    }
+    index = load_or_build_index(
+        exemplars, _embed, EMBED_MODEL_NAME, settings.INTENT_ARTIFACT_DIR,
+        settings.INTENT_INDEX_NLIST or None, settings.INTENT_INDEX_NPROBE,
+    )
+    logger.info("Intent ANN index ready (%d exemplars, %d cells)", len(index.vectors), len(index.centroids))
+    return index
+
+
+_INTENT_INDEX = _load_intent_index()
 
 # Confidence threshold — below this we return "unknown"
 _CONFIDENCE_THRESHOLD = 0.20
@@ -194,33 +257,36 @@ _SPELL_CORRECTIONS = {
 }
 
 # ── Roman Urdu → English warehouse phrase mapping ─────────────────────────────
-_URDU_PHRASE_MAP: list[tuple[re.Pattern, str]] = [
-    (re.compile(r"\b(maal|saman)\s*(receive|lao|aaya|add)\b", re.I), "receive stock"),
-    (re.compile(r"\b(receive|stock)\s*karo\b", re.I),                "receive stock"),
-    (re.compile(r"\bnaya\s*(maal|stock|saman)\b", re.I),             "receive new stock"),
-    (re.compile(r"\bmaal\s*aaya\b", re.I),                           "stock received"),
-    (re.compile(r"\b(daal|rakh)\s*do\b", re.I),                      "add stock"),
-    (re.compile(r"\bjama\s*karo\b", re.I),                           "add to inventory"),
-    (re.compile(r"\bstock\s*entry\s*karna\b", re.I),                 "receive stock entry"),
-    (re.compile(r"\b(kitna|kia)\s*(maal|stock)\s*(hai|hay)?\b", re.I), "how much stock available"),
-    (re.compile(r"\b(maal|stock)\s*kitna\s*(hai|hay)?\b", re.I),    "check stock level"),
-    (re.compile(r"\b(inventory|stock)\s*(dekho|dikhao)\b", re.I),   "show inventory"),
-    (re.compile(r"\bmaloom\s*karo\b", re.I),                         "check inventory"),
-    (re.compile(r"\b(hata|nikal)\s*(do|dena)\b", re.I), "delete record"),
-    (re.compile(r"\b(hatao|nikalo)\b", re.I),            "remove record"),
-    (re.compile(r"\b(dhundo|kholo|dekho|dikhao)\b", re.I), "search open record"),
-    (re.compile(r"\baur\s*(daal|add)\b", re.I),   "add more quantity"),
-    (re.compile(r"\bbadha\s*do\b", re.I),          "increase quantity"),
-    (re.compile(r"\bzyada\s*karo\b", re.I),        "increase quantity"),
-    (re.compile(r"\b(report|summary)\s*(dikhao|chahiye|do)\b", re.I), "show report"),
+# Each row: word slots ("a|b" alternatives, trailing "|" = optional slot) and
+# the English replacement. Words are separated by an optional space.
+_URDU_PHRASES: list[tuple[tuple[str, ...], str]] = [
+    (("maal|saman", "receive|lao|aaya|add"),   "receive stock"),
+    (("receive|stock", "karo"),                "receive stock"),
+    (("naya", "maal|stock|saman"),             "receive new stock"),
+    (("maal", "aaya"),                         "stock received"),
+    (("daal|rakh", "do"),                      "add stock"),
+    (("jama", "karo"),                         "add to inventory"),
+    (("stock", "entry", "karna"),              "receive stock entry"),
+    (("kitna|kia", "maal|stock", "hai|hay|"),  "how much stock available"),
+    (("maal|stock", "kitna", "hai|hay|"),      "check stock level"),
+    (("inventory|stock", "dekho|dikhao"),      "show inventory"),
+    (("maloom", "karo"),                       "check inventory"),
+    (("hata|nikal", "do|dena"),                "delete record"),
+    (("hatao|nikalo",),                        "remove record"),
+    (("dhundo|kholo|dekho|dikhao",),           "search open record"),
+    (("aur", "daal|add"),                      "add more quantity"),
+    (("badha", "do"),                          "increase quantity"),
+    (("zyada", "karo"),                        "increase quantity"),
+    (("report|summary", "dikhao|chahiye|do"),  "show report"),
 ]
 
+# Spell-correction + translation in one pass; keyword rules prefiltered by one keyword scan
+_SCANNER = TextScanner(_SPELL_CORRECTIONS, _URDU_PHRASES)
+_KEYWORD_RULES = KeywordRules(_KEYWORD_INTENTS)
+
 
 def _translate_urdu(message: str) -> str:
-    translated = message
-    for pattern, replacement in _URDU_PHRASE_MAP:
-        translated = pattern.sub(replacement, translated)
-    return translated
+    return _SCANNER.scan(message)[1]
 
 _REFERENCE_REGEX = r"\b(?:POS|PO|REF|GRN|INV|REC|BATCH|SO|DO)[\-\s]?\d+\b"
 
@@ -230,57 +296,96 @@ _REFERENCE_REGEX = r"\b(?:POS|PO|REF|GRN|INV|REC|BATCH|SO|DO)[\-\s]?\d+\b"
 # ─────────────────────────────────────────────────────────────────────────────
 
 def normalize_message(message: str) -> str:
-    words = message.split()
-    out = []
-    for word in words:
-        clean = word.lower().strip(".,!?;:")
-        if clean in _SPELL_CORRECTIONS:
-            corrected = _SPELL_CORRECTIONS[clean]
-            if len(word) > 1 and word[0].isupper():
-                corrected = corrected.capitalize()
-            for ch in ".,!?;:":
-                if word.endswith(ch):
-                    corrected += ch
-                    break
-            out.append(corrected)
-        else:
-            out.append(word)
-    return " ".join(out)
+    return _SCANNER.scan(message)[0]
 
 
 # ─────────────────────────────────────────────────────────────────────────────
 # 4. Semantic Intent Detection
 # ─────────────────────────────────────────────────────────────────────────────
 
-def detect_intent(user_message: str) -> tuple[str, float]:
-    # Stage 1: keyword rules (ordered, first match wins)
-    for pattern, forced_intent in _KEYWORD_INTENTS:
-        if pattern.search(user_message):
-            return forced_intent, 1.0
-
-    # Stage 2: semantic embedding
-    user_vec     = np.array(list(_embed_model.embed([user_message])))
-    similarities = cosine_similarity(user_vec, _INTENT_EMBEDDINGS)[0]
+def _keyword_intent(user_message: str) -> str | None:
+    return _KEYWORD_RULES.first(user_message)
 
-    best_idx   = int(np.argmax(similarities))
-    confidence = float(similarities[best_idx])
-    intent     = _INTENT_LABELS[best_idx]
 
+def _gate(intent: str, confidence: float) -> tuple[str, float]:
     if confidence < _CONFIDENCE_THRESHOLD:
         return "unknown", confidence
-
     return intent, confidence
 
 
+def detect_intent(user_message: str) -> tuple[str, float]:
+    return detect_intents([user_message])[0]
+
+
+def detect_intents(user_messages: list[str]) -> list[tuple[str, float]]:
+    """Batch form of detect_intent: one embed call + one matmul for all messages."""
+    results: list[tuple[str, float] | None] = [None] * len(user_messages)
+
+    # Stage 1: keyword rules (ordered, first match wins)
+    with stage("intent_keyword"):
+        for i, message in enumerate(user_messages):
+            forced_intent = _keyword_intent(message)
+            if forced_intent:
+                results[i] = (forced_intent, 1.0)
+
+    # Stage 2: semantic embedding for whatever the rules did not catch
+    pending = [i for i, r in enumerate(results) if r is None]
+    if pending:
+        with stage("intent_embedding"):
+            vectors = _embed([user_messages[i] for i in pending])
+            if _INTENT_INDEX is not None:
+                best = _INTENT_INDEX.vote(vectors, settings.INTENT_INDEX_K)
+            else:
+                best = _INTENT_SCORER.best(vectors)
+        for i, (intent, confidence) in zip(pending, best):
+            results[i] = _gate(intent, confidence)
+
+    return results
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 5. Slot Extraction
 # ─────────────────────────────────────────────────────────────────────────────
 
-def extract_slots(message: str) -> dict:
-    doc = _nlp(message)
+# Slot features — each tried only where a word starts with one of its keywords
+_F_REFERENCE     = Feature(_REFERENCE_REGEX, ("po", "ref", "grn", "inv", "rec", "batch", "so", "do"))
+_F_ITEM_CODE     = Feature(r"\b([A-Z]{2,}-[A-Za-z0-9]+)\b", flags=0)
+_F_CUSTOMER      = Feature(r"\b(?:customer|client|cust)\s*[:\-]?\s*([A-Za-z][A-Za-z\s\-]{1,40})", ("cust", "client"))
+_F_BATCH         = Feature(r"\b(?:batch|lot)\s*[:\-]?\s*([A-Za-z0-9][\w\-]{1,20})", ("batch", "lot"))
+_F_WAREHOUSE     = Feature(r"\b(?:warehouse|wh)\s*[:\-]?\s*([A-Za-z0-9]{1,10})", ("warehouse", "wh"))
+_F_LOCATION      = Feature(r"\b(?:location|loc|shelf|bin|at)\s*[:\-]?\s*([A-Za-z0-9]{1,10})", ("loc", "shelf", "bin", "at"))
+_RECEIVE_VERBS   = ("receive", "accept", "log", "enter", "inward")
+_F_RECEIVE_QTY   = Feature(r"\b(?:receive|accept|log|enter|inward)\s+(\d+)\s+([a-z][a-z0-9\-]+)", _RECEIVE_VERBS)
+_F_RECEIVE_ITEM  = Feature(r"\b(?:receive|accept|log|enter|inward)\s+([a-z][a-z0-9\-]+)\s+(\d+)", _RECEIVE_VERBS)
+_F_ITEM_NAME     = Feature(r"\b(?:item|product|maal)\s+([A-Za-z][A-Za-z0-9\s\-]{1,30})", ("item", "product", "maal"))
+_F_STATUS        = Feature(r"\b(?:status)\s*[:\-]?\s*(ok|damaged)\b", ("status",))
+_F_DAMAGED       = Feature(r"\bdamaged\b", ("damaged",))
+_F_OK            = Feature(r"\bok\b", ("ok",))
+_F_MFG_DATE      = Feature(r"\b(?:mfg|manufacturing|mfg[_\-]?date)\s*[:\-]?\s*(\d{4}[\-/]\d{2}[\-/]\d{2})", ("mfg", "manufacturing"))
+_F_EXPIRY_DATE   = Feature(r"\b(?:expiry|exp|expiry[_\-]?date)\s*[:\-]?\s*(\d{4}[\-/]\d{2}[\-/]\d{2})", ("exp",))
+_F_SHELF_EXPIRY  = Feature(r"\b(?:shelf[_\-]?expiry|shelf[_\-]?exp)\s*[:\-]?\s*(\d{4}[\-/]\d{2}[\-/]\d{2})", ("shelf",))
+
+_CMD_VERB_RE = re.compile(
+    r"^(?:.*\b)?(?:search|find|look\s+up|show|check|view|open|get|display|dhundo|dekho)"
+    r"\s+(?:me\s+|all\s+|a\s+|the\s+|some\s+)?"
+    r"(?:for\s+)?(?:item\s+|customer\s+|by\s+|record\s+|batch\s+)?",
+    re.I
+)
+_TRAILING_NOUN_RE = re.compile(r"\s+(?:records?|items?|entries|entry)$", re.I)
+_SKIP_WORDS = {"stock", "inventory", "search", "find", "check",
+               "record", "report", "warehouse", "want", "need"}
+
+
+def _date(a: MessageAnalysis, feature: Feature) -> str | None:
+    value = a.group(feature)
+    return value.replace("/", "-") if value else None
+
+
+def _slots_from(a: MessageAnalysis) -> dict:
+    message = a.normalized
 
     quantity = None
-    for token in doc:
+    for token in a.doc:
         if token.like_num:
             try:
                 qty = int(token.text)
@@ -291,54 +396,30 @@ def extract_slots(message: str) -> dict:
                 pass
 
     reference_no = None
-    ref_match = re.search(_REFERENCE_REGEX, message, re.I)
+    ref_match = a.find(_F_REFERENCE)
     if ref_match:
         reference_no = ref_match.group(0).upper()
 
     item_code = None
-    item_match = re.search(r"\b([A-Z]{2,}-[A-Za-z0-9]+)\b", message)
-    if item_match and not ref_match:
-        item_code = item_match.group(1).upper()
+    if not ref_match and a.find(_F_ITEM_CODE):
+        item_code = a.group(_F_ITEM_CODE).upper()
 
     customer = None
-    for ent in doc.ents:
+    for ent in a.doc.ents:
         if ent.label_ in ("PERSON", "ORG"):
             customer = ent.text
             break
-    if not customer:
-        m = re.search(
-            r"\b(?:customer|client|cust)\s*[:\-]?\s*([A-Za-z][A-Za-z\s\-]{1,40})",
-            message, re.I
-        )
-        if m:
-            customer = m.group(1).strip()
+    if not customer and a.find(_F_CUSTOMER):
+        customer = a.group(_F_CUSTOMER).strip()
 
-    batch_no = None
-    batch_m = re.search(
-        r"\b(?:batch|lot)\s*[:\-]?\s*([A-Za-z0-9][\w\-]{1,20})", message, re.I
-    )
-    if batch_m:
-        batch_no = batch_m.group(1).upper()
-
-    warehouse = None
-    wh_m = re.search(
-        r"\b(?:warehouse|wh)\s*[:\-]?\s*([A-Za-z0-9]{1,10})", message, re.I
-    )
-    if wh_m:
-        warehouse = wh_m.group(1).upper()
-
-    location = None
-    loc_m = re.search(
-        r"\b(?:location|loc|shelf|bin|at)\s*[:\-]?\s*([A-Za-z0-9]{1,10})", message, re.I
-    )
-    if loc_m:
-        location = loc_m.group(1).upper()
+    batch_no = (a.group(_F_BATCH) or "").upper() or None
+    warehouse = (a.group(_F_WAREHOUSE) or "").upper() or None
+    location = (a.group(_F_LOCATION) or "").upper() or None
 
     # ── Smart receive: extract item name from natural text ────────────────────
     item_name = None
     # Pattern: "receive <qty> <item>" or "receive <item> <qty>"
-    sr1 = re.search(r"\b(?:receive|accept|log|enter|inward)\s+(\d+)\s+([a-z][a-z0-9\-]+)", message, re.I)
-    sr2 = re.search(r"\b(?:receive|accept|log|enter|inward)\s+([a-z][a-z0-9\-]+)\s+(\d+)", message, re.I)
+    sr1, sr2 = a.find(_F_RECEIVE_QTY), a.find(_F_RECEIVE_ITEM)
     if sr1:
         if not quantity:
             quantity = int(sr1.group(1))
@@ -349,58 +430,35 @@ def extract_slots(message: str) -> dict:
             quantity = int(sr2.group(2))
 
     # Also try generic item pattern
-    if not item_name:
-        _ITEM_NAME_RE = re.compile(
-            r"\b(?:item|product|maal)\s+([A-Za-z][A-Za-z0-9\s\-]{1,30})", re.I
-        )
-        name_m = _ITEM_NAME_RE.search(message)
-        if name_m:
-            item_name = name_m.group(1).strip()
+    if not item_name and a.find(_F_ITEM_NAME):
+        item_name = a.group(_F_ITEM_NAME).strip()
 
     # ── Smart receive: extract status ─────────────────────────────────────────
     status = None
-    status_m = re.search(r"\b(?:status)\s*[:\-]?\s*(ok|damaged)\b", message, re.I)
-    if status_m:
-        status = status_m.group(1).lower()
-    elif re.search(r"\bdamaged\b", message, re.I):
+    if a.find(_F_STATUS):
+        status = a.group(_F_STATUS).lower()
+    elif a.find(_F_DAMAGED):
         status = "damaged"
-    elif re.search(r"\bok\b", message, re.I):
+    elif a.find(_F_OK):
         status = "ok"
 
     # ── Smart receive: extract dates ──────────────────────────────────────────
-    mfg_date = None
-    expiry_date = None
-    shelf_expiry = None
-    mfg_m = re.search(r"\b(?:mfg|manufacturing|mfg[_\-]?date)\s*[:\-]?\s*(\d{4}[\-/]\d{2}[\-/]\d{2})", message, re.I)
-    if mfg_m:
-        mfg_date = mfg_m.group(1).replace("/", "-")
-    exp_m = re.search(r"\b(?:expiry|exp|expiry[_\-]?date)\s*[:\-]?\s*(\d{4}[\-/]\d{2}[\-/]\d{2})", message, re.I)
-    if exp_m:
-        expiry_date = exp_m.group(1).replace("/", "-")
-    shelf_m = re.search(r"\b(?:shelf[_\-]?expiry|shelf[_\-]?exp)\s*[:\-]?\s*(\d{4}[\-/]\d{2}[\-/]\d{2})", message, re.I)
-    if shelf_m:
-        shelf_expiry = shelf_m.group(1).replace("/", "-")
+    mfg_date = _date(a, _F_MFG_DATE)
+    expiry_date = _date(a, _F_EXPIRY_DATE)
+    shelf_expiry = _date(a, _F_SHELF_EXPIRY)
 
     query = reference_no or item_code or customer or batch_no
 
     if not query:
-        _CMD_VERB_RE = re.compile(
-            r"^(?:.*\b)?(?:search|find|look\s+up|show|check|view|open|get|display|dhundo|dekho)"
-            r"\s+(?:me\s+|all\s+|a\s+|the\s+|some\s+)?"
-            r"(?:for\s+)?(?:item\s+|customer\s+|by\s+|record\s+|batch\s+)?",
-            re.I
-        )
         stripped = _CMD_VERB_RE.sub("", message).strip()
-        stripped = re.sub(r"\s+(?:records?|items?|entries|entry)$", "", stripped, flags=re.I).strip()
+        stripped = _TRAILING_NOUN_RE.sub("", stripped).strip()
         if stripped and stripped.lower() not in (
             "inventory", "stock", "all", "report", "records", "all records", ""
         ) and len(stripped) > 1:
             query = re.sub(r"\s+", " ", stripped).strip()
 
     if not query:
-        _SKIP_WORDS = {"stock", "inventory", "search", "find", "check",
-                       "record", "report", "warehouse", "want", "need"}
-        for token in doc:
+        for token in a.doc:
             if (
                 token.pos_ in ("NOUN", "PROPN")
                 and not token.is_stop
@@ -427,6 +485,12 @@ def extract_slots(message: str) -> dict:
     }
 
 
+@stage("extract_slots")
+def extract_slots(message: str) -> dict:
+    """Slots from an already-normalised message."""
+    return _slots_from(MessageAnalysis(message, message, message, _nlp))
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # 6. Missing-field validation
 # ─────────────────────────────────────────────────────────────────────────────
@@ -488,19 +552,39 @@ def generate_response(result: dict) -> str | None:
 # 8. Main public entry point
 # ─────────────────────────────────────────────────────────────────────────────
 
-def extract_intent_and_slots(message: str) -> dict:
-    normalized         = normalize_message(message)
-    translated         = _translate_urdu(normalized)
-    intent, confidence = detect_intent(translated)
-    slots              = extract_slots(normalized)
-    missing            = check_missing(intent, slots)
+def _analyze(message: str) -> MessageAnalysis:
+    normalized, translated = _SCANNER.scan(message)
+    return MessageAnalysis(message, normalized, translated, _nlp)
 
-    return {
-        "intent":     intent,
-        "confidence": round(confidence, 3),
-        "slots":      slots,
-        "missing":    missing,
-    }
+
+def _intent_stage(a: MessageAnalysis, result: dict) -> None:
+    intent, confidence   = detect_intent(a.translated)
+    result["intent"]     = intent
+    result["confidence"] = round(confidence, 3)
+
+
+def _slots_stage(a: MessageAnalysis, result: dict) -> None:
+    result["slots"] = _slots_from(a)
+
+
+def _missing_stage(a: MessageAnalysis, result: dict) -> None:
+    result["missing"] = check_missing(result["intent"], result["slots"])
+
+
+_PIPELINE = NLPPipeline(_analyze, [
+    ("intent",        _intent_stage),
+    ("extract_slots", _slots_stage),
+    ("check_missing", _missing_stage),
+])
+
+
+def interpret(message: str) -> tuple[dict, dict[str, float]]:
+    """extract_intent_and_slots plus per-stage milliseconds."""
+    return _PIPELINE.run(message)
+
+
+def extract_intent_and_slots(message: str) -> dict:
+    return _PIPELINE.run(message)[0]
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -0,0 +1,202 @@
+"""
+intent_index.py — approximate nearest-neighbour vote over example utterances
+=============================================================================
+When intents are described by thousands of labelled utterances (mined chat
+logs, Roman-Urdu variants), scoring every exemplar per message stops being
+cheap. IVFIndex is an inverted-file index in plain NumPy:
+
+  • build  — spherical k-means splits the unit-length exemplars into nlist
+             cells; rows are stored grouped by cell (one contiguous matrix)
+  • search — a query is compared with the nlist centroids, the nprobe best
+             cells are scanned exactly, and the top-k neighbours returned
+  • vote   — neighbours vote for their intent weighted by similarity; the
+             reported confidence is the winner's best cosine, so the existing
+             threshold keeps its meaning
+
+Saved next to the intent matrix artifact and memory-mapped the same way.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from app.services.intent_scorer import ARTIFACT_VERSION, artifact_key, normalize_rows, write_atomic
+
+
+_TRAIN_PER_CELL = 64
+
+
+def _kmeans(x: np.ndarray, nlist: int, iters: int, seed: int) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Spherical k-means on unit rows → (centroids, assignment of every row).
+    Centroids are trained on a sample of at most _TRAIN_PER_CELL rows per cell.
+    """
+    rng = np.random.default_rng(seed)
+    full = x
+    if len(x) > _TRAIN_PER_CELL * nlist:
+        x = x[rng.choice(len(x), _TRAIN_PER_CELL * nlist, replace=False)]
+    centroids = x[rng.choice(len(x), nlist, replace=False)].copy()
+    assign = np.zeros(len(x), dtype=np.intp)
+    for _ in range(iters):
+        assign = (x @ centroids.T).argmax(axis=1)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=nlist)
+        sums = np.zeros_like(centroids)
+        filled = counts > 0
+        sums[filled] = np.add.reduceat(x[order], np.cumsum(counts)[filled] - counts[filled], axis=0)
+        empty = ~filled
+        if empty.any():  # re-seed empty cells from random rows
+            sums[empty] = x[rng.choice(len(x), int(empty.sum()), replace=False)]
+        centroids = normalize_rows(sums)
+    return centroids, (full @ centroids.T).argmax(axis=1)
+
+
+class IVFIndex:
+    def __init__(self, labels: list[str], vectors, owners, centroids, offsets, nprobe: int = 8):
+        """
+        vectors   — (N, dim) unit rows grouped by cell; cell c is
+                    vectors[offsets[c]:offsets[c + 1]]
+        owners    — intent index of each row
+        centroids — (nlist, dim) unit cell centroids
+        """
+        self.labels = list(labels)
+        self.vectors = vectors
+        self.owners = np.asarray(owners)
+        self.centroids = centroids
+        self.offsets = np.asarray(offsets)
+        self.nprobe = max(1, min(nprobe, len(centroids)))
+
+    @classmethod
+    def build(cls, labels: list[str], exemplars, owners, nlist: int | None = None, nprobe: int = 8,
+              iters: int = 10, seed: int = 0) -> "IVFIndex":
+        x = normalize_rows(exemplars)
+        owners = np.asarray(owners, dtype=np.int32)
+        nlist = max(1, min(nlist or int(np.sqrt(len(x))), len(x)))
+        centroids, assign = _kmeans(x, nlist, iters, seed)
+        order = np.argsort(assign, kind="stable")
+        offsets = np.searchsorted(assign[order], np.arange(nlist + 1))
+        return cls(labels, np.ascontiguousarray(x[order]), owners[order], centroids, offsets, nprobe)
+
+    @classmethod
+    def from_texts(cls, exemplars: dict[str, list[str]], embed, **params) -> "IVFIndex":
+        labels, texts, owners = list(exemplars), [], []
+        for i, label in enumerate(labels):
+            for text in exemplars[label]:
+                texts.append(text)
+                owners.append(i)
+        return cls.build(labels, embed(texts), owners, **params)
+
+    def search(self, queries, k: int = 10) -> tuple[np.ndarray, np.ndarray]:
+        """Top-k row ids and cosines per query (−1 / −inf pad when fewer candidates)."""
+        q = normalize_rows(queries)
+        ids = np.full((len(q), k), -1, dtype=np.int64)
+        sims = np.full((len(q), k), -np.inf, dtype=np.float32)
+
+        if self.nprobe >= len(self.centroids):
+            # every cell probed → one matmul over the whole matrix
+            all_sims = q @ self.vectors.T
+            for row, s in enumerate(all_sims):
+                self._take_top(s, np.arange(len(s)), k, ids[row], sims[row])
+            return ids, sims
+
+        probes = np.argpartition(-(q @ self.centroids.T), self.nprobe - 1, axis=1)[:, :self.nprobe]
+        for row, cells in enumerate(probes):
+            spans = [(int(self.offsets[c]), int(self.offsets[c + 1])) for c in cells]
+            # contiguous slices: views, not copies of the candidate rows
+            s = np.concatenate([self.vectors[lo:hi] @ q[row] for lo, hi in spans])
+            cand = np.concatenate([np.arange(lo, hi) for lo, hi in spans])
+            self._take_top(s, cand, k, ids[row], sims[row])
+        return ids, sims
+
+    @staticmethod
+    def _take_top(s: np.ndarray, cand: np.ndarray, k: int, ids_out: np.ndarray, sims_out: np.ndarray) -> None:
+        if not len(s):
+            return
+        top = np.argpartition(-s, k - 1)[:k] if len(s) > k else np.arange(len(s))
+        top = top[np.argsort(-s[top])]
+        ids_out[:len(top)] = cand[top]
+        sims_out[:len(top)] = s[top]
+
+    def vote(self, queries, k: int = 10) -> list[tuple[str, float]]:
+        """Similarity-weighted top-k vote → (intent, best cosine of that intent)."""
+        ids, sims = self.search(queries, k)
+        out = []
+        for row_ids, row_sims in zip(ids, sims):
+            valid = row_ids >= 0
+            if not valid.any():
+                out.append(("unknown", 0.0))
+                continue
+            owners = self.owners[row_ids[valid]]
+            weights = np.maximum(row_sims[valid], 0)
+            tally = np.bincount(owners, weights=weights, minlength=len(self.labels))
+            # nothing positively similar → fall back to the nearest neighbour
+            winner = int(tally.argmax()) if tally.any() else int(owners[0])
+            out.append((self.labels[winner], float(row_sims[valid][owners == winner].max())))
+        return out
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Persisted artifact (same directory and keying as the intent matrix)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_ARRAYS = ("vectors", "owners", "centroids", "offsets")
+
+
+def _paths(directory: str, key: str) -> dict[str, str]:
+    base = os.path.join(directory, f"ivf-{key}")
+    return {**{name: f"{base}-{name}.npy" for name in _ARRAYS}, "meta": base + ".json"}
+
+
+def index_key(model_name: str, exemplars: dict[str, list[str]], nlist: int | None) -> str:
+    return artifact_key(f"{model_name}|ivf|nlist={nlist or 'auto'}", exemplars)
+
+
+def save_index(index: IVFIndex, directory: str, key: str) -> None:
+    os.makedirs(directory, exist_ok=True)
+    paths = _paths(directory, key)
+    for name in _ARRAYS:
+        write_atomic(paths[name], lambda fh, a=getattr(index, name): np.save(fh, np.asarray(a)))
+    meta = {"version": ARTIFACT_VERSION, "key": key, "labels": index.labels, "rows": len(index.vectors)}
+    write_atomic(paths["meta"], lambda fh: fh.write(json.dumps(meta, indent=2).encode("utf-8")))
+
+
+def load_index(directory: str, key: str, nprobe: int = 8) -> IVFIndex | None:
+    paths = _paths(directory, key)
+    try:
+        with open(paths["meta"], encoding="utf-8") as fh:
+            meta = json.load(fh)
+        arrays = {name: np.load(paths[name], mmap_mode="r") for name in _ARRAYS}
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != ARTIFACT_VERSION or meta.get("key") != key or len(arrays["vectors"]) != meta["rows"]:
+        return None
+    return IVFIndex(meta["labels"], nprobe=nprobe, **arrays)
+
+
+def load_or_build_index(exemplars: dict[str, list[str]], embed, model_name: str, directory: str | None,
+                        nlist: int | None = None, nprobe: int = 8) -> IVFIndex:
+    if not directory:
+        return IVFIndex.from_texts(exemplars, embed, nlist=nlist, nprobe=nprobe)
+    key = index_key(model_name, exemplars, nlist)
+    index = load_index(directory, key, nprobe)
+    if index is not None:
+        return index
+    index = IVFIndex.from_texts(exemplars, embed, nlist=nlist, nprobe=nprobe)
+    try:
+        save_index(index, directory, key)
+    except OSError:
+        return index
+    return load_index(directory, key, nprobe) or index
+
+
+def load_examples(path: str) -> dict[str, list[str]]:
+    """Labelled utterances, one JSON object per line: {"intent": "...", "text": "..."}."""
+    examples: dict[str, list[str]] = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                row = json.loads(line)
+                examples.setdefault(row["intent"], []).append(row["text"])
+    return examples
@@ -0,0 +1,177 @@
+"""
+intent_scorer.py — vectorised cosine scoring of messages against intents
+=========================================================================
+Every intent owns one or more exemplar embeddings (its description, and
+optionally example utterances). They are L2-normalised ONCE into a
+contiguous float32 matrix, so scoring a batch of messages is a single
+matmul followed by pooling each intent's exemplar columns (max or mean).
+
+Replaces sklearn's cosine_similarity, which re-normalised the static intent
+matrix on every request and pulled scikit-learn in at import.
+
+Artifacts: save() writes the prepared matrix to intents-<key>.npy plus a
+small JSON sidecar; load() memory-maps it read-only, so every worker on the
+host shares the same page-cache pages. The key hashes the embedding model
+name and the exemplar texts — change either and a new artifact is built.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+
+import numpy as np
+
+POOLING_MODES = ("max", "mean")
+ARTIFACT_VERSION = 1
+
+
+def normalize_rows(vectors) -> np.ndarray:
+    """Return a contiguous float32 copy with unit-length rows (zero rows stay zero)."""
+    m = np.array(vectors, dtype=np.float32, ndmin=2, order="C")
+    norms = np.linalg.norm(m, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    m /= norms
+    return m
+
+
+class IntentScorer:
+    def __init__(self, labels: list[str], exemplars, owners, pooling: str = "max", prepared: bool = False):
+        """
+        labels    — intent names, index i ↔ labels[i]
+        exemplars — (E, dim) embedding matrix
+        owners    — length-E intent index for each exemplar row
+        pooling   — how an intent's exemplar similarities collapse: "max" | "mean"
+        prepared  — exemplars are already unit-length float32 grouped by owner
+                    (e.g. a memory-mapped artifact); used as-is, no copy
+        """
+        if pooling not in POOLING_MODES:
+            raise ValueError(f"pooling must be one of {POOLING_MODES}, got '{pooling}'")
+        owners = np.asarray(owners, dtype=np.intp)
+        if len(owners) != len(exemplars):
+            raise ValueError("owners must have one entry per exemplar row")
+        counts = np.bincount(owners, minlength=len(labels))
+        if len(counts) != len(labels) or (counts == 0).any():
+            raise ValueError("every intent needs at least one exemplar")
+
+        if prepared:
+            matrix = exemplars
+        else:
+            # Group rows by intent so pooling is one reduceat over contiguous slices
+            order = np.argsort(owners, kind="stable")
+            matrix = normalize_rows(exemplars)[order]
+            owners = owners[order]
+        self.labels = list(labels)
+        self.pooling = pooling
+        self.matrix = matrix
+        self.owners = owners
+        self._starts = np.searchsorted(owners, np.arange(len(labels)))
+        self._counts = counts.astype(np.float32)
+        self._one_per_intent = len(matrix) == len(labels)
+
+    @classmethod
+    def from_texts(cls, exemplars: dict[str, list[str]], embed, pooling: str = "max") -> "IntentScorer":
+        """Build from {intent: [text, ...]} using embed(list[str]) → (n, dim) array."""
+        labels, texts, owners = list(exemplars), [], []
+        for i, label in enumerate(labels):
+            for text in exemplars[label]:
+                texts.append(text)
+                owners.append(i)
+        return cls(labels, embed(texts), owners, pooling)
+
+    def scores(self, vectors) -> np.ndarray:
+        """(n, dim) message embeddings → (n, n_intents) cosine scores."""
+        sims = normalize_rows(vectors) @ self.matrix.T
+        if self._one_per_intent:
+            return sims
+        if self.pooling == "max":
+            return np.maximum.reduceat(sims, self._starts, axis=1)
+        return np.add.reduceat(sims, self._starts, axis=1) / self._counts
+
+    def best(self, vectors) -> list[tuple[str, float]]:
+        """Top intent and its score for each message embedding."""
+        sims = self.scores(vectors)
+        idx = sims.argmax(axis=1)
+        return [(self.labels[i], float(sims[row, i])) for row, i in enumerate(idx)]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Persisted artifact
+# ─────────────────────────────────────────────────────────────────────────────
+
+def artifact_key(model_name: str, exemplars: dict[str, list[str]]) -> str:
+    """Stable hash of everything the embedding matrix depends on."""
+    blob = json.dumps(
+        {"version": ARTIFACT_VERSION, "model": model_name, "exemplars": exemplars},
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+
+
+def artifact_paths(directory: str, key: str) -> tuple[str, str]:
+    base = os.path.join(directory, f"intents-{key}")
+    return base + ".npy", base + ".json"
+
+
+def write_atomic(path: str, write) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            write(fh)
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+def save_artifact(scorer: IntentScorer, directory: str, key: str, model_name: str) -> str:
+    """Write matrix + sidecar atomically (safe with several workers racing)."""
+    os.makedirs(directory, exist_ok=True)
+    npy_path, meta_path = artifact_paths(directory, key)
+    meta = {
+        "version": ARTIFACT_VERSION,
+        "key": key,
+        "model": model_name,
+        "labels": scorer.labels,
+        "owners": scorer.owners.tolist(),
+        "shape": list(scorer.matrix.shape),
+    }
+    write_atomic(npy_path, lambda fh: np.save(fh, np.asarray(scorer.matrix, dtype=np.float32)))
+    # sidecar last: its presence marks a complete artifact
+    write_atomic(meta_path, lambda fh: fh.write(json.dumps(meta, indent=2).encode("utf-8")))
+    return npy_path
+
+
+def load_artifact(directory: str, key: str, pooling: str = "max") -> IntentScorer | None:
+    """Memory-map a saved artifact; None if missing, stale or unreadable."""
+    npy_path, meta_path = artifact_paths(directory, key)
+    try:
+        with open(meta_path, encoding="utf-8") as fh:
+            meta = json.load(fh)
+        matrix = np.load(npy_path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != ARTIFACT_VERSION or meta.get("key") != key or list(matrix.shape) != meta["shape"]:
+        return None
+    return IntentScorer(meta["labels"], matrix, meta["owners"], pooling, prepared=True)
+
+
+def load_or_build(exemplars: dict[str, list[str]], embed, model_name: str, directory: str | None,
+                  pooling: str = "max") -> tuple[IntentScorer, bool]:
+    """
+    Return (scorer, loaded_from_artifact). With a directory, reuse the artifact
+    for this model + exemplar set or build and save it; without one, build in memory.
+    """
+    if not directory:
+        return IntentScorer.from_texts(exemplars, embed, pooling), False
+    key = artifact_key(model_name, exemplars)
+    scorer = load_artifact(directory, key, pooling)
+    if scorer is not None:
+        return scorer, True
+    built = IntentScorer.from_texts(exemplars, embed, pooling)
+    try:
+        save_artifact(built, directory, key, model_name)
+    except OSError:
+        return built, False
+    # serve from the mapped file so this worker shares pages with the others
+    return load_artifact(directory, key, pooling) or built, False
@@ -0,0 +1,80 @@
+"""
+inventory.py — the inventory report query (GET /api/inventory and the "report" job)
+===================================================================================
+"""
+
+from sqlalchemy import or_, func
+from sqlalchemy.orm import Session
+
+from app.models.item import Item
+from app.models.location import Location
+from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.models.warehouse import Warehouse
+
+
+def inventory_query(
+    db: Session,
+    q: str | None = None,
+    customer: str | None = None,
+    reference_no: str | None = None,
+    date_from: str | None = None,
+    date_to: str | None = None,
+    item_code: str | None = None,
+    warehouse: str | None = None,
+    location: str | None = None,
+):
+    """The filtered inventory report query (also run by the "report" job)."""
+    query = (
+        db.query(
+            ReceivingHeader.id.label("header_id"),
+            ReceivingLine.id.label("line_id"),
+            ReceivingHeader.customer.label("customer"),
+            ReceivingHeader.receiving_date.label("receiving_date"),
+            ReceivingHeader.reference_no.label("reference_no"),
+            Warehouse.code.label("warehouse"),
+            Item.code.label("item_code"),
+            Location.code.label("location"),
+            ReceivingLine.batch_no.label("batch_no"),
+            ReceivingLine.manufacturing_date.label("manufacturing_date"),
+            ReceivingLine.expiry_date.label("expiry_date"),
+            ReceivingLine.shelf_expiry_date.label("shelf_expiry_date"),
+            func.coalesce(ReceivingLine.quantity, 0).label("quantity"),
+            ReceivingLine.status.label("status")
+        )
+        .join(ReceivingLine, ReceivingLine.receiving_id == ReceivingHeader.id)
+        .join(Item, ReceivingLine.item_id == Item.id)
+        .join(Warehouse, ReceivingHeader.warehouse_id == Warehouse.id)
+        .join(Location, ReceivingLine.location_id == Location.id)
+        .order_by(ReceivingHeader.receiving_date.desc(), ReceivingHeader.id.desc())
+    )
+
+    if q:
+        like = f"%{q}%"
+        query = query.filter(
+            or_(
+                ReceivingHeader.customer.ilike(like),
+                ReceivingHeader.reference_no.ilike(like),
+                Warehouse.code.ilike(like),
+                Item.code.ilike(like),
+                Location.code.ilike(like),
+                ReceivingLine.batch_no.ilike(like),
+                ReceivingLine.status.ilike(like)
+            )
+        )
+
+    if customer:
+        query = query.filter(ReceivingHeader.customer.ilike(f"%{customer}%"))
+    if reference_no:
+        query = query.filter(ReceivingHeader.reference_no.ilike(f"%{reference_no}%"))
+    if date_from:
+        query = query.filter(ReceivingHeader.receiving_date >= date_from)
+    if date_to:
+        query = query.filter(ReceivingHeader.receiving_date <= date_to)
+
+    if item_code:
+        query = query.filter(Item.code == item_code)
+    if warehouse:
+        query = query.filter(Warehouse.code == warehouse)
+    if location:
+        query = query.filter(Location.code == location)
+    return query
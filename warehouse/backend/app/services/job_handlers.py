@@ -0,0 +1,165 @@
+"""
+job_handlers.py — the long-running operations offered as background jobs
+=========================================================================
+Each handler takes the job params and a JobContext, reports progress, writes
+its rows to ctx.result_path(...) for download and returns a small summary:
+
+  • receiving.confirm — a /receiving/confirm payload (any number of lines)
+  • report            — the full inventory report (same filters as /api/inventory) → CSV
+  • abc_analysis      — items ranked by received quantity, classed A/B/C by
+                        cumulative share → CSV
+  • export            — every row answering a /chat/query question → CSV
+
+Handlers open their own DB session (they run outside any request).
+"""
+
+import csv
+
+from pydantic import BaseModel
+from sqlalchemy import text as sa_text
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.core.jobs import JobContext, job
+from app.services import analytics_mirror
+from app.schemas.receiving import ReceivingPayload
+from app.services.inventory import inventory_query
+from app.services.receiving import create_receiving
+from app.services.query_engine import J, count_sql, generate_sql_from_question, sanitize_sql
+
+
+def _write_csv(ctx: JobContext, columns: list[str], rows, total: int | None, label: str) -> int:
+    """Stream rows into the job's CSV file, reporting progress; → rows written."""
+    written = 0
+    with open(ctx.result_path(".csv"), "w", newline="", encoding="utf-8") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(columns)
+        for chunk in rows:
+            writer.writerows(chunk)
+            written += len(chunk)
+            ctx.progress(written, total, f"{label}: {written}" + (f" / {total} rows" if total else " rows"))
+    return written
+
+
+def _chunks(result):
+    while chunk := result.fetchmany(settings.QUERY_FETCH_SIZE):
+        yield chunk
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# receiving.confirm
+# ─────────────────────────────────────────────────────────────────────────────
+
+@job("receiving.confirm", schema=ReceivingPayload)
+def confirm_receiving_job(params: dict, ctx: JobContext) -> dict:
+    payload = ReceivingPayload(**params)
+    db = SessionLocal()
+    try:
+        return create_receiving(
+            db, payload,
+            progress=lambda done, total: ctx.progress(done, total, f"{done} / {total} lines"),
+        )
+    finally:
+        db.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# report
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ReportParams(BaseModel):
+    q: str | None = None
+    customer: str | None = None
+    reference_no: str | None = None
+    date_from: str | None = None
+    date_to: str | None = None
+    item_code: str | None = None
+    warehouse: str | None = None
+    location: str | None = None
+
+
+@job("report", schema=ReportParams)
+def report_job(params: dict, ctx: JobContext) -> dict:
+    db = SessionLocal()
+    try:
+        query = inventory_query(db, **ReportParams(**params).model_dump())
+        total = query.order_by(None).count()
+        columns = [c["name"] for c in query.column_descriptions]
+        result = db.execute(query.statement.execution_options(stream_results=True))
+        rows = _write_csv(ctx, columns, _chunks(result), total, "Report")
+    finally:
+        db.close()
+    return {"rows": rows, "columns": columns}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# abc_analysis
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ABCParams(BaseModel):
+    a_share: float = 0.80   # items making up the first 80 % of quantity → A
+    b_share: float = 0.95   # … up to 95 % → B, the rest → C
+
+
+@job("abc_analysis", schema=ABCParams)
+def abc_analysis_job(params: dict, ctx: JobContext) -> dict:
+    bounds = ABCParams(**params)
+    sql = (
+        f"SELECT i.code AS item, SUM(rl.quantity) AS total_qty, COUNT(rl.id) AS line_count{J}"
+        " GROUP BY i.code ORDER BY total_qty DESC"
+    )
+    ctx.progress(0, None, "Summing quantity per item")
+    mirrored = analytics_mirror.try_execute(sql)
+    if mirrored is not None:
+        items = mirrored[1]
+    else:
+        db = SessionLocal()
+        try:
+            items = db.execute(sa_text(sql)).fetchall()
+        finally:
+            db.close()
+
+    grand = sum(float(total_qty or 0) for _, total_qty, _ in items) or 1.0
+    classes = {"A": 0, "B": 0, "C": 0}
+    ranked, running = [], 0.0
+    for rank, (item, total_qty, line_count) in enumerate(items, 1):
+        qty = float(total_qty or 0)
+        # classed by the share *before* this item, so the item crossing a bound stays in the higher class
+        cls = "A" if running < bounds.a_share * grand else "B" if running < bounds.b_share * grand else "C"
+        running += qty
+        classes[cls] += 1
+        ranked.append((rank, item, total_qty, line_count, round(100 * qty / grand, 3),
+                       round(100 * running / grand, 3), cls))
+
+    columns = ["rank", "item", "total_qty", "line_count", "share_pct", "cumulative_pct", "class"]
+    size = settings.QUERY_FETCH_SIZE
+    _write_csv(ctx, columns, (ranked[i:i + size] for i in range(0, len(ranked), size)), len(ranked), "ABC")
+    return {"items": len(ranked), "classes": classes, "total_qty": grand if items else 0}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# export
+# ─────────────────────────────────────────────────────────────────────────────
+
+class ExportParams(BaseModel):
+    question: str
+
+
+@job("export", schema=ExportParams)
+def export_job(params: dict, ctx: JobContext) -> dict:
+    question = ExportParams(**params).question
+    sql, _ = generate_sql_from_question(question)
+    sql = sanitize_sql(sql)
+    db = SessionLocal()
+    try:
+        try:
+            total = int(db.execute(sa_text(count_sql(sql))).scalar() or 0)
+        except Exception:
+            db.rollback()
+            total = None
+        result = db.execute(sa_text(sql).execution_options(stream_results=True))
+        columns = list(result.keys())
+        rows = _write_csv(ctx, columns, _chunks(result), total, "Export")
+    finally:
+        db.close()
+    return {"rows": rows, "columns": columns, "sql": sql}
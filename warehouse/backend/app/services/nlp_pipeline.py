@@ -0,0 +1,142 @@
+"""
+nlp_pipeline.py — one shared analysis per message, consumed by staged steps
+============================================================================
+MessageAnalysis is built once per message: the single-pass normalisation
+(corrected + translated text), one word tokenisation indexing where each
+feature keyword occurs, and — lazily, only if a stage asks — the spaCy doc.
+Slot features (references, WH codes, dates, "customer X" …) are looked up
+through it: a Feature whose keywords are absent costs a dict lookup, one
+that is present is matched only at those word offsets, and the first match
+is cached so every stage shares it.
+
+NLPPipeline runs named stages (intent → slots → missing check) over that
+analysis, times each one into the stage histogram and returns the timings,
+so callers can expose them (e.g. a Server-Timing header).
+"""
+
+import re
+import time
+
+from app.core.metrics import STAGE_SECONDS
+from app.services.normalizer import trie_regex
+
+# Every keyword prefix any Feature starts with (filled as Features are defined)
+_PREFIXES: set[str] = set()
+_keyword_scan: tuple[re.Pattern, dict[str, list[str]]] | None = None
+
+
+def _keyword_scanner() -> tuple[re.Pattern, dict[str, list[str]]]:
+    """
+    One regex finding every word that starts with a registered prefix (trie,
+    longest first), plus, per longest hit, all the prefixes it also covers
+    ("receive" also counts as "rec").
+    """
+    global _keyword_scan
+    if _keyword_scan is None:
+        pattern = re.compile(rf"\b(?:{trie_regex(_PREFIXES)})", re.I)
+        covers = {p: [q for q in _PREFIXES if p.startswith(q)] for p in _PREFIXES}
+        _keyword_scan = (pattern, covers)
+    return _keyword_scan
+
+
+class Feature:
+    def __init__(self, pattern: str, prefixes: tuple[str, ...] | None = None, flags: int = re.I):
+        """
+        pattern  — regex; must start at a word boundary when prefixes are given
+        prefixes — lower-case word starts the match can begin with (None → plain search)
+        """
+        self.regex = re.compile(pattern, flags)
+        self.prefixes = tuple(p.lower() for p in prefixes) if prefixes else None
+        if self.prefixes:
+            global _keyword_scan
+            _PREFIXES.update(self.prefixes)
+            _keyword_scan = None
+
+
+class MessageAnalysis:
+    def __init__(self, raw: str, normalized: str, translated: str, nlp):
+        self.raw = raw
+        self.normalized = normalized
+        self.translated = translated
+        self._nlp = nlp
+        self._doc = None
+        self._starts: dict[str, list[int]] | None = None
+        self._found: dict[Feature, re.Match | None] = {}
+
+    @property
+    def doc(self):
+        if self._doc is None:
+            t0 = time.perf_counter()
+            self._doc = self._nlp(self.normalized)
+            STAGE_SECONDS.observe(time.perf_counter() - t0, stage="spacy")
+        return self._doc
+
+    def _keyword_starts(self) -> dict[str, list[int]]:
+        """One tokenisation: keyword prefix → word start offsets, left to right."""
+        if self._starts is None:
+            pattern, covers = _keyword_scanner()
+            starts: dict[str, list[int]] = {}
+            for m in pattern.finditer(self.normalized):
+                for prefix in covers[m.group().lower()]:
+                    starts.setdefault(prefix, []).append(m.start())
+            self._starts = starts
+        return self._starts
+
+    def find(self, feature: Feature) -> re.Match | None:
+        """Leftmost match of feature in the normalised text (cached)."""
+        found = self._found
+        if feature in found:
+            return found[feature]
+        match = None
+        if feature.prefixes is None:
+            match = feature.regex.search(self.normalized)
+        else:
+            starts = self._starts if self._starts is not None else self._keyword_starts()
+            positions = None
+            for prefix in feature.prefixes:
+                hits = starts.get(prefix)
+                if hits:
+                    positions = hits if positions is None else sorted(positions + hits)
+            if positions:
+                text, match_at = self.normalized, feature.regex.match
+                for pos in positions:
+                    match = match_at(text, pos)
+                    if match:
+                        break
+        found[feature] = match
+        return match
+
+    def group(self, feature: Feature, index: int = 1) -> str | None:
+        match = self.find(feature)
+        return match.group(index) if match else None
+
+
+class NLPPipeline:
+    def __init__(self, prepare, stages: list[tuple[str, object]]):
+        """
+        prepare — message → MessageAnalysis
+        stages  — (name, fn(analysis, result)) run in order; each fills `result`
+        """
+        self.prepare = prepare
+        self.stages = stages
+
+    def run(self, message: str) -> tuple[dict, dict[str, float]]:
+        """→ (result, per-stage milliseconds incl. "nlp_prepare" and "total")."""
+        timings: dict[str, float] = {}
+        started = time.perf_counter()
+        analysis = self.prepare(message)
+        _record(timings, "nlp_prepare", started)
+
+        result: dict = {}
+        for name, fn in self.stages:
+            t0 = time.perf_counter()
+            fn(analysis, result)
+            _record(timings, name, t0)
+        timings["total"] = (time.perf_counter() - started) * 1000
+        return result, timings
+
+
+def _record(timings: dict, name: str, t0: float) -> None:
+    elapsed = time.perf_counter() - t0
+    STAGE_SECONDS.observe(elapsed, stage=name)
+    timings[name] = elapsed * 1000
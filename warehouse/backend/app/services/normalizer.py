@@ -0,0 +1,198 @@
+"""
+normalizer.py — single-pass spell-correction, phrase translation and keyword scan
+==================================================================================
+The word tables (spell corrections, Roman-Urdu phrases) are compiled into
+ONE regex whose alternatives form a character trie, so matching a position
+costs the length of the longest entry rather than the number of entries —
+adding hundreds of words does not slow a message down.
+
+  • TextScanner.scan(message) → (normalized, translated) in one pass:
+      normalized — spell-corrected (what slot extraction reads)
+      translated — corrected + Roman-Urdu phrases mapped to English
+                   (what intent detection reads)
+  • KeywordRules.first(text) → the first rule, in priority order, that
+      matches anywhere. One trie pass over the rules' required keywords
+      ("delete" or "remove" for a delete|remove rule) yields the
+      candidate rules; only those are searched, in priority order. Rules
+      with no required keyword are always searched.
+
+Overlapping phrases resolve leftmost-longest in the single pass instead of
+one table row at a time.
+"""
+
+import itertools
+import re
+
+try:
+    from re import _parser as sre_parse   # Python ≥ 3.11
+except ImportError:                       # pragma: no cover
+    import sre_parse
+
+_PUNCT = ".,!?;:"
+_PUNCT_RUN = "[" + re.escape(_PUNCT) + "]*"
+
+
+def trie_regex(entries) -> str:
+    """
+    Regex source matching any of `entries` (lower-case), built as a character
+    trie. A space in an entry matches one optional space ("maal aaya" also
+    matches "maalaaya"). Alternatives are greedy, so the longest entry wins.
+    """
+    trie: dict = {}
+    for entry in entries:
+        node = trie
+        for ch in entry:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def emit(node: dict) -> str:
+        alts = [
+            (" ?" if ch == " " else re.escape(ch)) + emit(child)
+            for ch, child in sorted(node.items()) if ch
+        ]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return emit(trie)
+
+
+def _key(text: str) -> str:
+    return text.lower().replace(" ", "")
+
+
+def expand_phrase(slots: tuple[str, ...]) -> list[str]:
+    """("maal|saman", "aaya") → ["maal aaya", "saman aaya"]; "" alternative = optional slot."""
+    options = [slot.split("|") for slot in slots]
+    return [" ".join(w for w in combo if w) for combo in itertools.product(*options)]
+
+
+class TextScanner:
+    def __init__(self, corrections: dict[str, str], phrases: list[tuple[tuple[str, ...], str]]):
+        """
+        corrections — misspelling → word (whole whitespace tokens, punctuation kept)
+        phrases     — (slots, replacement); earlier rows win on identical text
+        """
+        self.corrections = {k.lower(): v for k, v in corrections.items()}
+        misspellings: dict[str, list[str]] = {}
+        for wrong, right in self.corrections.items():
+            misspellings.setdefault(right.lower(), []).append(wrong)
+
+        # phrase text → replacement; phrase words also match their misspellings,
+        # so "recieve karo" translates like the corrected "receive karo"
+        self.phrases: dict[str, str] = {}
+        phrase_texts = set()
+        for slots, replacement in phrases:
+            for phrase in expand_phrase(slots):
+                variants = [[w] + misspellings.get(w, []) for w in phrase.split(" ")]
+                for combo in itertools.product(*variants):
+                    text = " ".join(combo)
+                    phrase_texts.add(text)
+                    self.phrases.setdefault(_key(text), replacement)
+
+        branches = []
+        if phrase_texts:
+            branches.append(rf"(?P<phrase>\b{trie_regex(phrase_texts)}\b)")
+        if self.corrections:
+            branches.append(rf"(?P<word>(?<!\S){_PUNCT_RUN}{trie_regex(self.corrections)}{_PUNCT_RUN}(?!\S))")
+        self._pattern = re.compile("|".join(branches) or r"(?!x)x", re.I)
+
+    def correct_word(self, word: str) -> str:
+        clean = word.lower().strip(_PUNCT)
+        corrected = self.corrections.get(clean)
+        if corrected is None:
+            return word
+        if len(word) > 1 and word[0].isupper():
+            corrected = corrected.capitalize()
+        for ch in _PUNCT:
+            if word.endswith(ch):
+                corrected += ch
+                break
+        return corrected
+
+    def scan(self, message: str) -> tuple[str, str]:
+        text = " ".join(message.split())
+        normalized, translated, pos = [], [], 0
+        for m in self._pattern.finditer(text):
+            gap = text[pos:m.start()]
+            normalized.append(gap)
+            translated.append(gap)
+            if m.lastgroup == "phrase":
+                normalized.append(" ".join(self.correct_word(w) for w in m.group().split(" ")))
+                translated.append(self.phrases[_key(m.group())])
+            else:
+                fixed = self.correct_word(m.group())
+                normalized.append(fixed)
+                translated.append(fixed)
+            pos = m.end()
+        normalized.append(text[pos:])
+        translated.append(text[pos:])
+        return "".join(normalized), "".join(translated)
+
+
+_REPEATS = {sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT, getattr(sre_parse, "POSSESSIVE_REPEAT", None)}
+
+
+def required_keywords(items) -> set[str] | None:
+    """
+    Lower-case literals one of which every match of the parsed pattern `items`
+    contains; None when there is no such set (a rule of digits or character classes).
+    """
+    options, run = [], ""
+    for op, arg in list(items) + [(None, None)]:
+        if op is sre_parse.LITERAL:
+            run += chr(arg).lower()
+            continue
+        if op is sre_parse.AT:  # \b, ^, $: zero-width, the literal run goes on
+            continue
+        if run:
+            options.append({run})
+            run = ""
+        found = None
+        if op is sre_parse.SUBPATTERN:
+            found = required_keywords(arg[-1])
+        elif op is sre_parse.BRANCH:
+            branches = [required_keywords(b) for b in arg[1]]
+            if all(branches):
+                found = set().union(*branches)
+        elif op in _REPEATS and arg[0] >= 1:
+            found = required_keywords(arg[2])
+        if found:
+            options.append(found)
+    # the most selective option: longest shortest keyword, then fewest keywords
+    return max(options, key=lambda s: (min(map(len, s)), -len(s)), default=None)
+
+
+class KeywordRules:
+    def __init__(self, rules: list[tuple[re.Pattern, str]]):
+        """rules — (pattern, intent) in priority order; patterns are case-insensitive."""
+        self.rules = [(pattern.search, intent) for pattern, intent in rules]
+        self._always: list[int] = []
+        self._by_keyword: dict[str, set[int]] = {}   # keyword without spaces → rule indexes
+        keywords = set()
+        for i, (pattern, _) in enumerate(rules):
+            required = required_keywords(sre_parse.parse(pattern.pattern, pattern.flags))
+            if required is None:
+                self._always.append(i)
+            for keyword in required or ():
+                keywords.add(keyword)
+                self._by_keyword.setdefault(_key(keyword), set()).add(i)
+        # every keyword starting at each position; the greedy trie reports the longest,
+        # first() adds the shorter ones that are its prefixes. Run on lower-cased text:
+        # re.I makes sre compare case-folded characters, several times slower
+        self._keywords = re.compile(f"(?=({trie_regex(keywords)}))") if keywords else None
+
+    def first(self, text: str) -> str | None:
+        """Intent of the highest-priority rule matching anywhere in text."""
+        candidates = set(self._always)
+        if self._keywords is not None:
+            for found in self._keywords.findall(text.lower()):
+                found = _key(found)
+                for end in range(1, len(found) + 1):
+                    candidates.update(self._by_keyword.get(found[:end], ()))
+        for i in sorted(candidates):
+            search, intent = self.rules[i]
+            if search(text):
+                return intent
+        return None
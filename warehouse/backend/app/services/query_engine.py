@@ -4,9 +4,13 @@ Zero API calls for all built-in queries. Gemini only as last-resort fallback.
 """
 
 import os, re, logging
-from datetime import date
+from datetime import date, timedelta
 from dotenv import load_dotenv
 
+from app.core.metrics import stage
+from app.services import report_snapshots as snap
+from app.services.stock_ledger import cutoff_for, stock_at_sql
+
 load_dotenv()
 logger = logging.getLogger(__name__)
 
@@ -46,7 +50,18 @@ def _q(question: str):
     """Try to match question to a known SQL pattern. Returns (SQL, chart_type) or None."""
     q = question.lower().strip().rstrip("?. !")
 
-    # 1  Total stock per warehouse
+    # 42 Stock at a past date — ledger snapshot + movement replay
+    pt = re.search(r"(?:stock|inventory|on\s+hand)\b.*?\b(?:on|as\s+of|at\s+end\s+of)\s+(\d{4}-\d{2}-\d{2}|yesterday)", q)
+    if pt:
+        try:
+            day = date.today() - timedelta(days=1) if pt.group(1) == "yesterday" else date.fromisoformat(pt.group(1))
+        except ValueError:
+            return None
+        wm = re.search(r"\b(wh\d+)\b", q)
+        wf = f" AND w.code='{wm.group(1).upper()}'" if wm else ""
+        return (stock_at_sql(cutoff_for(day), wf), None)
+
+    # 1  Total stock per warehouse (current stock: always live, never a snapshot)
     if re.search(r"(total|sum).*(stock|quantity|receiving).*(every|each|all|per|by)\s*warehouse", q):
         return (f"SELECT w.code AS warehouse, SUM(rl.quantity) AS total_quantity, COUNT(rl.id) AS total_items{J} GROUP BY w.code ORDER BY total_quantity DESC", "bar")
 
@@ -119,6 +134,16 @@ def _q(question: str):
         level = int(lv.group(1)) if lv else 15
         return (f"SELECT i.code AS item, w.code AS warehouse, rl.quantity, rl.status, rl.batch_no, rh.receiving_date{J} WHERE rl.quantity<{level} ORDER BY rl.quantity ASC", "bar")
 
+    # 41 FEFO pick order for one item (optionally in one warehouse)
+    fm = (re.search(r"\b(?:fefo|pick\s+order|pick\s+list)\s+(?:for\s+)?([a-z][a-z0-9\-]+)", q)
+          or re.search(r"which\s+([a-z][a-z0-9\-]+)\s+(?:should|to|do)\s+(?:i|we)?\s*pick\s+first", q))
+    if fm and fm.group(1) not in ("for", "in", "at", "the"):
+        wm = re.search(r"\b(wh\d+)\b", q)
+        wf = f" AND w.code='{wm.group(1).upper()}'" if wm else ""
+        return (f"SELECT i.code AS item, w.code AS warehouse, loc.code AS location, rl.batch_no, rl.quantity, rl.expiry_date, DATEDIFF(rl.expiry_date,CURDATE()) AS days_until_expiry, rh.reference_no{J} WHERE i.code='{fm.group(1).upper()}'{wf} AND rl.status='ok' AND rl.quantity>0 AND rl.expiry_date>=CURDATE() ORDER BY rl.expiry_date ASC, rl.id ASC LIMIT 20", None)
+
+    # Expiry filters compare the bare column with CURDATE() (a constant to the optimiser, on the DB clock
+    # like the DATEDIFF beside it): ix_receiving_lines_expiry_date turns them into range scans
     # 16 Expiring in N days
     em = re.search(r"expir\w*\s*(?:in|within|next)\s*(?:the\s+)?(\d+)\s*days?", q)
     if em:
@@ -151,6 +176,8 @@ def _q(question: str):
 
     # 21 Receiving volume by warehouse
     if re.search(r"(receiving|inbound)\s*(volume|count|total)\s*(by|per)\s*warehouse", q):
+        if snap.snapshots_ready():
+            return (snap.VOLUME_BY_WAREHOUSE, "bar")
         return (f"SELECT w.code AS warehouse, COUNT(rh.id) AS total_receivings, SUM(rl.quantity) AS total_quantity, ROUND(AVG(rl.quantity),1) AS avg_qty, MIN(rh.receiving_date) AS earliest, MAX(rh.receiving_date) AS latest{J} GROUP BY w.code ORDER BY total_quantity DESC", "bar")
 
     # 22 Average quantity
@@ -159,6 +186,8 @@ def _q(question: str):
 
     # 23 Monthly trend
     if re.search(r"monthly\s*(receiving|inbound)?\s*(trend|pattern|history|volume)", q):
+        if snap.snapshots_ready():
+            return (snap.MONTHLY_TREND, "line")
         return (f"SELECT DATE_FORMAT(rh.receiving_date,'%Y-%m') AS month, COUNT(rh.id) AS transactions, SUM(rl.quantity) AS total_qty, ROUND(AVG(rl.quantity),1) AS avg_qty, SUM(CASE WHEN rl.status='damaged' THEN 1 ELSE 0 END) AS damaged_count{J} GROUP BY DATE_FORMAT(rh.receiving_date,'%Y-%m') ORDER BY month", "line")
 
     # 24 A1 vs A2
@@ -209,6 +238,8 @@ def _q(question: str):
 
     # 34 Summarize / last 24h
     if re.search(r"(summarize|summary|last\s*24\s*hours?)", q) and re.search(r"receiv", q):
+        if snap.snapshots_ready():
+            return (snap.LAST_24_HOURS, "bar")
         return (f"SELECT w.code AS warehouse, COUNT(rl.id) AS items_received, SUM(rl.quantity) AS total_qty, SUM(CASE WHEN rl.status='damaged' THEN 1 ELSE 0 END) AS damaged_count{J} WHERE rh.receiving_date>=DATE_SUB(CURDATE(),INTERVAL 1 DAY) GROUP BY w.code ORDER BY total_qty DESC", "bar")
 
     # 35 Stale stock
@@ -242,7 +273,8 @@ def _q(question: str):
 
 def generate_sql_from_question(question: str) -> tuple:
     """Returns (sql, chart_type). chart_type may be None."""
-    result = _q(question)
+    with stage("sql_pattern_match"):
+        result = _q(question)
     if result:
         sql, chart_type = result
         logger.info("Pattern matched: %s", question[:60])
@@ -253,8 +285,9 @@ def generate_sql_from_question(question: str) -> tuple:
         try:
             from google import genai
             client = genai.Client(api_key=API_KEY)
-            r = client.models.generate_content(model=MODEL_NAME,
-                contents=f"{SCHEMA_PROMPT}\n\nQuestion: {question}\n\nSQL:")
+            with stage("sql_gemini_fallback"):
+                r = client.models.generate_content(model=MODEL_NAME,
+                    contents=f"{SCHEMA_PROMPT}\n\nQuestion: {question}\n\nSQL:")
             s = re.sub(r"^```(?:sql)?\s*","", r.text.strip(), flags=re.I)
             s = re.sub(r"\s*```$","", s)
             return (s.strip().rstrip(";") + ";", None)
@@ -284,10 +317,48 @@ def sanitize_sql(sql: str) -> str:
     return c
 
 
-def format_query_results(question: str, columns: list[str], rows: list[dict]) -> str:
+# ── Paging helpers: bound any SELECT without re-parsing it ─────────────────
+# "OFFSET n" with no limit: MySQL needs the max BIGINT (its documented idiom),
+# SQLite -1; DuckDB and others accept OFFSET alone.
+MYSQL_MAX_LIMIT = 18446744073709551615
+_OPEN_LIMIT = {"mysql": f"LIMIT {MYSQL_MAX_LIMIT} ", "sqlite": "LIMIT -1 "}
+
+_TRAILING_LIMIT_RE = re.compile(r"\bLIMIT\s+(\d+)(?:\s*,\s*(\d+)|\s+OFFSET\s+(\d+))?\s*$", re.I)
+
+
+def page_sql(sql: str, limit: int | None, offset: int = 0, dialect: str = "mysql") -> str:
+    """
+    Bound a SELECT to one page; limit=None → every row from offset. A trailing
+    LIMIT of the SQL itself is rewritten in place, the page taken within it,
+    so its ORDER BY and any duplicate column names are left alone.
+    """
+    s = sql.strip().rstrip(";").rstrip()
+    offset = int(offset)
+    m = _TRAILING_LIMIT_RE.search(s)
+    if m:
+        if m.group(2) is not None:                      # LIMIT offset, count
+            own_offset, own_limit = int(m.group(1)), int(m.group(2))
+        else:                                           # LIMIT count [OFFSET offset]
+            own_limit, own_offset = int(m.group(1)), int(m.group(3) or 0)
+        s = s[:m.start()].rstrip()
+        remaining = max(own_limit - offset, 0)
+        limit = remaining if limit is None else min(int(limit), remaining)
+        offset += own_offset
+    if limit is None:
+        return f"{s} {_OPEN_LIMIT.get(dialect, '')}OFFSET {offset}" if offset else s
+    return f"{s} LIMIT {int(limit)} OFFSET {offset}"
+
+
+def count_sql(sql: str) -> str:
+    return f"SELECT COUNT(*) FROM ({sql.strip().rstrip(';').rstrip()}) AS _count"
+
+
+def format_query_results(question: str, columns: list[str], rows: list[dict], total: int | None = None) -> str:
+    """rows may be a preview (first 20) of a larger result; pass the full count as total."""
     if not rows:
         return "📭 No data found matching your question."
-    total = len(rows)
+    if total is None:
+        total = len(rows)
     if len(columns) == 1 and total == 1:
         col = columns[0].replace("_", " ").title()
         return f"📊 **{col}:** {list(rows[0].values())[0]}"
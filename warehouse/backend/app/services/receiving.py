@@ -0,0 +1,263 @@
+"""
+receiving.py — receiving writes shared by the API and background jobs
+======================================================================
+Warehouse / location / item codes are resolved through a small per-process
+cache (CODE_CACHE_TTL seconds): a GRN of many lines, or a stream of one-line
+smart receives, looks each code up once instead of once per line. Only ids
+that exist are cached; an unknown item is created, race-safely, and cached
+once the transaction that created it has committed.
+"""
+
+import secrets
+import threading
+import time
+from datetime import date
+
+from fastapi import HTTPException
+from sqlalchemy import event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.item import Item
+from app.models.location import Location
+from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.models.warehouse import Warehouse
+from app.schemas.receiving import ReceivingPayload, SmartReceivePayload
+from app.services import stock_ledger as ledger
+from app.services.expiry_index import EXPIRY_INDEX
+
+SMART_RECEIVE_CUSTOMER = "Walk-in"   # header customer when a smart receive names none
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Code → id lookups
+# ─────────────────────────────────────────────────────────────────────────────
+
+class CodeCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._ids: dict[tuple, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> int | None:
+        with self._lock:
+            entry = self._ids.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return None
+        return entry[1]
+
+    def put(self, key: tuple, value: int) -> int:
+        with self._lock:
+            if len(self._ids) > 50_000:
+                self._ids.clear()
+            self._ids[key] = (time.monotonic() + self.ttl, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+
+
+CODES = CodeCache(settings.CODE_CACHE_TTL)
+_NEW_ITEMS = "receiving.new_items"  # db.info key: {cache key: id} of items created in the open transaction
+
+
+def warehouse_id(db: Session, code: str) -> int | None:
+    key = ("warehouse", code.upper())
+    found = CODES.get(key)
+    if found is None:
+        found = db.execute(select(Warehouse.id).where(Warehouse.code == code)).scalar()
+        if found is not None:
+            CODES.put(key, found)
+    return found
+
+
+def location_id(db: Session, wh_id: int, code: str | None) -> int | None:
+    """Location `code` of the warehouse; None → its first location (the receiving dock)."""
+    key = ("location", wh_id, (code or "").upper())
+    found = CODES.get(key)
+    if found is None:
+        query = select(Location.id).where(Location.warehouse_id == wh_id)
+        query = query.where(Location.code == code) if code else query.order_by(Location.id).limit(1)
+        found = db.execute(query).scalar()
+        if found is not None:
+            CODES.put(key, found)
+    return found
+
+
+def item_id(db: Session, code: str, match_name: bool = False) -> int:
+    """
+    Id of the item with this code (created if missing). With match_name, a free-text
+    name from chat ("wrench") also matches code WRENCH or an item named "Wrench",
+    and a new item gets the upper-cased code.
+    """
+    # name matches are cached apart from exact codes: "wrench" may resolve to an item named Wrench
+    key = ("item_name", code.upper()) if match_name else ("item_code", code)
+    pending = db.info.setdefault(_NEW_ITEMS, {})
+    found = CODES.get(key) or pending.get(key)
+    if found is not None:
+        return found
+    codes = [code.upper(), code] if match_name else [code]
+    found = db.execute(select(Item.id).where(Item.code.in_(codes)).order_by(Item.id).limit(1)).scalar()
+    if found is None and match_name:
+        found = db.execute(
+            select(Item.id).where(func.lower(Item.name) == code.lower()).order_by(Item.id).limit(1)
+        ).scalar()
+    if found is None:
+        new_code = code.upper() if match_name else code
+        try:
+            with db.begin_nested():  # another worker may create the same code concurrently
+                item = Item(code=new_code, name=code)
+                db.add(item)
+            pending[key] = item.id  # a rollback would leave a cached id pointing nowhere
+            return item.id
+        except IntegrityError:
+            found = db.execute(select(Item.id).where(Item.code == new_code)).scalar()
+    if found in pending.values():
+        pending[key] = found
+        return found
+    return CODES.put(key, found)
+
+
+@event.listens_for(Session, "after_commit")
+def _cache_new_items(db: Session) -> None:
+    if not db.in_nested_transaction():  # fires for SAVEPOINTs too
+        for key, found in db.info.pop(_NEW_ITEMS, {}).items():
+            CODES.put(key, found)
+
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_new_items(db: Session, transaction) -> None:
+    if transaction.parent is None:  # rolled back or closed: the items are gone
+        db.info.pop(_NEW_ITEMS, None)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Writes
+# ─────────────────────────────────────────────────────────────────────────────
+
+def create_receiving(db: Session, payload: ReceivingPayload, progress=None) -> dict:
+    """
+    Shared by /receiving/confirm and the receiving.confirm job.
+    progress — optional callback(done, total) after each line.
+    """
+    wh_id = warehouse_id(db, payload.warehouse)
+    if wh_id is None:
+        raise HTTPException(status_code=404, detail="Warehouse not found")
+
+    header = ReceivingHeader(
+        customer=payload.customer,
+        receiving_date=payload.receiving_date,
+        warehouse_id=wh_id,
+        reference_no=payload.reference_no
+    )
+    db.add(header)
+    db.flush()  # ensure header.id is available
+
+    for n, line in enumerate(payload.items, 1):
+        item_code = (line.item_code or "").strip()
+        if not item_code:
+            raise HTTPException(status_code=400, detail="Item code is required for each line")
+
+        # Ensure location exists and belongs to the warehouse
+        loc_id = location_id(db, wh_id, line.location) if line.location else None
+        if loc_id is None:
+            raise HTTPException(status_code=404, detail=f"Location not found: {line.location}")
+
+        db.add(ReceivingLine(
+            receiving_id=header.id,
+            item_id=item_id(db, item_code),  # created if missing
+            location_id=loc_id,
+            quantity=line.quantity,
+            batch_no=line.batch_no,
+            manufacturing_date=line.manufacturing_date,
+            expiry_date=line.expiry_date,
+            shelf_expiry_date=line.shelf_expiry_date,
+            status=line.status
+        ))
+        if progress:
+            progress(n, len(payload.items))
+
+    ledger.record(db, {}, "receive", header_ids=[header.id])
+    db.commit()
+    db.refresh(header)
+    EXPIRY_INDEX.refresh_headers(db, [header.id])
+
+    return {"status": "success", "grn_id": header.id}
+
+
+def smart_receive(db: Session, slots: SmartReceivePayload) -> dict:
+    """
+    One-line receive straight from extract_slots: validates the slots, then
+    writes header + line + stock movement in one transaction. Optional slots
+    left out are defaulted and listed under "defaulted".
+    """
+    item_text = (slots.item_code or slots.item_name or "").strip()
+    if not item_text:
+        raise HTTPException(status_code=400, detail="item_code or item_name is required.")
+    if not slots.quantity or slots.quantity <= 0:
+        raise HTTPException(status_code=400, detail="quantity must be > 0.")
+    if not slots.warehouse:
+        raise HTTPException(status_code=400, detail="warehouse is required.")
+    status = (slots.status or "ok").strip().lower()
+    if status not in ("ok", "damaged"):
+        raise HTTPException(status_code=400, detail="status must be 'ok' or 'damaged'.")
+
+    wh_code = slots.warehouse.strip().upper()
+    wh_id = warehouse_id(db, wh_code)
+    if wh_id is None and not wh_code.startswith("WH"):
+        # extract_slots keeps what follows "wh" / "warehouse": "WH1" → "1"
+        wh_id = warehouse_id(db, f"WH{wh_code}")
+        wh_code = f"WH{wh_code}" if wh_id is not None else wh_code
+    if wh_id is None:
+        raise HTTPException(status_code=404, detail=f"Warehouse '{wh_code}' not found.")
+    loc_code = slots.location.strip().upper() if slots.location else None
+    loc_id = location_id(db, wh_id, loc_code)
+    if loc_id is None:
+        detail = f"Location '{loc_code}' not found in {wh_code}." if loc_code else f"{wh_code} has no locations."
+        raise HTTPException(status_code=404, detail=detail)
+
+    defaulted = [name for name, value in (
+        ("location", loc_code), ("customer", slots.customer), ("reference_no", slots.reference_no),
+        ("status", slots.status), ("receiving_date", slots.receiving_date),
+    ) if not value]
+    receiving_date = slots.receiving_date or date.today()
+    reference_no = (slots.reference_no or "").strip() or (
+        f"SR-{receiving_date:%Y%m%d}-{secrets.token_hex(3).upper()}"
+    )
+
+    header = ReceivingHeader(
+        customer=(slots.customer or "").strip() or SMART_RECEIVE_CUSTOMER,
+        receiving_date=receiving_date,
+        warehouse_id=wh_id,
+        reference_no=reference_no,
+    )
+    db.add(header)
+    db.flush()
+    line = ReceivingLine(
+        receiving_id=header.id,
+        item_id=item_id(db, item_text, match_name=True),  # the card's field takes a code or a name
+        location_id=loc_id,
+        quantity=slots.quantity,
+        status=status,
+        batch_no=(slots.batch_no or "").strip() or None,
+        manufacturing_date=slots.manufacturing_date,
+        expiry_date=slots.expiry_date,
+        shelf_expiry_date=slots.shelf_expiry_date,
+    )
+    db.add(line)
+    db.flush()
+    ledger.record(db, {}, "receive", line_ids=[line.id])
+    db.commit()
+    EXPIRY_INDEX.refresh_lines(db, [line.id])
+
+    if loc_code is None:
+        loc_code = db.execute(select(Location.code).where(Location.id == loc_id)).scalar()
+    return {
+        "status": "success", "grn_id": header.id, "line_id": line.id,
+        "item_code": db.execute(select(Item.code).where(Item.id == line.item_id)).scalar(),
+        "quantity": line.quantity, "warehouse": wh_code, "location": loc_code,
+        "reference_no": reference_no, "customer": header.customer, "line_status": status,
+        "defaulted": defaulted,
+    }
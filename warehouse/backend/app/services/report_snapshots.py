@@ -0,0 +1,247 @@
+"""
+report_snapshots.py — incrementally maintained daily / monthly receiving summaries
+==================================================================================
+The report intent and the canned trend questions ("Monthly receiving trend",
+"Receiving volume by warehouse", "summarize last 24 hours") used to aggregate
+the full 4-table join on every request. The scheduler now keeps two summary
+tables instead:
+
+  • report_daily_snapshots   — (receiving_date, warehouse) → counts / quantities
+  • report_monthly_snapshots — (YYYY-MM, warehouse), rolled up from the daily rows
+
+refresh() only re-aggregates the receiving dates that can have changed:
+dates of headers created since the last run (created_at watermark, with a
+small overlap for transactions that committed late) plus dates marked dirty
+by edits and deletes (mark_headers / mark_lines, called by the write routes
+in the same transaction). A date is always recomputed from scratch, so a
+refresh is idempotent and concurrent runs from several workers are harmless.
+
+Snapshots are as fresh as REPORT_SNAPSHOT_INTERVAL; until the first refresh
+has completed the query engine keeps using the live queries. Current-stock
+questions (total stock per warehouse) always run live: a receive must show
+up in the next answer, not after the next refresh.
+"""
+
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, delete, func, insert, select, text
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.models.report_snapshot import (
+    ReportDailySnapshot, ReportMonthlySnapshot, ReportSnapshotDirty, ReportSnapshotState,
+)
+
+_STATE = "receiving"
+_DATE_BATCH = 200
+
+# Once a refresh has been seen (here or in another worker), reads may use the snapshots
+_ready = False
+_ready_checked = 0.0
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Invalidation — called by routes that change existing receiving rows
+# ─────────────────────────────────────────────────────────────────────────────
+
+def mark_headers(db: Session, header_ids) -> None:
+    """Mark the receiving dates of these headers for re-aggregation (call before deleting them)."""
+    if header_ids:
+        db.execute(insert(ReportSnapshotDirty).from_select(
+            ["receiving_date"],
+            select(ReceivingHeader.receiving_date).where(ReceivingHeader.id.in_(list(header_ids))).distinct(),
+        ))
+
+
+def mark_lines(db: Session, line_ids) -> None:
+    if line_ids:
+        db.execute(insert(ReportSnapshotDirty).from_select(
+            ["receiving_date"],
+            select(ReceivingHeader.receiving_date)
+            .join(ReceivingLine, ReceivingLine.receiving_id == ReceivingHeader.id)
+            .where(ReceivingLine.id.in_(list(line_ids)))
+            .distinct(),
+        ))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Refresh
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _rebuild_days(db: Session, days: list) -> None:
+    damaged = ReceivingLine.status == "damaged"
+    db.execute(delete(ReportDailySnapshot).where(ReportDailySnapshot.receiving_date.in_(days)))
+    db.execute(insert(ReportDailySnapshot).from_select(
+        ["receiving_date", "warehouse_id", "receivings", "line_count", "total_qty",
+         "damaged_lines", "damaged_qty", "ok_qty"],
+        select(
+            ReceivingHeader.receiving_date,
+            ReceivingHeader.warehouse_id,
+            func.count(func.distinct(ReceivingHeader.id)),
+            func.count(ReceivingLine.id),
+            func.coalesce(func.sum(ReceivingLine.quantity), 0),
+            func.sum(case((damaged, 1), else_=0)),
+            func.sum(case((damaged, ReceivingLine.quantity), else_=0)),
+            func.sum(case((ReceivingLine.status == "ok", ReceivingLine.quantity), else_=0)),
+        )
+        .join(ReceivingLine, ReceivingLine.receiving_id == ReceivingHeader.id)
+        .where(ReceivingHeader.receiving_date.in_(days))
+        .group_by(ReceivingHeader.receiving_date, ReceivingHeader.warehouse_id),
+    ))
+
+
+def _rebuild_months(db: Session, months: set[str]) -> None:
+    """Roll the daily rows of each month up into report_monthly_snapshots."""
+    for month in sorted(months):
+        year, mon = map(int, month.split("-"))
+        first = f"{month}-01"
+        nxt = f"{year + mon // 12:04d}-{mon % 12 + 1:02d}-01"
+        rows = db.execute(
+            select(ReportDailySnapshot)
+            .where(ReportDailySnapshot.receiving_date >= first, ReportDailySnapshot.receiving_date < nxt)
+        ).scalars().all()
+        totals: dict[int, dict] = defaultdict(lambda: {
+            "receivings": 0, "line_count": 0, "total_qty": 0, "damaged_lines": 0, "damaged_qty": 0, "ok_qty": 0,
+            "earliest": None, "latest": None,
+        })
+        for r in rows:
+            t = totals[r.warehouse_id]
+            for k in ("receivings", "line_count", "total_qty", "damaged_lines", "damaged_qty", "ok_qty"):
+                t[k] += getattr(r, k) or 0
+            t["earliest"] = min(t["earliest"] or r.receiving_date, r.receiving_date)
+            t["latest"] = max(t["latest"] or r.receiving_date, r.receiving_date)
+        db.execute(delete(ReportMonthlySnapshot).where(ReportMonthlySnapshot.month == month))
+        if totals:
+            db.execute(insert(ReportMonthlySnapshot), [
+                {"month": month, "warehouse_id": wh, **t} for wh, t in totals.items()
+            ])
+
+
+def _as_datetime(value):
+    # SQLite hands CURRENT_TIMESTAMP back as text
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def refresh(db: Session) -> dict:
+    """Bring the snapshots up to date; → {"days": n, "months": n, "full": bool}."""
+    global _ready
+    # row lock: on MySQL concurrent refreshes from several workers queue up here
+    state = db.execute(
+        select(ReportSnapshotState).where(ReportSnapshotState.name == _STATE).with_for_update()
+    ).scalar_one_or_none()
+    watermark = state.watermark if state else None
+
+    new_headers = select(ReceivingHeader.receiving_date).distinct()
+    if watermark is not None:
+        since = watermark - timedelta(seconds=settings.REPORT_SNAPSHOT_OVERLAP)
+        new_headers = new_headers.where(ReceivingHeader.created_at >= since)
+    else:
+        db.execute(delete(ReportDailySnapshot))  # first run: full build
+        db.execute(delete(ReportMonthlySnapshot))
+    # capped at the DB clock: a future-dated created_at must not push the watermark past new rows
+    latest, now = db.execute(select(func.max(ReceivingHeader.created_at), func.now())).one()
+    if latest is not None and now is not None:
+        latest = min(latest, _as_datetime(now))
+    days = set(db.execute(new_headers).scalars())
+
+    dirty = db.execute(select(ReportSnapshotDirty.id, ReportSnapshotDirty.receiving_date)).all()
+    days.update(d for _, d in dirty)
+
+    ordered = sorted(days)
+    for i in range(0, len(ordered), _DATE_BATCH):
+        _rebuild_days(db, ordered[i:i + _DATE_BATCH])
+    months = {d.strftime("%Y-%m") for d in ordered}
+    _rebuild_months(db, months)
+
+    if dirty:
+        db.execute(delete(ReportSnapshotDirty).where(ReportSnapshotDirty.id <= max(i for i, _ in dirty)))
+    if state is None:
+        state = ReportSnapshotState(name=_STATE)
+        db.add(state)
+    if latest is not None and (watermark is None or latest > watermark):
+        state.watermark = latest
+    state.refreshed_at = func.now()
+    db.commit()
+    _ready = True
+    return {"days": len(ordered), "months": len(months), "full": watermark is None}
+
+
+def refresh_task() -> dict:
+    """Scheduler entry point (own session)."""
+    db = SessionLocal()
+    try:
+        return refresh(db)
+    finally:
+        db.close()
+
+
+def snapshots_ready() -> bool:
+    """True once any worker has built the snapshots (DB checked at most every 30 s)."""
+    global _ready, _ready_checked
+    if not settings.REPORT_SNAPSHOTS:
+        return False
+    if _ready:
+        return True
+    now = time.monotonic()
+    if now - _ready_checked > 30:
+        _ready_checked = now
+        db = SessionLocal()
+        try:
+            _ready = db.execute(
+                select(ReportSnapshotState.refreshed_at).where(ReportSnapshotState.name == _STATE)
+            ).scalar() is not None
+        except Exception:
+            _ready = False  # tables not migrated yet
+        finally:
+            db.close()
+    return _ready
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Report SQL over the snapshots (same columns as the live queries they replace)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_D = " FROM report_daily_snapshots s JOIN warehouses w ON s.warehouse_id = w.id"
+_M = " FROM report_monthly_snapshots s JOIN warehouses w ON s.warehouse_id = w.id"
+_AVG = "ROUND(1.0*SUM(s.total_qty)/NULLIF(SUM(s.line_count),0),1)"
+
+VOLUME_BY_WAREHOUSE = (
+    f"SELECT w.code AS warehouse, SUM(s.line_count) AS total_receivings, SUM(s.total_qty) AS total_quantity,"
+    f" {_AVG} AS avg_qty, MIN(s.earliest) AS earliest, MAX(s.latest) AS latest{_M}"
+    " GROUP BY w.code ORDER BY total_quantity DESC"
+)
+MONTHLY_TREND = (
+    f"SELECT s.month AS month, SUM(s.line_count) AS transactions, SUM(s.total_qty) AS total_qty,"
+    f" {_AVG} AS avg_qty, SUM(s.damaged_lines) AS damaged_count{_M}"
+    " GROUP BY s.month ORDER BY month"
+)
+LAST_24_HOURS = (
+    f"SELECT w.code AS warehouse, SUM(s.line_count) AS items_received, SUM(s.total_qty) AS total_qty,"
+    f" SUM(s.damaged_lines) AS damaged_count{_D}"
+    " WHERE s.receiving_date>=DATE_SUB(CURDATE(),INTERVAL 1 DAY) GROUP BY w.code ORDER BY total_qty DESC"
+)
+
+
+def report_summary(db: Session, days: int = 30) -> dict:
+    """Dashboard payload for the report workspace, read from the snapshots."""
+    def rows(sql: str, **params) -> list[dict]:
+        result = db.execute(text(sql), params)
+        return [dict(r._mapping) for r in result]
+
+    state = db.get(ReportSnapshotState, _STATE)
+    recent = rows(
+        "SELECT s.receiving_date, w.code AS warehouse, s.receivings, s.line_count, s.total_qty,"
+        f" s.damaged_lines, s.damaged_qty, s.ok_qty{_D}"
+        " WHERE s.receiving_date > :since ORDER BY s.receiving_date DESC, w.code",
+        since=date.today() - timedelta(days=days),
+    )
+    return {
+        "as_of": state.refreshed_at if state else None,
+        "by_warehouse": rows(VOLUME_BY_WAREHOUSE),
+        "monthly": rows(MONTHLY_TREND),
+        "recent_days": recent,
+    }
@@ -0,0 +1,257 @@
+"""
+stock_ledger.py — append-only stock movements and point-in-time balances
+========================================================================
+Receiving lines are edited in place and deleted outright, so the lines alone
+cannot say what was in stock on a past date. Every receiving write therefore
+also appends to stock_movements, in the same transaction:
+
+    before = capture(db, line_ids=[...])      # state of the lines about to change
+    ... update / delete ...
+    record(db, before, "edit", line_ids=[...])  # diff → movement rows
+
+A line that keeps its (item, warehouse, location) yields one row with the
+quantity difference; one that moves yields -old / +new. Edits that do not
+touch stock (batch_no, dates, customer) yield nothing.
+
+The scheduler (every STOCK_SNAPSHOT_INTERVAL s) materialises per-(item,
+warehouse, location) balances into stock_balances: previous snapshot + the
+movements since it. Stock at time T is then the last snapshot taken before T
+plus the movements between the two, so the replay is bounded by the snapshot
+interval, not by the size of the history. The very first snapshot is the
+opening balance summed from receiving_lines; history starts there.
+
+Movement ids are allocated at INSERT but become visible at COMMIT, so on
+InnoDB a lower id can appear after a higher one. A snapshot covers
+"every movement up to id N" and a later one starts after N, so it must not
+take an N that a still-open transaction may sit below: it only covers
+movements older than STOCK_SNAPSHOT_LAG seconds, and the ones after that
+are replayed from the movements. Every write records its movements just
+before committing, so the lag only has to outlast that commit.
+
+Timestamps are on the DB server's clock (moved_at / taken_at default to now()).
+"""
+
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import case, delete, func, insert, literal, or_, select, union_all
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.models.stock_ledger import StockBalance, StockMovement, StockSnapshot
+
+_BATCH = 1000
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Recording — called by every receiving write, inside its transaction
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _state_query():
+    return (
+        select(
+            ReceivingLine.id, ReceivingLine.receiving_id, ReceivingLine.item_id,
+            ReceivingHeader.warehouse_id, ReceivingLine.location_id,
+            ReceivingLine.quantity, ReceivingLine.status,
+        )
+        .join(ReceivingHeader, ReceivingLine.receiving_id == ReceivingHeader.id)
+    )
+
+
+def capture(db: Session, line_ids=(), header_ids=()) -> dict[int, tuple]:
+    """Current stock-relevant state of the lines (and all lines of the headers), by line id."""
+    state = {}
+    for column, ids in ((ReceivingLine.id, sorted(set(line_ids))),
+                        (ReceivingLine.receiving_id, sorted(set(header_ids)))):
+        for i in range(0, len(ids), _BATCH):
+            for line_id, *rest in db.execute(_state_query().where(column.in_(ids[i:i + _BATCH]))):
+                state[line_id] = tuple(rest)
+    return state
+
+
+def _movement(line_id: int, state: tuple, sign: int, reason: str) -> dict:
+    receiving_id, item_id, warehouse_id, location_id, quantity, status = state
+    qty = sign * (quantity or 0)
+    return {
+        "reason": reason, "line_id": line_id, "receiving_id": receiving_id,
+        "item_id": item_id, "warehouse_id": warehouse_id, "location_id": location_id,
+        "qty_delta": qty, "damaged_delta": qty if status == "damaged" else 0,
+    }
+
+
+def record(db: Session, before: dict, reason: str, line_ids=(), header_ids=()) -> int:
+    """
+    Append the movements that turn `before` into the lines' current state.
+    New lines are passed by line_ids / header_ids; lines missing now were deleted.
+    → number of movement rows written.
+    """
+    db.flush()
+    after = capture(db, set(before) | set(line_ids), header_ids)
+    rows = []
+    for line_id in sorted(before.keys() | after.keys()):
+        old, new = before.get(line_id), after.get(line_id)
+        if old == new:
+            continue
+        if old and new and old[1:4] == new[1:4]:   # same item / warehouse / location
+            out, back = _movement(line_id, old, -1, reason), _movement(line_id, new, 1, reason)
+            back["qty_delta"] += out["qty_delta"]
+            back["damaged_delta"] += out["damaged_delta"]
+            if back["qty_delta"] or back["damaged_delta"]:
+                rows.append(back)
+            continue
+        if old:
+            rows.append(_movement(line_id, old, -1, reason))
+        if new:
+            rows.append(_movement(line_id, new, 1, reason))
+    if rows:
+        db.execute(insert(StockMovement), rows)
+    return len(rows)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Snapshots
+# ─────────────────────────────────────────────────────────────────────────────
+
+_KEY = ("item_id", "warehouse_id", "location_id")
+
+
+def _rollup(snapshot_id: int, source):
+    """INSERT ... SELECT of source(item_id, warehouse_id, location_id, qty, damaged) summed per key."""
+    s = source.subquery()
+    qty, damaged = func.sum(s.c.qty), func.sum(s.c.damaged)
+    return insert(StockBalance).from_select(
+        ["snapshot_id", *_KEY, "quantity", "damaged_qty"],
+        select(literal(snapshot_id), s.c.item_id, s.c.warehouse_id, s.c.location_id, qty, damaged)
+        .group_by(s.c.item_id, s.c.warehouse_id, s.c.location_id)
+        .having(or_(qty != 0, damaged != 0)),
+    )
+
+
+def _as_datetime(value):
+    # SQLite hands CURRENT_TIMESTAMP back as text
+    return datetime.fromisoformat(value) if isinstance(value, str) else value
+
+
+def take_snapshot(db: Session) -> dict | None:
+    """Materialise balances up to the lag horizon; → {"snapshot_id", "movements"} or None when nothing moved."""
+    last = db.execute(select(StockSnapshot).order_by(StockSnapshot.id.desc()).limit(1)).scalar()
+    horizon = _as_datetime(db.execute(select(func.now())).scalar()) - timedelta(seconds=settings.STOCK_SNAPSHOT_LAG)
+    top = db.execute(select(func.max(StockMovement.id)).where(StockMovement.moved_at < horizon)).scalar() or 0
+    if last is not None and top <= last.last_movement_id:
+        return None
+
+    snap = StockSnapshot(last_movement_id=top)
+    db.add(snap)
+    db.flush()
+    if last is None:
+        # opening balance: everything currently on the lines, less the movements
+        # after `top` (visible with their lines; they are replayed from the ledger)
+        source = union_all(
+            select(
+                ReceivingLine.item_id, ReceivingHeader.warehouse_id, ReceivingLine.location_id,
+                ReceivingLine.quantity.label("qty"),
+                case((ReceivingLine.status == "damaged", ReceivingLine.quantity), else_=0).label("damaged"),
+            )
+            .join(ReceivingHeader, ReceivingLine.receiving_id == ReceivingHeader.id),
+            select(StockMovement.item_id, StockMovement.warehouse_id, StockMovement.location_id,
+                   -StockMovement.qty_delta, -StockMovement.damaged_delta)
+            .where(StockMovement.id > top),
+        )
+    else:
+        source = union_all(
+            select(StockBalance.item_id, StockBalance.warehouse_id, StockBalance.location_id,
+                   StockBalance.quantity.label("qty"), StockBalance.damaged_qty.label("damaged"))
+            .where(StockBalance.snapshot_id == last.id),
+            select(StockMovement.item_id, StockMovement.warehouse_id, StockMovement.location_id,
+                   StockMovement.qty_delta, StockMovement.damaged_delta)
+            .where(StockMovement.id > last.last_movement_id, StockMovement.id <= top),
+        )
+    db.execute(_rollup(snap.id, source))
+    _prune(db, keep_after=datetime.now() - timedelta(hours=settings.STOCK_SNAPSHOT_KEEP_HOURS))
+    db.commit()
+    return {"snapshot_id": snap.id, "movements": top - (last.last_movement_id if last else 0)}
+
+
+def _prune(db: Session, keep_after: datetime) -> int:
+    """Older than keep_after, keep only the last snapshot of each day (replay stays ≤ 1 day)."""
+    old = db.execute(
+        select(StockSnapshot.id, StockSnapshot.taken_at)
+        .where(StockSnapshot.taken_at < keep_after)
+        .order_by(StockSnapshot.id)
+    ).all()
+    last_of_day = {}
+    for snapshot_id, taken_at in old:
+        last_of_day[str(taken_at)[:10]] = snapshot_id
+    keep = set(last_of_day.values())
+    drop = [snapshot_id for snapshot_id, _ in old if snapshot_id not in keep]
+    for i in range(0, len(drop), _BATCH):
+        batch = drop[i:i + _BATCH]
+        db.execute(delete(StockBalance).where(StockBalance.snapshot_id.in_(batch)))
+        db.execute(delete(StockSnapshot).where(StockSnapshot.id.in_(batch)))
+    return len(drop)
+
+
+def snapshot_task() -> dict | None:
+    """Scheduler entry point (own session)."""
+    db = SessionLocal()
+    try:
+        return take_snapshot(db)
+    finally:
+        db.close()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Point-in-time stock
+# ─────────────────────────────────────────────────────────────────────────────
+
+def cutoff_for(day: date) -> str:
+    """Closing stock of a day = state just before midnight that ends it."""
+    return (day + timedelta(days=1)).strftime("%Y-%m-%d 00:00:00")
+
+
+def stock_at_sql(cutoff: str, where: str = "") -> str:
+    """
+    Balances just before `cutoff` ('YYYY-MM-DD HH:MM:SS'): the last snapshot taken
+    before it plus the movements after that snapshot and before the cutoff.
+    `where` adds conditions on the output aliases i / w / loc / b (b = raw ids).
+    """
+    base = f"(SELECT MAX(ss.id) FROM stock_snapshots ss WHERE ss.taken_at < '{cutoff}')"
+    return (
+        "SELECT i.code AS item, w.code AS warehouse, loc.code AS location,"
+        " SUM(b.qty) AS quantity, SUM(b.damaged) AS damaged_qty FROM ("
+        " SELECT sb.item_id, sb.warehouse_id, sb.location_id, sb.quantity AS qty, sb.damaged_qty AS damaged"
+        f" FROM stock_balances sb WHERE sb.snapshot_id = {base}"
+        " UNION ALL"
+        " SELECT sm.item_id, sm.warehouse_id, sm.location_id, sm.qty_delta, sm.damaged_delta"
+        " FROM stock_movements sm"
+        f" WHERE sm.id > (SELECT ss.last_movement_id FROM stock_snapshots ss WHERE ss.id = {base})"
+        f" AND sm.moved_at < '{cutoff}'"
+        ") b"
+        " JOIN items i ON b.item_id = i.id"
+        " JOIN warehouses w ON b.warehouse_id = w.id"
+        " JOIN locations loc ON b.location_id = loc.id"
+        f" WHERE 1=1{where}"
+        " GROUP BY i.code, w.code, loc.code HAVING SUM(b.qty) <> 0"
+        " ORDER BY w.code, i.code, loc.code"
+    )
+
+
+def base_snapshot(db: Session, cutoff: str):
+    """The snapshot stock_at_sql(cutoff) starts from, or None if history starts later."""
+    return db.execute(
+        select(StockSnapshot).where(StockSnapshot.taken_at < cutoff)
+        .order_by(StockSnapshot.id.desc()).limit(1)
+    ).scalar()
+
+
+def history_start(db: Session):
+    return db.execute(select(func.min(StockSnapshot.taken_at))).scalar()
+
+
+def replay_count(db: Session, snapshot: StockSnapshot, cutoff: str) -> int:
+    return db.execute(
+        select(func.count(StockMovement.id))
+        .where(StockMovement.id > snapshot.last_movement_id, StockMovement.moved_at < cutoff)
+    ).scalar() or 0
+
@@ -1,31 +1,146 @@
+"""
+whisper_ai.py — speech-to-text with an optional fast tier
+==========================================================
+WHISPER_MODEL is the accurate tier. With WHISPER_FAST_MODEL set (e.g. "tiny"
+next to "base"), both are preloaded and each clip picks one:
+
+  • short  — clip ≤ WHISPER_FAST_MAX_SECONDS ("check inventory") → fast tier
+  • busy   — WHISPER_BUSY_QUEUE or more clips already being transcribed in
+             this worker → fast tier, whatever the length
+  • long   — otherwise (dictated GRNs) → accurate tier
+  • retry  — a fast-tier result whose mean log-prob is below
+             WHISPER_RETRY_LOGPROB is transcribed again on the accurate tier,
+             except under "busy": that would add the slow pass the fast tier
+             was chosen to avoid (counted as busy_retry_skipped)
+
+Every choice is counted in whisper_transcriptions_total{model, reason}.
+"""
+
 import os
 import tempfile
-from faster_whisper import WhisperModel
+import threading
+from faster_whisper import WhisperModel, decode_audio
+
+from app.core.config import settings
+from app.core.metrics import Counter, Gauge, stage
+
+MODEL_NAME = settings.WHISPER_MODEL
+FAST_MODEL_NAME = settings.WHISPER_FAST_MODEL or None
+
+TRANSCRIPTIONS = Counter(
+    "whisper_transcriptions_total", "Clips transcribed, by model tier and why it was chosen.", ("model", "reason"),
+)
+QUEUE_DEPTH = Gauge("whisper_queue_depth", "Transcriptions in progress in this worker.")
+
+_models: dict[str, WhisperModel] = {}
+_model_lock = threading.Lock()
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+def get_model(name: str = MODEL_NAME) -> WhisperModel:
+    model = _models.get(name)
+    if model is None:
+        with _model_lock:
+            model = _models.get(name)
+            if model is None:
+                # CPU config; thread counts from settings so workers don't oversubscribe cores
+                model = _models[name] = WhisperModel(
+                    name, device="cpu", compute_type=settings.WHISPER_COMPUTE_TYPE,
+                    cpu_threads=settings.WHISPER_CPU_THREADS, num_workers=settings.WHISPER_NUM_WORKERS,
+                )
+    return model
+
 
-MODEL_NAME = os.getenv("WHISPER_MODEL", "tiny")
+def load_models() -> None:
+    """Preload every configured tier."""
+    get_model(MODEL_NAME)
+    if FAST_MODEL_NAME:
+        get_model(FAST_MODEL_NAME)
+
+
+def _transcriber(model: WhisperModel):
+    """The model itself, or a batched pipeline over its VAD chunks when WHISPER_BATCH_SIZE > 0."""
+    if settings.WHISPER_BATCH_SIZE > 0:
+        from faster_whisper import BatchedInferencePipeline
+        return BatchedInferencePipeline(model=model), {"batch_size": settings.WHISPER_BATCH_SIZE}
+    return model, {}
+
+
+# CTranslate2 starts its worker threads on load, and a fork would orphan them:
+# under PREFORK each worker loads the models after the fork (gunicorn.conf.py)
+if not settings.PREFORK:
+    load_models()
+
+
+def choose_tier(duration: float, queue_depth: int) -> tuple[str, str]:
+    """→ (model name, reason) for a clip of `duration` seconds."""
+    if FAST_MODEL_NAME is None:
+        return MODEL_NAME, "only"
+    if duration <= settings.WHISPER_FAST_MAX_SECONDS:
+        return FAST_MODEL_NAME, "short"
+    if queue_depth >= settings.WHISPER_BUSY_QUEUE:
+        return FAST_MODEL_NAME, "busy"
+    return MODEL_NAME, "long"
+
+
+def _run(name: str, audio) -> tuple[str, float | None]:
+    """→ (text, duration-weighted mean segment log-prob; None without speech)."""
+    transcriber, options = _transcriber(get_model(name))
+    segments, _ = transcriber.transcribe(
+        audio,
+        language="en",
+        task="transcribe",
+        vad_filter=True,
+        **options,
+    )
+    # segments is lazy — inference happens while iterating
+    texts, weighted, seconds = [], 0.0, 0.0
+    for seg in segments:
+        texts.append(seg.text.strip())
+        length = max(seg.end - seg.start, 0.01)
+        weighted += seg.avg_logprob * length
+        seconds += length
+    return " ".join(texts).strip(), (weighted / seconds if seconds else None)
 
-# Faster CPU config
-_model = WhisperModel(MODEL_NAME, device="cpu", compute_type="int8")
 
 def transcribe_audio_bytes(audio_bytes: bytes) -> str:
+    global _in_flight
     temp_path = None
+    with _in_flight_lock:
+        queue_depth = _in_flight
+        _in_flight += 1
+    QUEUE_DEPTH.inc()
     try:
         with tempfile.NamedTemporaryFile(suffix=".webm", delete=False) as tmp:
             tmp.write(audio_bytes)
             temp_path = tmp.name
 
-        segments, _ = _model.transcribe(
-            temp_path,
-            language="en",
-            task="transcribe",
-            vad_filter=True
-        )
+        # Decode up front so decode and inference are timed separately
+        with stage("whisper_decode"):
+            sampling_rate = get_model().feature_extractor.sampling_rate
+            audio = decode_audio(temp_path, sampling_rate=sampling_rate)
+
+        name, reason = choose_tier(len(audio) / sampling_rate, queue_depth)
+        with stage("whisper_transcribe"):
+            text, logprob = _run(name, audio)
 
-        text = " ".join(seg.text.strip() for seg in segments).strip()
+        if name != MODEL_NAME and logprob is not None and logprob < settings.WHISPER_RETRY_LOGPROB:
+            if reason == "busy":
+                TRANSCRIPTIONS.inc(model=name, reason="busy_retry_skipped")
+                return text
+            TRANSCRIPTIONS.inc(model=name, reason=f"{reason}_rejected")
+            name, reason = MODEL_NAME, "retry"
+            with stage("whisper_retry"):
+                text, _ = _run(name, audio)
+        TRANSCRIPTIONS.inc(model=name, reason=reason)
         return text
     finally:
+        with _in_flight_lock:
+            _in_flight -= 1
+        QUEUE_DEPTH.dec()
         if temp_path and os.path.exists(temp_path):
             try:
                 os.remove(temp_path)
             except OSError:
-                pass
\ No newline at end of file
+                pass
@@ -0,0 +1,17 @@
+"""
+Benchmarks for the Warehouse Copilot backend.
+Run from warehouse/backend, e.g.:
+
+    python -m benchmarks.datagen --lines 1000000       # synthetic dataset (SQLite by default)
+    python -m benchmarks.loadtest --concurrency 16     # in-process load test → results/*.json
+    python -m benchmarks.compare before.json after.json
+    python -m benchmarks.bench_serialization
+    python -m benchmarks.bench_intent --real-models
+    python -m benchmarks.bench_intent_ann --exemplars 200000
+    python -m benchmarks.bench_embed_models --real-models   # accuracy gate for EMBED_MODEL
+    python -m benchmarks.bench_normalizer
+    python -m benchmarks.bench_interpret
+    python -m benchmarks.bench_analytics --repeat 5   # needs duckdb
+    python -m benchmarks.bench_profiles --real-models # RSS per SERVICE_PROFILE
+    python -m benchmarks.bench_prefork --workers 4    # per-worker RSS/PSS/USS, preload on vs off
+"""
@@ -0,0 +1,112 @@
+"""
+bench_analytics.py — aggregate questions on the primary vs the DuckDB analytics mirror
+======================================================================================
+Syncs the mirror from the benchmark database (full copy, then one incremental
+pass), then runs every aggregate /chat/query pattern on both engines and
+reports the median time of each and whether the results agree (rows compared
+order-insensitively, numbers rounded to 2 places).
+
+    python -m benchmarks.datagen --lines 1000000
+    python -m benchmarks.bench_analytics --repeat 5
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from decimal import Decimal
+
+from benchmarks.harness import DEFAULT_DB_URL, load_engine
+
+QUESTIONS = (
+    "Total stock in every warehouse",
+    "Total stock globally across all warehouses",
+    "Total damaged per warehouse",
+    "OK vs damaged",
+    "Compare stock between WH1 and WH2",
+    "Rank warehouses by stock",
+    "Who is the top supplier",
+    "Top 10 items",
+    "Bottom 5 items",
+    "Receiving volume by warehouse",
+    "Average quantity",
+    "Monthly receiving trend",
+    "Which warehouse has the most damaged",
+    "ABC analysis",
+    "Total stock in WH2",
+    "Top 5 customers",
+    "Which customer has the most transactions",
+    "Customer wise breakdown",
+    "Warehouse utilization",
+    "Status distribution",
+    "Damaged percentage per warehouse",
+    "Location wise stock",
+)
+
+
+def _normalise(rows) -> list:
+    def cell(v):
+        if isinstance(v, (float, Decimal)):
+            return round(float(v), 2)
+        return str(v) if v is not None and not isinstance(v, int) else v
+    return sorted((tuple(cell(v) for v in r) for r in rows), key=repr)
+
+
+def _median_ms(fn, repeat: int):
+    times, result = [], None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - t0) * 1000)
+    return statistics.median(times), result
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--db-url", default=DEFAULT_DB_URL)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--mirror-dir", default=os.path.join(tempfile.gettempdir(), "bench_analytics_mirror"))
+    args = ap.parse_args()
+
+    os.environ["ANALYTICS_MIRROR"] = "true"
+    os.environ["ANALYTICS_MIRROR_DIR"] = args.mirror_dir
+    os.environ["ANALYTICS_MIRROR_OVERLAP"] = "0"  # datagen writes every row within a minute or two
+    engine = load_engine(args.db_url)
+    from sqlalchemy import text
+    from app.services import analytics_mirror
+    from app.services.query_engine import generate_sql_from_question, sanitize_sql
+
+    t0 = time.perf_counter()
+    first = analytics_mirror.sync_task()
+    t1 = time.perf_counter()
+    again = analytics_mirror.sync_task()
+    t2 = time.perf_counter()
+    print(f"sync: first {t1 - t0:.2f}s {first}, incremental {t2 - t1:.2f}s {again}")
+    reader = analytics_mirror.get_reader()
+    if reader is None:
+        raise SystemExit("mirror not available (is duckdb installed?)")
+
+    print(f"  {'question':<44} {'primary ms':>11} {'mirror ms':>10} {'speed-up':>9}  match")
+    for question in QUESTIONS:
+        try:
+            sql = sanitize_sql(generate_sql_from_question(question)[0])
+        except ValueError:
+            print(f"  {question:<44} {'(no pattern)':>33}")
+            continue
+        if not analytics_mirror.routable(sql):
+            print(f"  {question:<44} {'(not an aggregate: primary only)':>33}")
+            continue
+        with engine.connect() as conn:
+            try:
+                primary_ms, primary = _median_ms(lambda: conn.execute(text(sql)).fetchall(), args.repeat)
+            except Exception as exc:  # MySQL-only syntax on the SQLite stand-in
+                print(f"  {question:<44} {'primary error':>11} {type(exc).__name__}")
+                continue
+        mirror_ms, mirrored = _median_ms(lambda: reader.execute(sql)[1], args.repeat)
+        match = _normalise(primary) == _normalise(mirrored)
+        print(f"  {question:<44} {primary_ms:11.1f} {mirror_ms:10.1f} {primary_ms / mirror_ms:8.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    main()
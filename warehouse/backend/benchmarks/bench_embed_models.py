@@ -0,0 +1,127 @@
+"""
+bench_embed_models.py — intent accuracy and speed of candidate embedding models
+===============================================================================
+Before switching EMBED_MODEL to a smaller or quantized model, check what it
+does to intent detection. For each model: load it with the given thread
+count, embed the intent definitions, score a labelled set and report
+
+  • accuracy        — top intent == label (embedding stage only, no keyword rules)
+  • agrees          — same top intent as the first (baseline) model
+  • below threshold — share that the confidence gate would turn into "unknown"
+                      (the threshold was tuned on the baseline; cosine scales differ)
+  • ms/message      — one message per call, as /chat/interpret does (median)
+  • msg/s batched   — EMBED_BATCH_SIZE messages per call
+  • load s, +MiB    — model load time and resident memory it added
+
+The labelled set is benchmarks.bench_intent.LABELLED, or a JSONL file of
+{"intent", "text"} lines (e.g. held-out chat logs) with --examples. Exits 1 if
+any model loses more than --max-drop points of accuracy against the baseline.
+
+    python -m benchmarks.bench_embed_models --real-models
+    python -m benchmarks.bench_embed_models --real-models --threads 2 --examples data/labelled.jsonl \\
+        --models sentence-transformers/all-MiniLM-L6-v2 BAAI/bge-small-en-v1.5
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+
+from benchmarks.bench_intent import LABELLED
+from benchmarks.harness import configure_env
+
+DEFAULT_MODELS = (
+    "sentence-transformers/all-MiniLM-L6-v2",   # baseline
+    "BAAI/bge-small-en-v1.5",                   # int8-quantized ONNX in fastembed
+    "snowflake/snowflake-arctic-embed-xs",      # 22M parameters
+)
+
+
+def _rss_mib() -> float:
+    import os
+    return int(open("/proc/self/statm").read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+def _labelled(path: str | None) -> list[tuple[str, str]]:
+    if not path:
+        return list(LABELLED)
+    from app.services.intent_index import load_examples
+    return [(text, intent) for intent, texts in load_examples(path).items() for text in texts]
+
+
+def evaluate(name: str, threads: int | None, batch_size: int, labelled, definitions, pooling: str,
+             threshold: float) -> dict:
+    from fastembed import TextEmbedding
+    from app.services.intent_scorer import IntentScorer
+
+    rss0, t0 = _rss_mib(), time.perf_counter()
+    model = TextEmbedding(name, threads=threads)
+    load_s, added_mib = time.perf_counter() - t0, _rss_mib() - rss0
+
+    def embed(texts):
+        return np.array(list(model.embed(list(texts), batch_size=batch_size)), dtype=np.float32)
+
+    scorer = IntentScorer.from_texts(definitions, embed, pooling)
+    texts = [text for text, _ in labelled]
+
+    singles = []
+    for text in texts:
+        t = time.perf_counter()
+        embed([text])
+        singles.append(time.perf_counter() - t)
+    t = time.perf_counter()
+    vectors = embed(texts)
+    batched = len(texts) / (time.perf_counter() - t)
+
+    best = scorer.best(vectors)
+    return {
+        "predicted": [label for label, _ in best],
+        "below": sum(conf < threshold for _, conf in best) / len(best),
+        "ms": statistics.median(singles) * 1000, "batched": batched,
+        "load_s": load_s, "mib": added_mib,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--models", nargs="+", default=list(DEFAULT_MODELS), help="first one is the baseline")
+    ap.add_argument("--examples", help="labelled JSONL {intent, text}; default: bench_intent.LABELLED")
+    ap.add_argument("--threads", type=int, default=0, help="ONNX intra-op threads (0 → runtime default)")
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--max-drop", type=float, default=3.0, help="allowed accuracy loss, percentage points")
+    ap.add_argument("--real-models", action="store_true", help="use fastembed instead of stub embeddings")
+    args = ap.parse_args()
+
+    configure_env(stub_models=not args.real_models)
+    from app.core.config import settings
+    from app.services import gemini
+
+    labelled = _labelled(args.examples)
+    expected = [label for _, label in labelled]
+    definitions = gemini.intent_exemplars(gemini.INTENT_DEFINITIONS)
+    print(f"{len(labelled)} labelled messages, threads={args.threads or 'default'}, batch={args.batch_size}"
+          f" — embeddings: {'fastembed' if args.real_models else 'stub'}")
+    print(f"  {'model':<42} {'accuracy':>8} {'agrees':>7} {'<thresh':>7} {'ms/msg':>7} {'msg/s':>7}"
+          f" {'load s':>7} {'+MiB':>6}")
+
+    baseline_predicted = baseline_accuracy = None
+    failed = []
+    for name in args.models:
+        r = evaluate(name, args.threads or None, args.batch_size, labelled, definitions,
+                     settings.INTENT_POOLING, gemini._CONFIDENCE_THRESHOLD)
+        accuracy = 100 * sum(p == e for p, e in zip(r["predicted"], expected)) / len(expected)
+        if baseline_predicted is None:
+            baseline_predicted, baseline_accuracy = r["predicted"], accuracy
+        agrees = 100 * sum(p == b for p, b in zip(r["predicted"], baseline_predicted)) / len(expected)
+        if baseline_accuracy - accuracy > args.max_drop:
+            failed.append(name)
+        print(f"  {name:<42} {accuracy:7.1f}% {agrees:6.1f}% {100 * r['below']:6.1f}% {r['ms']:7.2f}"
+              f" {r['batched']:7.0f} {r['load_s']:7.2f} {r['mib']:6.0f}")
+
+    if failed:
+        raise SystemExit(f"accuracy dropped more than {args.max_drop} points: {', '.join(failed)}")
+
+
+if __name__ == "__main__":
+    main()
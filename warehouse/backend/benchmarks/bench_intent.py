@@ -0,0 +1,142 @@
+"""
+bench_intent.py — sklearn cosine_similarity vs the NumPy IntentScorer
+======================================================================
+Scores a labelled set of chat messages with the embedding stage only
+(keyword rules bypassed) and reports accuracy, agreement with the legacy
+scorer and per-message latency for:
+
+  • legacy        — sklearn cosine_similarity, one message at a time
+  • numpy         — IntentScorer, one message at a time
+  • numpy-batch   — IntentScorer, whole set in one matmul
+  • exemplars/max, exemplars/mean — description + quoted examples per intent
+
+Embedding time is excluded (vectors are computed once up front), so the
+numbers isolate the scorer. Also reports the import cost of sklearn.
+
+    python -m benchmarks.bench_intent                  # stubbed embeddings
+    python -m benchmarks.bench_intent --real-models    # all-MiniLM-L6-v2
+"""
+
+import argparse
+import re
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.harness import configure_env
+
+LABELLED = (
+    ("receive 50 wrench in WH1 customer Ali ref PO-151", "smart_receive"),
+    ("got 30 hammers for WH2 shelf A2 from Usman", "smart_receive"),
+    ("put 100 screws into warehouse one bin A1", "smart_receive"),
+    ("open the goods receiving form", "receive_stock"),
+    ("new shipment arrived, register it", "receive_stock"),
+    ("record incoming goods", "receive_stock"),
+    ("raise quantity of PO-12 by 5", "adjust_quantity"),
+    ("increase units for batch B-7", "adjust_quantity"),
+    ("modify the number of units on this line", "adjust_quantity"),
+    ("erase line PO-99", "delete_line"),
+    ("get rid of that purchase order", "delete_line"),
+    ("drop the receiving entry for Ali", "delete_line"),
+    ("look at the record for customer Sara", "open_record"),
+    ("view details of batch B-12", "open_record"),
+    ("pull up reference PO-40", "open_record"),
+    ("browse all stored items", "check_inventory"),
+    ("stock status please", "check_inventory"),
+    ("full warehouse inventory table", "check_inventory"),
+    ("monthly overview of operations", "report"),
+    ("daily warehouse activity", "report"),
+    ("overall receiving history", "report"),
+    ("how many units of hammer do we have", "query_data"),
+    ("total quantity received this month", "query_data"),
+    ("which customer sends the most damaged goods", "query_data"),
+    ("items expiring soon", "query_data"),
+    ("stock comparison WH1 vs WH2", "query_data"),
+)
+
+
+def _import_cost(module: str) -> tuple[float, float]:
+    """Seconds and MiB of resident memory to import `module` in a fresh interpreter (Linux)."""
+    code = (
+        "import os, time\n"
+        "rss = lambda: int(open('/proc/self/statm').read().split()[1]) * os.sysconf('SC_PAGE_SIZE')\n"
+        "r0 = rss()\n"
+        "t0 = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(time.perf_counter() - t0, rss() - r0)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True)
+    if out.returncode:
+        return float("nan"), float("nan")
+    seconds, rss_bytes = out.stdout.split()
+    return float(seconds), float(rss_bytes) / 2**20
+
+
+def _time_per_message(fn, vectors: np.ndarray, repeat: int) -> tuple[list[str], float]:
+    best, labels = float("inf"), []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        labels = fn(vectors)
+        best = min(best, time.perf_counter() - t0)
+    return labels, best / len(vectors)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--real-models", action="store_true", help="use fastembed instead of stub embeddings")
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+
+    configure_env(stub_models=not args.real_models)
+    from app.services import gemini
+    from app.services.intent_scorer import IntentScorer
+
+    messages = [m for m, _ in LABELLED]
+    expected = [label for _, label in LABELLED]
+    vectors = gemini._embed(messages)
+    definitions = gemini.intent_exemplars(gemini.INTENT_DEFINITIONS)
+    with_examples = {
+        k: v + re.findall(r"'([^']+)'", " ".join(v)) for k, v in definitions.items()
+    }
+
+    single = IntentScorer.from_texts(definitions, gemini._embed)
+    variants = {
+        "numpy": lambda vs: [single.best(v[None, :])[0][0] for v in vs],
+        "numpy-batch": lambda vs: [label for label, _ in single.best(vs)],
+    }
+    for pooling in ("max", "mean"):
+        scorer = IntentScorer.from_texts(with_examples, gemini._embed, pooling)
+        variants[f"exemplars/{pooling}"] = lambda vs, s=scorer: [label for label, _ in s.best(vs)]
+
+    try:
+        from sklearn.metrics.pairwise import cosine_similarity
+        legacy_matrix = gemini._embed([texts[0] for texts in definitions.values()])
+        labels = gemini._INTENT_LABELS
+        variants = {
+            "legacy": lambda vs: [
+                labels[int(np.argmax(cosine_similarity(v[None, :], legacy_matrix)[0]))] for v in vs
+            ],
+            **variants,
+        }
+    except ImportError:
+        print("scikit-learn not installed — legacy scorer skipped")
+
+    print(f"{len(messages)} labelled messages, best of {args.repeat} — "
+          f"embeddings: {'fastembed' if args.real_models else 'stub'}")
+    reference = None
+    for name, fn in variants.items():
+        predicted, per_msg = _time_per_message(fn, vectors, args.repeat)
+        reference = reference or predicted
+        accuracy = sum(p == e for p, e in zip(predicted, expected)) / len(expected)
+        agree = sum(p == r for p, r in zip(predicted, reference)) / len(reference)
+        print(f"  {name:<15} accuracy {100 * accuracy:5.1f}%  agrees {100 * agree:5.1f}%"
+              f"  {per_msg * 1e6:8.1f} µs/message")
+
+    seconds, mib = _import_cost("sklearn.metrics.pairwise")
+    print(f"  import sklearn.metrics.pairwise: {seconds * 1000:.0f} ms, +{mib:.0f} MiB RSS (no longer paid)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+bench_intent_ann.py — IVF index vs exact scoring over many exemplars
+=====================================================================
+Synthetic labelled exemplars (noisy points around a few sub-topics per
+intent, 384 dims like all-MiniLM-L6-v2) stand in for mined chat utterances;
+queries are fresh samples from the same sub-topics. Reports, per nprobe: recall@k of the IVF neighbours against
+exact brute-force top-k, agreement of the voted intent with the exact vote,
+and latency with one query per call (one chat message per request). Also
+reports index build, save and load times.
+
+    python -m benchmarks.bench_intent_ann --exemplars 200000 --nprobe 4,8,16,32
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from app.services.intent_index import IVFIndex, load_index, save_index
+
+DIM = 384
+
+
+def make_exemplars(n: int, intents: int, topics: int, noise: float, seed: int):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(intents * topics, DIM)).astype(np.float32)
+    topic = rng.integers(0, len(centers), size=n)
+    x = centers[topic] + noise * rng.normal(size=(n, DIM)).astype(np.float32)
+    return x, topic // topics, centers
+
+
+def make_queries(centers: np.ndarray, n: int, noise: float, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed + 1)
+    picks = centers[rng.integers(0, len(centers), size=n)]
+    return picks + noise * rng.normal(size=picks.shape).astype(np.float32)
+
+
+def _run(index: IVFIndex, queries: np.ndarray, k: int) -> tuple[np.ndarray, list[str], float]:
+    """Neighbour ids, voted intents and seconds per query, one query per call."""
+    ids, votes = [], []
+    t0 = time.perf_counter()
+    for q in queries:
+        ids.append(index.search(q, k)[0][0])
+        votes.append(index.vote(q, k)[0][0])
+    return np.array(ids), votes, (time.perf_counter() - t0) / len(queries)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--exemplars", type=int, default=50_000)
+    ap.add_argument("--intents", type=int, default=8)
+    ap.add_argument("--topics", type=int, default=25, help="sub-clusters per intent")
+    ap.add_argument("--noise", type=float, default=3.0, help="per-dimension noise (centres are N(0, 1))")
+    ap.add_argument("--queries", type=int, default=300)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--nlist", type=int, default=0, help="0 → sqrt(exemplars)")
+    ap.add_argument("--nprobe", default="1,4,8,16,32")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args()
+
+    x, owners, centers = make_exemplars(args.exemplars, args.intents, args.topics, args.noise, args.seed)
+    queries = make_queries(centers, args.queries, args.noise, args.seed)
+    labels = [f"intent_{i}" for i in range(args.intents)]
+
+    t0 = time.perf_counter()
+    index = IVFIndex.build(labels, x, owners, nlist=args.nlist or None)
+    build_s = time.perf_counter() - t0
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        save_index(index, tmp, "bench")
+        save_s = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        load_index(tmp, "bench")
+        load_s = time.perf_counter() - t0
+
+    print(f"{args.exemplars} exemplars × {DIM} dims, {len(index.centroids)} cells, k={args.k}, "
+          f"{args.queries} queries")
+    print(f"  build {build_s * 1000:.0f} ms   save {save_s * 1000:.1f} ms   load (mmap) {load_s * 1000:.1f} ms")
+
+    # exact baseline: every exemplar scored (nprobe = all cells → one matmul)
+    index.nprobe = len(index.centroids)
+    exact_ids, exact_votes, exact_s = _run(index, queries, args.k)
+    print(f"  {'exact':<10} recall 100.0%  vote agrees 100.0%  {exact_s * 1e3:7.3f} ms/query")
+
+    exact_sets = [set(row) for row in exact_ids.tolist()]
+    for nprobe in (int(p) for p in args.nprobe.split(",")):
+        index.nprobe = max(1, min(nprobe, len(index.centroids)))
+        ids, votes, per_q = _run(index, queries, args.k)
+        recall = np.mean([len(exact & set(row)) / args.k for exact, row in zip(exact_sets, ids.tolist())])
+        agree = np.mean([a == b for a, b in zip(votes, exact_votes)])
+        print(f"  nprobe={index.nprobe:<4} recall {100 * recall:5.1f}%  vote agrees {100 * agree:5.1f}%"
+              f"  {per_q * 1e3:7.3f} ms/query  x{exact_s / per_q:5.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+bench_interpret.py — end-to-end /chat/interpret NLP latency with a per-stage breakdown
+======================================================================================
+Runs gemini.interpret() over a mix of realistic commands (English, Roman
+Urdu, misspelt, slot-heavy and slot-free) and reports, per pipeline stage
+(nlp_prepare → intent → extract_slots → check_missing, plus the lazy spaCy
+parse), mean / p50 / p95 milliseconds — the same numbers the endpoint sends
+back in its Server-Timing header.
+
+    python -m benchmarks.bench_interpret --rounds 200
+    python -m benchmarks.bench_interpret --real-models     # spaCy + fastembed
+"""
+
+import argparse
+import statistics
+
+from benchmarks.harness import configure_env
+
+MESSAGES = (
+    "receive 50 wrench WH1 A1 customer Ali ref PO-151 batch BATCH-01 status ok",
+    "receive 20 hammer customer Usman ref PO-152 warehouse WH2 location B4 expiry 2026-01-31",
+    "maal kitna hai WH2 mein",
+    "naya maal aaya customer Usman",
+    "recieve karo 20 hammer",
+    "PO-77 hata do please",
+    "Total stok in every warehose?",
+    "report dikhao aaj ki",
+    "search customer Ali Hassan and show all records for last month",
+    "which items expire in the next 30 days",
+    "hello",
+)
+
+
+def _pct(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rounds", type=int, default=200, help="passes over the message mix")
+    ap.add_argument("--real-models", action="store_true", help="use spaCy/fastembed instead of stubs")
+    args = ap.parse_args()
+
+    configure_env(stub_models=not args.real_models)
+    from app.services.gemini import interpret
+
+    for message in MESSAGES:  # warm caches (compiled patterns, lazy models)
+        interpret(message)
+
+    stages: dict[str, list[float]] = {}
+    for _ in range(args.rounds):
+        for message in MESSAGES:
+            _, timings = interpret(message)
+            for name, ms in timings.items():
+                stages.setdefault(name, []).append(ms)
+
+    calls = args.rounds * len(MESSAGES)
+    print(f"{calls} interpret() calls ({len(MESSAGES)} messages × {args.rounds}), "
+          f"models: {'real' if args.real_models else 'stub'}")
+    print(f"  {'stage':<14} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, values in stages.items():
+        print(f"  {name:<14} {statistics.fmean(values):9.3f} {_pct(values, 0.50):9.3f} {_pct(values, 0.95):9.3f}")
+
+
+if __name__ == "__main__":
+    main()
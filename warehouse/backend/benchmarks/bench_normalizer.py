@@ -0,0 +1,160 @@
+"""
+bench_normalizer.py — per-message normalisation cost vs dictionary size
+========================================================================
+Pads the real spell-correction and Roman-Urdu tables with synthetic entries
+and times, per message:
+
+  • legacy  — token loop + dict lookup, then one re.sub per phrase pattern
+  • scanner — TextScanner: one trie-compiled pass for both tables
+
+The legacy cost grows with the number of phrase patterns; the scanner's
+should stay flat.
+
+Then the keyword intent rules, padded to --rules in total with synthetic
+keyword rules placed ahead of the real ones (every message is checked
+against all of them — an ordered loop's worst case):
+
+  • loop     — each rule's search() in priority order
+  • keywords — KeywordRules: one trie pass over the required keywords, then
+               only the candidate rules
+
+    python -m benchmarks.bench_normalizer --sizes 0,100,1000,5000 --rules 8,80,800
+"""
+
+import argparse
+import random
+import re
+import string
+import time
+
+from benchmarks.harness import configure_env
+
+MESSAGES = (
+    "receive 50 wrench WH1 A1 customer Ali ref PO-151 batch BATCH-01 status ok",
+    "maal kitna hai WH2 mein",
+    "naya maal aaya customer Usman",
+    "recieve karo 20 hammer",
+    "PO-77 hata do please",
+    "Total stok in every warehose?",
+    "report dikhao aaj ki",
+    "search customer Ali Hassan and show all records for last month",
+)
+
+
+def _fake_word(rnd: random.Random) -> str:
+    return "".join(rnd.choice(string.ascii_lowercase) for _ in range(rnd.randint(4, 9)))
+
+
+def padded_tables(corrections: dict, phrases: list, extra: int, seed: int = 3):
+    rnd = random.Random(seed)
+    corrections = dict(corrections)
+    phrases = list(phrases)
+    for _ in range(extra):
+        corrections[_fake_word(rnd)] = _fake_word(rnd)
+        phrases.append(((f"{_fake_word(rnd)}|{_fake_word(rnd)}", _fake_word(rnd)), _fake_word(rnd)))
+    return corrections, phrases
+
+
+def padded_rules(rules: list, total: int, seed: int = 5) -> list:
+    """rules preceded by synthetic r"\\b(w1|w2|w3\\s*w4)\\b" rules, `total` rules in all."""
+    rnd = random.Random(seed)
+    extra = [
+        (re.compile(rf"\b({_fake_word(rnd)}|{_fake_word(rnd)}|{_fake_word(rnd)}\s*{_fake_word(rnd)})\b", re.I), f"fake_{n}")
+        for n in range(max(0, total - len(rules)))
+    ]
+    return extra + list(rules)
+
+
+def ordered_loop(rules: list):
+    """The per-rule baseline: search each rule in priority order."""
+    searches = [(pattern.search, intent) for pattern, intent in rules]
+
+    def first(text: str) -> str | None:
+        for search, intent in searches:
+            if search(text):
+                return intent
+        return None
+
+    return first
+
+
+def legacy_normalizer(corrections: dict, phrases: list):
+    """The pre-scanner implementation: per-token lookup, then one regex per phrase row."""
+    patterns = [
+        (re.compile(r"\b" + r"\s*".join(f"({slot})" if "|" in slot else slot for slot in slots) + r"\b", re.I), repl)
+        for slots, repl in phrases
+    ]
+
+    def run(message: str) -> tuple[str, str]:
+        out = []
+        for word in message.split():
+            clean = word.lower().strip(".,!?;:")
+            if clean in corrections:
+                corrected = corrections[clean]
+                if len(word) > 1 and word[0].isupper():
+                    corrected = corrected.capitalize()
+                for ch in ".,!?;:":
+                    if word.endswith(ch):
+                        corrected += ch
+                        break
+                out.append(corrected)
+            else:
+                out.append(word)
+        normalized = " ".join(out)
+        translated = normalized
+        for pattern, repl in patterns:
+            translated = pattern.sub(repl, translated)
+        return normalized, translated
+
+    return run
+
+
+def _time(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for m in MESSAGES:
+            fn(m)
+        best = min(best, time.perf_counter() - t0)
+    return best / len(MESSAGES)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--sizes", default="0,100,1000,5000", help="synthetic entries added to each table")
+    ap.add_argument("--rules", default="8,80,800", help="keyword rules in total (synthetic ones ahead of the 8 real ones)")
+    ap.add_argument("--repeat", type=int, default=50)
+    args = ap.parse_args()
+
+    configure_env()
+    from app.services.gemini import _KEYWORD_INTENTS, _SPELL_CORRECTIONS, _URDU_PHRASES
+    from app.services.normalizer import KeywordRules, TextScanner
+
+    print(f"{len(MESSAGES)} messages, best of {args.repeat}")
+    for extra in (int(s) for s in args.sizes.split(",")):
+        corrections, phrases = padded_tables(_SPELL_CORRECTIONS, _URDU_PHRASES, extra)
+        legacy = legacy_normalizer(corrections, phrases)
+        t0 = time.perf_counter()
+        scanner = TextScanner(corrections, phrases)
+        build = time.perf_counter() - t0
+        repeat = max(3, args.repeat // (1 + extra // 500))
+        old, new = _time(legacy, repeat), _time(scanner.scan, repeat)
+        print(f"  {len(corrections):>6} words / {len(phrases):>6} phrases   legacy {old * 1e6:9.1f} µs/msg"
+              f"   scanner {new * 1e6:7.1f} µs/msg   x{old / new:7.1f}   (compile {build * 1000:.0f} ms)")
+
+    print("keyword rules")
+    for total in (int(s) for s in args.rules.split(",")):
+        rules = padded_rules(_KEYWORD_INTENTS, total)
+        loop = ordered_loop(rules)
+        t0 = time.perf_counter()
+        keywords = KeywordRules(rules)
+        build = time.perf_counter() - t0
+        assert all(keywords.first(m) == loop(m) for m in MESSAGES)
+        repeat = max(3, args.repeat // (1 + total // 100))
+        old, new = _time(loop, repeat), _time(keywords.first, repeat)
+        print(f"  {len(rules):>6} rules   loop {old * 1e6:9.1f} µs/msg   keywords {new * 1e6:7.1f} µs/msg"
+              f"   x{old / new:7.1f}   (compile {build * 1000:.0f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+bench_prefork.py — per-worker memory with and without gunicorn preload_app
+==========================================================================
+Starts gunicorn (gunicorn.conf.py) twice — preload on, then off — with the
+same number of workers, warms every worker with a few /chat requests and
+reads each worker's /proc/<pid>/smaps_rollup:
+
+  RSS  — resident pages, shared ones counted in full (what `top` shows)
+  PSS  — shared pages split between the processes sharing them
+  USS  — pages private to the worker (what one more worker really costs)
+
+With preload the models live in pages shared with the master, so RSS barely
+moves but PSS / USS per worker drop. Use --real-models on a host with the
+models installed; with the stubs only framework and route modules are shared.
+
+    python -m benchmarks.bench_prefork --workers 4
+    python -m benchmarks.bench_prefork --workers 4 --real-models
+"""
+
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+
+from benchmarks.harness import DEFAULT_DB_URL
+
+WARMUP = (
+    ("/chat/interpret", b'{"message": "receive 50 wrench WH1 customer Ali ref PO-151"}'),
+    ("/chat/query", b'{"question": "Total stock in every warehouse"}'),
+)
+
+
+def __getattr__(name):
+    # gunicorn benchmarks.bench_prefork:app — the app via the harness (stubs, SQLite functions)
+    if name == "app":
+        from benchmarks.harness import load_app
+        app, _ = load_app(os.environ["BENCH_DB_URL"], stub_models=os.environ.get("BENCH_REAL_MODELS") != "1")
+        return app
+    raise AttributeError(name)
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _rollup(pid: int) -> dict[str, float]:
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1]) / 1024
+    return {
+        "rss": fields["Rss"], "pss": fields["Pss"],
+        "uss": fields["Private_Clean"] + fields["Private_Dirty"],
+    }
+
+
+def _children(pid: int) -> list[int]:
+    with open(f"/proc/{pid}/task/{pid}/children") as f:
+        return [int(p) for p in f.read().split()]
+
+
+def _post(url: str, body: bytes) -> None:
+    req = urllib.request.Request(url, data=body, headers={"Content-Type": "application/json"})
+    urllib.request.urlopen(req, timeout=30).read()
+
+
+def run(preload: bool, workers: int, db_url: str, real_models: bool) -> tuple[dict, list[dict]]:
+    port = _free_port()
+    env = dict(
+        os.environ, BENCH_DB_URL=db_url, BENCH_REAL_MODELS="1" if real_models else "0",
+        GUNICORN_PRELOAD="true" if preload else "false", WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}", JOBS_WORKERS="0",
+    )
+    master = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "benchmarks.bench_prefork:app"],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 120
+        while True:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=2).read()
+                if len(_children(master.pid)) == workers:
+                    break
+            except OSError:
+                pass
+            if time.monotonic() > deadline or master.poll() is not None:
+                raise SystemExit("gunicorn did not come up (is gunicorn installed?)")
+            time.sleep(0.5)
+        # enough requests that every worker has served some (the kernel spreads accepts)
+        for _ in range(10 * workers):
+            for path, body in WARMUP:
+                _post(f"http://127.0.0.1:{port}{path}", body)
+        time.sleep(1)
+        return _rollup(master.pid), [_rollup(pid) for pid in _children(master.pid)]
+    finally:
+        master.terminate()
+        master.wait(30)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--db-url", default=DEFAULT_DB_URL)
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--real-models", action="store_true", help="load fastembed / spaCy / faster-whisper for real")
+    args = ap.parse_args()
+
+    print(f"  {'mode':<10} {'RSS/worker':>11} {'PSS/worker':>11} {'USS/worker':>11} {'master RSS':>11} {'total PSS':>10}  (MB)")
+    for preload in (False, True):
+        master, workers = run(preload, args.workers, args.db_url, args.real_models)
+        avg = {k: sum(w[k] for w in workers) / len(workers) for k in ("rss", "pss", "uss")}
+        total_pss = master["pss"] + sum(w["pss"] for w in workers)
+        label = "preload" if preload else "no preload"
+        print(f"  {label:<10} {avg['rss']:11.1f} {avg['pss']:11.1f} {avg['uss']:11.1f} {master['rss']:11.1f} {total_pss:10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+bench_profiles.py — resident memory of one worker per SERVICE_PROFILE
+=====================================================================
+Starts a fresh interpreter per profile, imports app.main with that profile
+and runs its startup hooks, then reports the process RSS (VmRSS), the time to
+import, the number of routes mounted and which model libraries got loaded.
+Run with --real-models for meaningful nlp / voice numbers; with the stubs
+only the framework, SQLAlchemy and route modules are measured.
+
+    python -m benchmarks.bench_profiles
+    python -m benchmarks.bench_profiles --real-models --profiles api nlp voice all
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks.harness import DEFAULT_DB_URL
+
+MODEL_MODULES = ("fastembed", "onnxruntime", "spacy", "sklearn", "faster_whisper", "ctranslate2", "duckdb")
+
+_CHILD = """
+import json, sys, time
+t0 = time.perf_counter()
+from benchmarks.harness import load_app
+app, _ = load_app({db_url!r}, stub_models={stub!r})
+from fastapi.testclient import TestClient
+with TestClient(app):
+    elapsed = time.perf_counter() - t0
+    rss_kb = next(int(l.split()[1]) for l in open("/proc/self/status") if l.startswith("VmRSS:"))
+    stubbed = {{m for m in sys.modules if getattr(sys.modules[m], "__file__", None) is None}}
+    print(json.dumps({{
+        "rss_mb": rss_kb / 1024, "startup_s": elapsed,
+        "routes": sum(1 for p in app.openapi()["paths"] if p.startswith(("/chat", "/api", "/receiving", "/jobs"))),
+        "models": [m for m in {models!r} if m in sys.modules and m not in stubbed],
+    }}))
+"""
+
+
+def measure(profile: str, db_url: str, real_models: bool) -> dict:
+    env = dict(os.environ, SERVICE_PROFILE=profile, JOBS_WORKERS="0")
+    code = _CHILD.format(db_url=db_url, stub=not real_models, models=MODEL_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], env=env, capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--db-url", default=DEFAULT_DB_URL)
+    ap.add_argument("--profiles", nargs="+", default=["api", "nlp", "voice", "api,nlp", "all"])
+    ap.add_argument("--real-models", action="store_true", help="load fastembed / spaCy / faster-whisper for real")
+    args = ap.parse_args()
+
+    print(f"  {'profile':<12} {'RSS MB':>8} {'startup s':>10} {'routes':>7}  models loaded")
+    for profile in args.profiles:
+        r = measure(profile, args.db_url, args.real_models)
+        print(f"  {profile:<12} {r['rss_mb']:8.1f} {r['startup_s']:10.2f} {r['routes']:7d}  {', '.join(r['models']) or '-'}")
+
+
+if __name__ == "__main__":
+    main()
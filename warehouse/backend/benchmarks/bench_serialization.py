@@ -0,0 +1,90 @@
+"""
+bench_serialization.py — row-dict + jsonable_encoder vs columnar + FastJSONResponse
+====================================================================================
+Compares the legacy /api/inventory response path (dict per row, dates
+stringified in Python, FastAPI's default encoder) with the row and columnar
+formats rendered by FastJSONResponse.
+
+    python -m benchmarks.bench_serialization --rows 100000 --repeat 5
+"""
+
+import argparse
+import random
+import time
+from datetime import date, timedelta
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from app.core.responses import FastJSONResponse, encode_rows, orjson
+
+COLUMNS = [
+    "header_id", "line_id", "customer", "receiving_date", "reference_no",
+    "warehouse", "item_code", "location", "batch_no", "manufacturing_date",
+    "expiry_date", "shelf_expiry_date", "quantity", "status",
+]
+
+
+def make_records(n: int, seed: int = 7) -> list[tuple]:
+    rnd = random.Random(seed)
+    base = date(2024, 1, 1)
+    records = []
+    for i in range(n):
+        recv = base + timedelta(days=rnd.randint(0, 700))
+        records.append((
+            i // 3 + 1, i + 1, rnd.choice(("Ali Hassan", "Usman", "Sara Khan", "Bilal")),
+            recv, f"PO-{i // 3 + 1}", f"WH{rnd.randint(1, 4)}",
+            rnd.choice(("WRENCH", "HAMMER", "SCREW", "DRILL")), f"A{rnd.randint(1, 9)}",
+            f"BATCH-{rnd.randint(1, 999)}", recv - timedelta(days=30),
+            recv + timedelta(days=365), recv + timedelta(days=300),
+            rnd.randint(1, 500), rnd.choice(("ok", "ok", "ok", "damaged")),
+        ))
+    return records
+
+
+def legacy(records: list[tuple]) -> bytes:
+    rows = []
+    for r in records:
+        row = dict(zip(COLUMNS, r))
+        for k in ("receiving_date", "manufacturing_date", "expiry_date", "shelf_expiry_date"):
+            row[k] = str(row[k]) if row[k] else None
+        row["quantity"] = int(row["quantity"] or 0)
+        rows.append(row)
+    return JSONResponse(jsonable_encoder({"rows": rows})).body
+
+
+def fast_rows(records: list[tuple]) -> bytes:
+    return FastJSONResponse(encode_rows(COLUMNS, records, "rows")).body
+
+
+def fast_columnar(records: list[tuple]) -> bytes:
+    return FastJSONResponse(encode_rows(COLUMNS, records, "columnar")).body
+
+
+def bench(fn, records, repeat: int) -> tuple[float, int]:
+    best = float("inf")
+    size = 0
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        size = len(fn(records))
+        best = min(best, time.perf_counter() - t0)
+    return best, size
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--rows", type=int, default=50_000)
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args()
+
+    records = make_records(args.rows)
+    print(f"{args.rows} rows, best of {args.repeat} — encoder: {'orjson' if orjson else 'stdlib json'}")
+    base_t, base_b = bench(legacy, records, args.repeat)
+    for name, fn in (("legacy", legacy), ("rows+fast", fast_rows), ("columnar+fast", fast_columnar)):
+        t, b = bench(fn, records, args.repeat)
+        print(f"  {name:<14} {t * 1000:9.1f} ms  {b / 1024:9.0f} KiB"
+              f"   x{base_t / t:5.1f} faster  {100 * b / base_b:5.1f}% size")
+
+
+if __name__ == "__main__":
+    main()
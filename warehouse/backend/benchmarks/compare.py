@@ -0,0 +1,42 @@
+"""
+compare.py — diff two loadtest JSON reports
+
+    python -m benchmarks.compare results/before.json results/after.json
+"""
+
+import argparse
+import json
+
+METRICS = ("rps", "p50_ms", "p95_ms", "p99_ms", "errors")
+
+
+def _load(path: str) -> dict:
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Compare two benchmark reports.")
+    ap.add_argument("before")
+    ap.add_argument("after")
+    args = ap.parse_args()
+
+    a, b = _load(args.before), _load(args.after)
+    print(f"before: {a['meta'].get('commit')}  ({a['meta'].get('timestamp')})")
+    print(f"after:  {b['meta'].get('commit')}  ({b['meta'].get('timestamp')})\n")
+
+    for name in sorted(set(a["results"]) | set(b["results"])):
+        ra, rb = a["results"].get(name), b["results"].get(name)
+        if not ra or not rb:
+            print(f"{name}: only in {'before' if ra else 'after'}")
+            continue
+        cells = []
+        for m in METRICS:
+            old, new = ra.get(m, 0), rb.get(m, 0)
+            delta = f"{100 * (new - old) / old:+.1f}%" if old else "n/a"
+            cells.append(f"{m} {old} → {new} ({delta})")
+        print(f"{name}:\n    " + "\n    ".join(cells))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+"""
+datagen.py — synthetic warehouses, locations, items and receiving lines
+========================================================================
+Deterministic (seeded) and bulk-inserted through SQLAlchemy Core
+executemany, so millions of lines load in minutes on SQLite or MySQL.
+
+    python -m benchmarks.datagen --lines 1000000
+    python -m benchmarks.datagen --db-url mysql+pymysql://root:pw@127.0.0.1/warehouse --lines 2000000
+
+The app's tables are dropped and recreated from the models first, so the
+schema always matches the current tree. Point it at a scratch database.
+"""
+
+import argparse
+import itertools
+import random
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.harness import DEFAULT_DB_URL, load_engine
+
+ITEM_WORDS = (
+    "wrench", "hammer", "screw", "drill", "bolt", "nut", "washer", "pliers", "saw", "chisel",
+    "tape", "glue", "nail", "rivet", "clamp", "file", "level", "ladder", "paint", "brush",
+)
+CUSTOMERS = (
+    "Ali Hassan", "Usman", "Sara Khan", "Bilal Ahmed", "Ayesha", "Hamza Traders",
+    "Zain Logistics", "Fatima", "Omar Imports", "Hina", "Kashif", "Noor Supplies",
+)
+
+
+def generate(
+    engine,
+    lines: int = 100_000,
+    warehouses: int = 4,
+    locations: int = 25,
+    items: int = 400,
+    max_lines_per_header: int = 5,
+    days: int = 730,
+    seed: int = 42,
+    batch: int = 10_000,
+    log=print,
+) -> dict:
+    from sqlalchemy import insert
+    from app.core.database import Base
+    from app.models.item import Item
+    from app.models.location import Location
+    from app.models.warehouse import Warehouse
+    from app.models.receiving import ReceivingHeader, ReceivingLine
+    import app.models.report_snapshot  # noqa: F401 — summary tables are created alongside
+    import app.models.stock_ledger  # noqa: F401
+
+    rnd = random.Random(seed)
+    Base.metadata.drop_all(engine)
+    Base.metadata.create_all(engine)
+    t0 = time.perf_counter()
+
+    with engine.begin() as conn:
+        conn.execute(insert(Warehouse.__table__), [
+            {"id": w, "code": f"WH{w}", "name": f"Warehouse {w}"} for w in range(1, warehouses + 1)
+        ])
+
+        loc_rows, locs_by_wh = [], {}
+        for w in range(1, warehouses + 1):
+            for n in range(1, locations + 1):
+                loc_id = len(loc_rows) + 1
+                code = f"{chr(ord('A') + (n - 1) // 9)}{(n - 1) % 9 + 1}"
+                loc_rows.append({"id": loc_id, "code": code, "warehouse_id": w})
+                locs_by_wh.setdefault(w, []).append(loc_id)
+        conn.execute(insert(Location.__table__), loc_rows)
+
+        item_rows = []
+        for n in range(items):
+            word = ITEM_WORDS[n % len(ITEM_WORDS)]
+            code = word.upper() if n < len(ITEM_WORDS) else f"{word.upper()}-{n // len(ITEM_WORDS)}"
+            item_rows.append({"id": n + 1, "code": code, "name": code.title()})
+        conn.execute(insert(Item.__table__), item_rows)
+
+    # Popular items get most of the volume (roughly Pareto, useful for ABC queries)
+    item_ids = range(1, items + 1)
+    item_cum_weights = list(itertools.accumulate(1.0 / (i + 1) ** 0.8 for i in range(items)))
+    today = date.today()
+
+    headers, line_rows, header_rows = 0, [], []
+    line_id = 0
+
+    def flush():
+        with engine.begin() as conn:
+            if header_rows:
+                conn.execute(insert(ReceivingHeader.__table__), header_rows)
+            if line_rows:
+                conn.execute(insert(ReceivingLine.__table__), line_rows)
+        header_rows.clear()
+        line_rows.clear()
+
+    while line_id < lines:
+        headers += 1
+        wh = rnd.randint(1, warehouses)
+        recv = today - timedelta(days=rnd.randint(0, days))
+        header_rows.append({
+            "id": headers,
+            "customer": rnd.choice(CUSTOMERS),
+            "receiving_date": recv,
+            "warehouse_id": wh,
+            "reference_no": f"PO-{headers}",
+            "created_at": datetime.combine(recv, datetime.min.time()) + timedelta(seconds=rnd.randint(0, 86_399)),
+        })
+        for _ in range(min(rnd.randint(1, max_lines_per_header), lines - line_id)):
+            line_id += 1
+            expiry = recv + timedelta(days=rnd.randint(-30, 720)) if rnd.random() < 0.8 else None
+            line_rows.append({
+                "id": line_id,
+                "receiving_id": headers,
+                "item_id": rnd.choices(item_ids, cum_weights=item_cum_weights)[0],
+                "location_id": rnd.choice(locs_by_wh[wh]),
+                "quantity": rnd.randint(1, 500),
+                "batch_no": f"BATCH-{rnd.randint(1, 5000)}" if rnd.random() < 0.7 else None,
+                "manufacturing_date": recv - timedelta(days=rnd.randint(30, 300)) if rnd.random() < 0.6 else None,
+                "expiry_date": expiry,
+                "shelf_expiry_date": expiry - timedelta(days=rnd.randint(10, 60)) if expiry and rnd.random() < 0.5 else None,
+                "status": "damaged" if rnd.random() < 0.08 else "ok",
+            })
+        if len(line_rows) >= batch:
+            flush()
+            log(f"  … {line_id:,} lines")
+    flush()
+
+    elapsed = time.perf_counter() - t0
+    log(f"Generated {headers:,} headers / {line_id:,} lines in {elapsed:.1f}s")
+    return {
+        "warehouses": warehouses, "locations": len(loc_rows), "items": items,
+        "headers": headers, "lines": line_id, "seconds": round(elapsed, 2),
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Generate a synthetic warehouse dataset.")
+    ap.add_argument("--db-url", default=DEFAULT_DB_URL)
+    ap.add_argument("--lines", type=int, default=100_000)
+    ap.add_argument("--warehouses", type=int, default=4)
+    ap.add_argument("--locations", type=int, default=25, help="locations per warehouse")
+    ap.add_argument("--items", type=int, default=400)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    engine = load_engine(args.db_url, stub_models=True)
+    generate(
+        engine, lines=args.lines, warehouses=args.warehouses,
+        locations=args.locations, items=args.items, seed=args.seed,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+harness.py — load the FastAPI app in-process against a chosen database
+=======================================================================
+load_app() must run before anything imports `app.*`: Settings and the
+SQLAlchemy engine are built from the environment at import time.
+
+SQLite stand-in: the MySQL functions used by query_engine (CURDATE, DATEDIFF,
+DATE_FORMAT, MONTH, YEAR) are registered as SQLite user functions. Patterns
+that use `INTERVAL n DAY` still need a real MySQL (e.g. a local container,
+--db-url mysql+pymysql://root:pw@127.0.0.1:3306/warehouse).
+"""
+
+import os
+from datetime import date, datetime
+
+DEFAULT_DB_URL = "sqlite:///benchmarks/bench.db?timeout=30"
+
+
+def _as_date(value):
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _datediff(a, b):
+    a, b = _as_date(a), _as_date(b)
+    return None if a is None or b is None else (a - b).days
+
+
+def _date_format(value, fmt):
+    d = _as_date(value)
+    # MySQL %Y/%m/%d/%H/%i/%s → strftime (only %i differs)
+    return None if d is None else d.strftime(str(fmt).replace("%i", "%M"))
+
+
+def _install_sqlite_functions(engine) -> None:
+    from sqlalchemy import event
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, _record):
+        dbapi_conn.create_function("CURDATE", 0, lambda: date.today().isoformat(), deterministic=False)
+        dbapi_conn.create_function("DATEDIFF", 2, _datediff)
+        dbapi_conn.create_function("DATE_FORMAT", 2, _date_format)
+        dbapi_conn.create_function("MONTH", 1, lambda v: _as_date(v).month if v else None)
+        dbapi_conn.create_function("YEAR", 1, lambda v: _as_date(v).year if v else None)
+        cur = dbapi_conn.cursor()
+        cur.execute("PRAGMA journal_mode=WAL")
+        cur.execute("PRAGMA synchronous=NORMAL")
+        cur.close()
+
+
+def configure_env(db_url: str = DEFAULT_DB_URL, stub_models: bool = True) -> None:
+    os.environ["DB_URL"] = db_url
+    # Keep benchmarks offline and deterministic: no Gemini calls
+    os.environ["GEMINI_API_KEY"] = ""
+    if stub_models:
+        from benchmarks.stubs import install_model_stubs
+        install_model_stubs()
+
+
+def load_engine(db_url: str = DEFAULT_DB_URL, stub_models: bool = True):
+    """Configure the environment and return app.core.database.engine (no routers imported)."""
+    configure_env(db_url, stub_models)
+    from app.core.database import engine
+    if engine.dialect.name == "sqlite":
+        _install_sqlite_functions(engine)
+    return engine
+
+
+def load_app(db_url: str = DEFAULT_DB_URL, stub_models: bool = True):
+    engine = load_engine(db_url, stub_models)
+    from app.main import app
+    return app, engine
@@ -0,0 +1,261 @@
+"""
+loadtest.py — in-process throughput / latency benchmark
+========================================================
+Drives the real FastAPI app through httpx's ASGI transport (no sockets, no
+uvicorn) with N concurrent clients per scenario and writes a JSON report
+that can be diffed across commits with benchmarks.compare.
+
+    python -m benchmarks.loadtest --generate --lines 200000 --concurrency 16 --duration 15
+    python -m benchmarks.loadtest --scenarios inventory,chat_query --real-models
+    python -m benchmarks.compare results/old.json results/new.json
+
+Model libraries are stubbed by default (see benchmarks.stubs) so DB paths
+are measured on their own; pass --real-models to include them.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import time
+from datetime import date, datetime, timedelta
+
+from benchmarks.harness import DEFAULT_DB_URL, load_app
+
+INTERPRET_MESSAGES = (
+    "receive 50 wrench WH1 A1 customer Ali ref PO-151 batch BATCH-01 status ok",
+    "check inventory",
+    "delete POS-456",
+    "search customer Ali",
+    "add 10 qty in POS-123",
+    "Total stock in every warehouse",
+    "maal kitna hai",
+    "hello",
+    "show report",
+    "open record PO-77",
+)
+
+# Patterns that run on the SQLite stand-in (no INTERVAL arithmetic)
+QUERY_QUESTIONS = (
+    "Total stock in every warehouse",
+    "List all damaged items in WH1",
+    "Top 10 items",
+    "Who is the top supplier",
+    "Compare stock between WH1 and WH2",
+    "Monthly receiving trend",
+    "ABC analysis",
+    "What was received under PO-40",
+    "Status distribution",
+    "Location wise stock",
+)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Scenarios: each returns (method, url, request kwargs)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def _inventory(rnd, ctx):
+    choice = rnd.random()
+    if choice < 0.4:
+        params = {"reference_no": f"PO-{rnd.randint(1, ctx['headers'])}"}
+    elif choice < 0.8:
+        params = {"warehouse": rnd.choice(ctx["warehouses"]), "item_code": rnd.choice(ctx["items"])}
+    else:
+        params = {"q": rnd.choice(ctx["items"]), "date_from": (date.today() - timedelta(days=7)).isoformat()}
+    return "GET", "/api/inventory", {"params": params}
+
+
+def _confirm(rnd, ctx):
+    wh = rnd.choice(ctx["warehouses"])
+    return "POST", "/receiving/confirm", {"json": {
+        "customer": "Bench Customer",
+        "warehouse": wh,
+        "receiving_date": date.today().isoformat(),
+        "reference_no": f"BENCH-{rnd.randint(1, 10**9)}",
+        "items": [
+            {
+                "item_code": rnd.choice(ctx["items"]),
+                "location": rnd.choice(ctx["locations"][wh]),
+                "quantity": rnd.randint(1, 200),
+                "status": "ok",
+            }
+            for _ in range(rnd.randint(1, 5))
+        ],
+    }}
+
+
+def _interpret(rnd, ctx):
+    return "POST", "/chat/interpret", {"json": {
+        "message": rnd.choice(INTERPRET_MESSAGES), "session_id": f"bench-{rnd.randint(1, 10**6)}",
+    }}
+
+
+def _query(rnd, ctx):
+    return "POST", "/chat/query", {"json": {"question": rnd.choice(QUERY_QUESTIONS)}}
+
+
+SCENARIOS = {
+    "inventory": _inventory,
+    "receiving_confirm": _confirm,
+    "chat_interpret": _interpret,
+    "chat_query": _query,
+}
+
+
+def _is_error(response) -> bool:
+    if response.status_code >= 400:
+        return True
+    # /chat/query reports SQL failures in a 200 body
+    if response.request.url.path == "/chat/query":
+        try:
+            return str(response.json().get("answer", "")).startswith("❌")
+        except ValueError:
+            return True
+    return False
+
+
+def _dataset_context(engine) -> dict:
+    from sqlalchemy import text
+    with engine.connect() as conn:
+        warehouses = [r[0] for r in conn.execute(text("SELECT code FROM warehouses ORDER BY id"))]
+        items = [r[0] for r in conn.execute(text("SELECT code FROM items ORDER BY id LIMIT 200"))]
+        locations = {}
+        for wh, loc in conn.execute(text(
+            "SELECT w.code, l.code FROM locations l JOIN warehouses w ON l.warehouse_id = w.id"
+        )):
+            locations.setdefault(wh, []).append(loc)
+        headers = conn.execute(text("SELECT COALESCE(MAX(id), 1) FROM receiving_headers")).scalar()
+        lines = conn.execute(text("SELECT COUNT(*) FROM receiving_lines")).scalar()
+    if not warehouses or not items:
+        raise SystemExit("Dataset is empty — run with --generate or python -m benchmarks.datagen first.")
+    return {"warehouses": warehouses, "items": items, "locations": locations, "headers": headers, "lines": lines}
+
+
+def _percentile(sorted_values: list[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[k]
+
+
+async def _run_scenario(client, name: str, ctx: dict, concurrency: int, duration: float, seed: int) -> dict:
+    make_request = SCENARIOS[name]
+    latencies: list[float] = []
+    errors = 0
+
+    async def worker(i: int):
+        nonlocal errors
+        rnd = random.Random(seed * 1000 + i)
+        while time.perf_counter() < deadline:
+            method, url, kwargs = make_request(rnd, ctx)
+            t0 = time.perf_counter()
+            try:
+                r = await client.request(method, url, **kwargs)
+                failed = _is_error(r)
+            except Exception:
+                failed = True
+            latencies.append(time.perf_counter() - t0)
+            errors += failed
+
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(worker(i) for i in range(concurrency)))
+    wall = time.perf_counter() - started
+
+    lat = sorted(latencies)
+    ms = lambda v: round(v * 1000, 2)
+    return {
+        "requests": len(lat),
+        "errors": errors,
+        "rps": round(len(lat) / wall, 1) if wall else 0.0,
+        "mean_ms": ms(sum(lat) / len(lat)) if lat else 0.0,
+        "p50_ms": ms(_percentile(lat, 50)),
+        "p95_ms": ms(_percentile(lat, 95)),
+        "p99_ms": ms(_percentile(lat, 99)),
+        "max_ms": ms(lat[-1]) if lat else 0.0,
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+async def run(args) -> dict:
+    import httpx
+
+    app, engine = load_app(args.db_url, stub_models=not args.real_models)
+    dataset = None
+    if args.generate:
+        from benchmarks.datagen import generate
+        dataset = generate(engine, lines=args.lines, seed=args.seed)
+    ctx = _dataset_context(engine)
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+            for name in args.scenarios:
+                if args.warmup:
+                    await _run_scenario(client, name, ctx, 1, args.warmup, args.seed)
+                results[name] = await _run_scenario(client, name, ctx, args.concurrency, args.duration, args.seed)
+                r = results[name]
+                print(f"  {name:<18} {r['rps']:>8.1f} req/s  p50 {r['p50_ms']:>8.1f} ms  "
+                      f"p95 {r['p95_ms']:>8.1f} ms  p99 {r['p99_ms']:>8.1f} ms  errors {r['errors']}")
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "db": engine.dialect.name,
+            "lines": ctx["lines"],
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "stub_models": not args.real_models,
+            "python": platform.python_version(),
+            "generated": dataset,
+        },
+        "results": results,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="In-process load test for the Warehouse Copilot API.")
+    ap.add_argument("--db-url", default=DEFAULT_DB_URL)
+    ap.add_argument("--generate", action="store_true", help="(re)generate the synthetic dataset first")
+    ap.add_argument("--lines", type=int, default=100_000)
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--duration", type=float, default=10.0, help="seconds per scenario")
+    ap.add_argument("--warmup", type=float, default=1.0, help="single-client warmup seconds per scenario")
+    ap.add_argument("--scenarios", default=",".join(SCENARIOS),
+                    type=lambda s: [x.strip() for x in s.split(",") if x.strip()])
+    ap.add_argument("--real-models", action="store_true", help="load fastembed/spaCy/whisper instead of stubs")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", default=None, help="JSON report path (default benchmarks/results/<ts>-<commit>.json)")
+    args = ap.parse_args()
+
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        ap.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    report = asyncio.run(run(args))
+
+    out = args.out or os.path.join(
+        os.path.dirname(__file__), "results",
+        f"{datetime.now():%Y%m%d-%H%M%S}-{report['meta']['commit'] or 'nogit'}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(report, fh, indent=2, default=str)
+    print(f"Report written to {out}")
+
+
+if __name__ == "__main__":
+    main()
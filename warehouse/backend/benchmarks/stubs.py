@@ -0,0 +1,126 @@
+"""
+stubs.py — lightweight stand-ins for the model libraries
+=========================================================
+install_model_stubs() registers fake `fastembed`, `spacy` and
+`faster_whisper` modules in sys.modules *before* the app is imported, so
+app.services.gemini / whisper_ai load instantly and every regex, SQL and
+serialization path still runs for real. Use it to measure DB paths on their
+own; drop it (--real-models) to include model cost.
+"""
+
+import hashlib
+import re
+import sys
+import types
+
+import numpy as np
+
+EMBED_DIM = 384
+_STOP_WORDS = {"a", "an", "the", "in", "of", "for", "to", "me", "all", "is", "are", "at", "by", "and", "or"}
+_TOKEN_RE = re.compile(r"\w[\w\-]*|[^\w\s]")
+
+
+# ── fastembed ────────────────────────────────────────────────────────────────
+
+def _hash_embed(text: str) -> np.ndarray:
+    """Bag-of-words hashed into EMBED_DIM buckets, L2-normalised (deterministic)."""
+    vec = np.zeros(EMBED_DIM, dtype=np.float32)
+    for tok in text.lower().split():
+        h = int.from_bytes(hashlib.blake2b(tok.encode(), digest_size=8).digest(), "little")
+        vec[h % EMBED_DIM] += 1.0 if (h >> 32) & 1 else -1.0
+    norm = float(np.linalg.norm(vec))
+    return vec / norm if norm else vec
+
+
+class _TextEmbedding:
+    def __init__(self, model_name: str = "", *args, **kwargs):
+        self.model_name = model_name
+
+    def embed(self, documents, *args, **kwargs):
+        if isinstance(documents, str):
+            documents = [documents]
+        for doc in documents:
+            yield _hash_embed(doc)
+
+
+# ── spaCy ────────────────────────────────────────────────────────────────────
+
+class _Token:
+    def __init__(self, text: str):
+        self.text = text
+        plain = text.replace(",", "").replace(".", "", 1)
+        self.like_num = plain.isdigit()
+        self.is_stop = text.lower() in _STOP_WORDS
+        self.pos_ = "NUM" if self.like_num else ("NOUN" if text[:1].isalpha() else "PUNCT")
+
+
+class _Doc:
+    def __init__(self, text: str):
+        self.text = text
+        self._tokens = [_Token(t) for t in _TOKEN_RE.findall(text)]
+        self.ents = []
+
+    def __iter__(self):
+        return iter(self._tokens)
+
+    def __len__(self):
+        return len(self._tokens)
+
+
+def _spacy_load(name: str, *args, **kwargs):
+    return _Doc
+
+
+# ── faster-whisper ───────────────────────────────────────────────────────────
+
+class _Segment:
+    def __init__(self, text: str):
+        self.text = text
+        self.start, self.end = 0.0, 1.0
+        self.avg_logprob = -0.1
+
+
+class _Info:
+    language = "en"
+    duration = 1.0
+
+
+class _FeatureExtractor:
+    sampling_rate = 16000
+
+
+class _WhisperModel:
+    def __init__(self, *args, **kwargs):
+        self.feature_extractor = _FeatureExtractor()
+
+    def transcribe(self, audio, *args, **kwargs):
+        return iter([_Segment("check inventory")]), _Info()
+
+
+class _BatchedInferencePipeline:
+    def __init__(self, model, *args, **kwargs):
+        self.model = model
+
+    def transcribe(self, audio, *args, **kwargs):
+        return self.model.transcribe(audio)
+
+
+def _decode_audio(path, sampling_rate: int = 16000, **kwargs):
+    return np.zeros(sampling_rate, dtype=np.float32)
+
+
+def install_model_stubs() -> None:
+    fastembed = types.ModuleType("fastembed")
+    fastembed.TextEmbedding = _TextEmbedding
+
+    spacy = types.ModuleType("spacy")
+    spacy.load = _spacy_load
+
+    whisper = types.ModuleType("faster_whisper")
+    whisper.WhisperModel = _WhisperModel
+    whisper.BatchedInferencePipeline = _BatchedInferencePipeline
+    whisper.decode_audio = _decode_audio
+
+    sys.modules["fastembed"] = fastembed
+    sys.modules["spacy"] = spacy
+    sys.modules["faster_whisper"] = whisper
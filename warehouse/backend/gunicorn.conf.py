@@ -0,0 +1,53 @@
+"""
+gunicorn.conf.py — preload-and-fork entry point
+================================================
+Imports the app (and with it spaCy, the fastembed ONNX session and the intent
+matrices) once in the gunicorn master, then forks uvicorn workers that share
+those pages copy-on-write instead of each loading its own copy:
+
+    cd warehouse/backend
+    gunicorn app.main:app                      # picks up this file
+    WEB_CONCURRENCY=8 BIND=0.0.0.0:8000 gunicorn app.main:app
+
+Nothing that owns threads, connections or locks may cross the fork:
+  • ONNX Runtime   — with PREFORK the embedding session is built with one
+                     intra/inter-op thread, so it has no pool threads to lose
+  • Whisper        — CTranslate2 starts its pool on load: not loaded in the
+                     master; each worker loads it in post_worker_init
+  • SQLAlchemy     — pool disposed in the child (app/core/database.py)
+  • session store  — SQLite connection / lock replaced in the child
+                     (app/core/session_store.py)
+  • scheduler, job runner — started by the app's startup hook, i.e. per worker
+  • SIGUSR2 profiler — installed by the startup hook in each worker, never in
+                     the master: there SIGUSR2 is gunicorn's binary upgrade.
+                     Send it to a worker pid, not to the master
+
+Measure with: python -m benchmarks.bench_prefork
+"""
+
+import gc
+import os
+import sys
+
+# Read by app.core.config before the app is imported
+os.environ.setdefault("PREFORK", "true")
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+workers = int(os.getenv("WEB_CONCURRENCY", "4"))
+worker_class = "uvicorn.workers.UvicornWorker"
+preload_app = os.getenv("GUNICORN_PRELOAD", "true").lower() != "false"
+timeout = 120
+graceful_timeout = 30
+
+
+def when_ready(server):
+    # Everything imported so far stays put: keep the cyclic GC from touching
+    # (and so un-sharing) those objects in every worker
+    gc.freeze()
+
+
+def post_worker_init(worker):
+    # Models that are not fork-safe, loaded per worker (only if this profile uses them)
+    whisper = sys.modules.get("app.services.whisper_ai")
+    if whisper is not None:
+        whisper.load_models()
@@ -0,0 +1,7 @@
+-- Normalised, indexed reference key so delete/search by reference is an index
+-- seek instead of a LOWER(TRIM(reference_no)) scan. The DB keeps it in sync.
+-- Apply once:  mysql warehouse < migrations/001_reference_key.sql
+
+ALTER TABLE receiving_headers
+    ADD COLUMN reference_key VARCHAR(100) AS (LOWER(TRIM(reference_no))) STORED,
+    ADD INDEX ix_receiving_headers_reference_key (reference_key);
@@ -0,0 +1,48 @@
+-- Report snapshots: per-day and per-month receiving summaries kept by the
+-- in-app scheduler (app/services/report_snapshots.py). Each refresh only
+-- re-aggregates receiving dates touched by headers created since the last
+-- run (created_at watermark) or marked dirty by edits/deletes.
+-- Apply once:  mysql warehouse < migrations/002_report_snapshots.sql
+
+ALTER TABLE receiving_headers
+    ADD INDEX ix_receiving_headers_created_at (created_at),
+    ADD INDEX ix_receiving_headers_receiving_date (receiving_date);
+
+CREATE TABLE report_daily_snapshots (
+    receiving_date DATE NOT NULL,
+    warehouse_id   INT NOT NULL,
+    receivings     INT NOT NULL,
+    line_count     INT NOT NULL,
+    total_qty      BIGINT NOT NULL,
+    damaged_lines  INT NOT NULL,
+    damaged_qty    BIGINT NOT NULL,
+    ok_qty         BIGINT NOT NULL,
+    PRIMARY KEY (receiving_date, warehouse_id),
+    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+);
+
+CREATE TABLE report_monthly_snapshots (
+    month          CHAR(7) NOT NULL,
+    warehouse_id   INT NOT NULL,
+    receivings     INT NOT NULL,
+    line_count     INT NOT NULL,
+    total_qty      BIGINT NOT NULL,
+    damaged_lines  INT NOT NULL,
+    damaged_qty    BIGINT NOT NULL,
+    ok_qty         BIGINT NOT NULL,
+    earliest       DATE NOT NULL,
+    latest         DATE NOT NULL,
+    PRIMARY KEY (month, warehouse_id),
+    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id)
+);
+
+CREATE TABLE report_snapshot_dirty (
+    id             INT AUTO_INCREMENT PRIMARY KEY,
+    receiving_date DATE NOT NULL
+);
+
+CREATE TABLE report_snapshot_state (
+    name           VARCHAR(50) PRIMARY KEY,
+    watermark      DATETIME NULL,
+    refreshed_at   DATETIME NULL
+);
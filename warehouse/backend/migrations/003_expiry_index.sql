@@ -0,0 +1,11 @@
+-- Expiry lookups: the "expiring in N days" / "already expired" questions now
+-- filter on a plain date range over receiving_lines.expiry_date, and FEFO
+-- picking (app/services/expiry_index.py, GET /api/fefo) reads the pickable
+-- lines of one item in expiry order. shelf_expiry_date serves the
+-- shelf-expiry-gap question's IS NOT NULL filter.
+-- Apply once:  mysql warehouse < migrations/003_expiry_index.sql
+
+ALTER TABLE receiving_lines
+    ADD INDEX ix_receiving_lines_expiry_date (expiry_date),
+    ADD INDEX ix_receiving_lines_shelf_expiry_date (shelf_expiry_date),
+    ADD INDEX ix_receiving_lines_item_status_expiry (item_id, status, expiry_date);
@@ -0,0 +1,45 @@
+-- Stock ledger: every receiving write appends to stock_movements (never
+-- updated or deleted); the in-app scheduler materialises per-(item,
+-- warehouse, location) balances into stock_balances. Point-in-time stock is
+-- the last snapshot before T plus the movements between (app/services/stock_ledger.py).
+-- The first snapshot taken after this migration is the opening balance.
+-- Apply once:  mysql warehouse < migrations/004_stock_ledger.sql
+
+CREATE TABLE stock_movements (
+    id            INT AUTO_INCREMENT PRIMARY KEY,
+    moved_at      DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    reason        VARCHAR(20) NOT NULL,
+    line_id       INT NOT NULL,
+    receiving_id  INT NOT NULL,
+    item_id       INT NOT NULL,
+    warehouse_id  INT NOT NULL,
+    location_id   INT NOT NULL,
+    qty_delta     INT NOT NULL,
+    damaged_delta INT NOT NULL,
+    INDEX ix_stock_movements_moved_at (moved_at),
+    INDEX ix_stock_movements_line_id (line_id),
+    FOREIGN KEY (item_id) REFERENCES items(id),
+    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id),
+    FOREIGN KEY (location_id) REFERENCES locations(id)
+);
+
+CREATE TABLE stock_snapshots (
+    id               INT AUTO_INCREMENT PRIMARY KEY,
+    taken_at         DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    last_movement_id INT NOT NULL,
+    INDEX ix_stock_snapshots_taken_at (taken_at)
+);
+
+CREATE TABLE stock_balances (
+    snapshot_id  INT NOT NULL,
+    item_id      INT NOT NULL,
+    warehouse_id INT NOT NULL,
+    location_id  INT NOT NULL,
+    quantity     BIGINT NOT NULL,
+    damaged_qty  BIGINT NOT NULL,
+    PRIMARY KEY (snapshot_id, item_id, warehouse_id, location_id),
+    FOREIGN KEY (snapshot_id) REFERENCES stock_snapshots(id),
+    FOREIGN KEY (item_id) REFERENCES items(id),
+    FOREIGN KEY (warehouse_id) REFERENCES warehouses(id),
+    FOREIGN KEY (location_id) REFERENCES locations(id)
+);
@@ -0,0 +1,15 @@
+-- Analytics mirror: updated_at on the receiving tables is the watermark the
+-- DuckDB mirror (app/services/analytics_mirror.py) syncs changed rows by.
+-- Existing headers start at their created_at; existing lines at migration
+-- time, so the first sync copies everything once.
+-- Apply once:  mysql warehouse < migrations/005_analytics_mirror.sql
+
+ALTER TABLE receiving_headers
+    ADD COLUMN updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX ix_receiving_headers_updated_at (updated_at);
+
+UPDATE receiving_headers SET updated_at = created_at WHERE created_at IS NOT NULL;
+
+ALTER TABLE receiving_lines
+    ADD COLUMN updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    ADD INDEX ix_receiving_lines_updated_at (updated_at);
@@ -0,0 +1,119 @@
+"""
+Stock snapshots must not skip movements that commit out of id order.
+
+InnoDB allocates auto-increment ids at INSERT, so a transaction holding a
+lower movement id can commit after one holding a higher id. SQLite
+serialises writers, so the tests reproduce that order explicitly: a second
+transaction commits movement 2 first, the snapshot runs, then the first
+transaction commits movement 1 with its earlier timestamp.
+
+    cd warehouse/backend && python -m pytest -q tests
+"""
+
+import os
+from datetime import timedelta
+
+os.environ.setdefault("DB_URL", "sqlite://")
+os.environ.setdefault("GEMINI_API_KEY", "test")
+
+import pytest
+from sqlalchemy import create_engine, func, insert, select, text
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import settings
+from app.core.database import Base
+from app.models.item import Item
+from app.models.location import Location
+from app.models.receiving import ReceivingHeader, ReceivingLine
+from app.models.stock_ledger import StockMovement, StockSnapshot
+from app.models.warehouse import Warehouse
+from app.services import stock_ledger
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ledger.db'}")
+    Base.metadata.create_all(engine)
+    Session = sessionmaker(bind=engine)
+    with Session() as db:
+        db.add_all([Item(id=1, code="WRENCH", name="Wrench"), Warehouse(id=1, code="WH1", name="Warehouse 1")])
+        db.flush()
+        db.add(Location(id=1, code="A1", warehouse_id=1))
+        db.commit()
+    yield Session
+    engine.dispose()
+
+
+def _db_now(db):
+    return stock_ledger._as_datetime(db.execute(select(func.now())).scalar())
+
+
+def _move(db, movement_id, qty, moved_at):
+    db.execute(insert(StockMovement), [{
+        "id": movement_id, "moved_at": moved_at, "reason": "receive", "line_id": movement_id,
+        "receiving_id": 1, "item_id": 1, "warehouse_id": 1, "location_id": 1,
+        "qty_delta": qty, "damaged_delta": 0,
+    }])
+
+
+def _stock_now(db) -> int:
+    rows = db.execute(text(stock_ledger.stock_at_sql("2100-01-01 00:00:00"))).all()
+    return sum(row.quantity for row in rows)
+
+
+def test_late_commit_of_a_lower_id_is_not_skipped(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "STOCK_SNAPSHOT_LAG", 60)
+    with sessions() as db:
+        assert stock_ledger.take_snapshot(db) is not None    # opening balance: nothing yet
+        now = _db_now(db)
+
+    first, second = sessions(), sessions()
+    try:
+        # `first` was allocated id 1 fifteen seconds ago but is still open;
+        # `second` got id 2 later and commits first
+        _move(second, 2, 3, now - timedelta(seconds=10))
+        second.commit()
+
+        # within the lag: the snapshot must not move past id 2 while 1 may be open
+        assert stock_ledger.take_snapshot(second) is None
+
+        _move(first, 1, 5, now - timedelta(seconds=15))
+        first.commit()
+    finally:
+        first.close()
+        second.close()
+
+    with sessions() as db:
+        assert _stock_now(db) == 8                           # replayed from the movements
+        monkeypatch.setattr(settings, "STOCK_SNAPSHOT_LAG", 5)
+        assert stock_ledger.take_snapshot(db) is not None
+        last = db.execute(select(StockSnapshot).order_by(StockSnapshot.id.desc())).scalars().first()
+        assert last.last_movement_id == 2
+        assert _stock_now(db) == 8                           # both movements are in the snapshot
+
+
+def test_opening_balance_leaves_recent_movements_to_the_replay(sessions, monkeypatch):
+    monkeypatch.setattr(settings, "STOCK_SNAPSHOT_LAG", 60)
+    with sessions() as db:
+        now = _db_now(db)
+        header = ReceivingHeader(id=1, customer="Ali", receiving_date=now.date(), warehouse_id=1, reference_no="PO-1")
+        db.add(header)
+        db.flush()
+        db.add_all([
+            ReceivingLine(id=1, receiving_id=1, item_id=1, location_id=1, quantity=5, status="ok"),
+            ReceivingLine(id=2, receiving_id=1, item_id=1, location_id=1, quantity=3, status="ok"),
+        ])
+        _move(db, 1, 5, now - timedelta(seconds=120))        # older than the lag
+        _move(db, 2, 3, now - timedelta(seconds=10))         # inside it
+        db.commit()
+
+        assert stock_ledger.take_snapshot(db) is not None
+        opening = db.execute(select(StockSnapshot)).scalars().one()
+        assert opening.last_movement_id == 1
+        assert _stock_now(db) == 8                           # 5 in the snapshot + 3 replayed
+
+        monkeypatch.setattr(settings, "STOCK_SNAPSHOT_LAG", 0)
+        db.execute(text("UPDATE stock_movements SET moved_at = :t WHERE id = 2"), {"t": now - timedelta(seconds=61)})
+        db.commit()
+        assert stock_ledger.take_snapshot(db) is not None
+        assert _stock_now(db) == 8
@@ -8,6 +8,8 @@
 
 const API_BASE = "http://127.0.0.1:8000";
 let pendingSlots = {};
+let voiceTranscript = null;   // a complete spoken smart receive is committed by /chat/interpret itself
+let askAvailable = true;      // false once /chat/ask 404s (api and nlp on separate workers)
 let mediaRecorder = null;
 let audioChunks = [];
 let isRecording = false;
@@ -222,6 +224,14 @@ async function deleteLine(lineId) {
   return fetchWithJson(`${API_BASE}/receiving/lines/${lineId}`, { method: "DELETE" });
 }
 
+async function deleteLines(lineIds) {
+  return fetchWithJson(`${API_BASE}/receiving/lines/bulk-delete`, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify({ line_ids: lineIds }),
+  });
+}
+
 async function deleteHeaderByRef(reference) {
   return fetchWithJson(
     `${API_BASE}/receiving/headers/by-ref/${encodeURIComponent(reference)}`,
@@ -256,13 +266,7 @@ async function handleDeleteLine(slots) {
         addStatusMessage(`❌ No record found matching '${query}'.`);
         return;
       }
-      const headerIds = [...new Set(rows.map(r => r.header_id))];
-      for (const hid of headerIds) {
-        const lines = rows.filter(r => r.header_id === hid);
-        for (const line of lines) {
-          await deleteLine(line.line_id);
-        }
-      }
+      await deleteLines(rows.map(r => r.line_id));
     }
 
     addStatusMessage(`✅ '${query}' deleted successfully.`);
@@ -305,28 +309,71 @@ async function handleQueryData(originalMessage) {
     });
 
     if (!res.ok) throw new Error(`Query failed: ${res.status}`);
-    const data = await res.json();
+    renderQueryAnswer(await res.json());
+  } catch (err) {
+    addMessage(`❌ ${err.message}`, "error");
+  }
+}
 
-    if (data.answer) {
-      // Convert **bold** markdown to <strong> for rich rendering
-      const richHtml = data.answer
-        .replace(/\*\*([^*]+)\*\*/g, "<strong>$1</strong>")
-        .replace(/\n/g, "<br>");
-      addRichMessage(richHtml, "assistant");
-    } else {
-      addMessage("📭 No results found for your question.", "assistant");
+/** Read an NDJSON response line by line */
+async function* ndjsonLines(res) {
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  for (;;) {
+    const { value, done } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    let nl;
+    while ((nl = buffer.indexOf("\n")) >= 0) {
+      const line = buffer.slice(0, nl).trim();
+      buffer = buffer.slice(nl + 1);
+      if (line) yield JSON.parse(line);
     }
+  }
+  if (buffer.trim()) yield JSON.parse(buffer);
+}
 
-    // If we have tabular data with many rows, also show a compact table
-    if (data.rows && data.rows.length > 0 && data.columns && data.columns.length > 1) {
-      renderQueryResultsTable(data.columns, data.rows);
+/** Rest of a /chat/ask stream for a data question: result header, row arrays, answer */
+async function handleQueryStream(lines) {
+  try {
+    let data = { rows: [] };
+    for await (const line of lines) {
+      if (Array.isArray(line)) {
+        data.rows.push(Object.fromEntries(data.columns.map((c, i) => [c, line[i]])));
+      } else {
+        data = { ...data, ...line };
+      }
     }
-
+    renderQueryAnswer(data);
   } catch (err) {
     addMessage(`❌ ${err.message}`, "error");
   }
 }
 
+/** Answer text, table and truncation note of a /chat/query result */
+function renderQueryAnswer(data) {
+  if (data.answer) {
+    // Convert **bold** markdown to <strong> for rich rendering
+    const richHtml = data.answer
+      .replace(/\*\*([^*]+)\*\*/g, "<strong>$1</strong>")
+      .replace(/\n/g, "<br>");
+    addRichMessage(richHtml, "assistant");
+  } else {
+    addMessage("📭 No results found for your question.", "assistant");
+  }
+
+  // If we have tabular data with many rows, also show a compact table
+  if (data.rows && data.rows.length > 0 && data.columns && data.columns.length > 1) {
+    renderQueryResultsTable(data.columns, data.rows);
+  }
+
+  // Server caps large results; the rest is available via /chat/query/more
+  if (data.truncated) {
+    addMessage(`ℹ️ Returned the first ${data.rows.length} of ${data.total ?? "many"} rows. Narrow the question to see fewer.`, "assistant");
+  }
+}
+
 /** Render query results as a compact HTML table in the chat */
 function renderQueryResultsTable(columns, rows) {
   if (!rows.length || !columns.length) return;
@@ -404,6 +451,7 @@ function setupVoiceRecording() {
           const audioBlob = new Blob(audioChunks, { type: "audio/webm" });
           const data = await transcribeAudio(audioBlob);
           userInput.value = data?.text || "";
+          voiceTranscript = userInput.value;
           statusEl.textContent = "Voice: captured. Click Send.";
         } catch (err) {
           statusEl.textContent = `Voice: error (${err.message})`;
@@ -1002,16 +1050,27 @@ window.addEventListener("DOMContentLoaded", () => {
     userInput.value = "";
     setInputEnabled(false);
     showTypingIndicator();
+    const commit = voiceTranscript !== null && voiceTranscript.trim() === message;
+    voiceTranscript = null;
 
     try {
-      const res = await fetch(`${API_BASE}/chat/interpret`, {
+      // /chat/ask streams the interpret result first and, for a data question,
+      // the query result after it; fall back to /chat/interpret where not mounted
+      const request = {
         method: "POST",
         headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ message, session_id: SESSION_ID }),
-      });
+        body: JSON.stringify({ message, session_id: SESSION_ID, commit }),
+      };
+      let res = askAvailable ? await fetch(`${API_BASE}/chat/ask`, request) : null;
+      if (res && res.status === 404) {
+        askAvailable = false;
+        res = null;
+      }
+      const lines = res ? ndjsonLines(res) : null;
+      if (!res) res = await fetch(`${API_BASE}/chat/interpret`, request);
 
       if (!res.ok) throw new Error(`Interpret failed: ${res.status}`);
-      const data = await res.json();
+      const data = lines ? (await lines.next()).value : await res.json();
 
       removeTypingIndicator();
 
@@ -1029,7 +1088,13 @@ window.addEventListener("DOMContentLoaded", () => {
 
       // ── NEW: Query Data — natural language data questions ──────────
       if (action === "query_data" || intent === "query_data") {
-        await handleQueryData(message);
+        await (lines && action === "query_data" ? handleQueryStream(lines) : handleQueryData(message));
+        return;
+      }
+
+      // ── SMART RECEIVE committed server-side (voice) ──
+      if (action === "received") {
+        await refreshInventory({});
         return;
       }
 
@@ -1197,8 +1262,9 @@ window.addEventListener("DOMContentLoaded", () => {
           const errData = await res.json().catch(() => ({}));
           throw new Error(errData.detail || `Action failed: ${res.status}`);
         }
+        const result = await res.json().catch(() => ({}));
         card.remove();
-        addStatusMessage(`✅ ${intent === 'smart_receive' ? `Received ${payload.quantity} × ${payload.item_code} into ${payload.warehouse} (Ref: ${payload.reference_no || 'N/A'}).` : 'Action completed.'}`);
+        addStatusMessage(`✅ ${intent === 'smart_receive' ? `Received ${result.quantity ?? payload.quantity} × ${result.item_code || payload.item_code} into ${result.warehouse || payload.warehouse} ${result.location || ''} (Ref: ${result.reference_no || payload.reference_no || 'N/A'}).` : 'Action completed.'}`);
         await refreshInventory({});
       } catch (err) {
         addMessage(`❌ ${err.message || "Error saving action."}`, "error");